@@ -0,0 +1,6 @@
+import sys
+
+from oigscanner.cli import main
+
+
+sys.exit(main())
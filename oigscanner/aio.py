@@ -0,0 +1,318 @@
+import asyncio
+import queue
+import time
+
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from selenium.webdriver.remote.webdriver import WebDriver
+from oigscanner.browser.governor import resource_governor
+from oigscanner.browser.pool import browser_pool
+from oigscanner.control import token_bucket
+from oigscanner.data.cache import result_cache
+from oigscanner.data.processing import canonical_key, clean_name
+from oigscanner.http_client.handlers import oig_http_scanner
+from oigscanner.logs import run_log, NULL_LOG
+from oigscanner.recovery import circuit_breaker
+from oigscanner.results import lookup_result, scan_result
+from typing import Callable, Optional
+
+
+class scanner_busy(Exception):
+    """Raised when the limit of different checks in flight is reached (the caller should retry later)."""
+
+
+class async_scanner:
+
+    def __init__(
+        self,
+        browser_template: Optional[Callable[[], WebDriver]] = None,
+        sessions: int = 4,
+        engine: str = "http",
+        url: str = "https://exclusions.oig.hhs.gov",
+        max_in_flight: int = 64,
+        attempts: int = 3,
+        evidence_policy: Optional[str] = None,
+        cache: Optional[result_cache] = None,
+        log: Optional[run_log] = None,
+        governor: Optional[resource_governor] = None,
+        rate_limit: Optional[float] = None
+        ):
+        """Checks single names on demand from asyncio code. Checks are run by a few long-lived sessions
+        (http sessions or browsers) shared by every caller. Identical checks that run at the same time
+        are looked up once.
+
+        Args:
+            browser_template: webdriver template (needed for the browser engine and for screenshots)
+            sessions: number of sessions that run checks at the same time
+            engine: "http" - search by posting the form, "browser" - search with browsers
+            url: URL of the oig exclusions site
+            max_in_flight: maximum number of different checks waiting or running, scanner_busy is raised above it
+            attempts: number of tries of a check
+            evidence_policy: "all", "hits", "html" or "none" (see oig_scanner), "hits" if browser template
+                is given and "none" if not for the http engine, "all" for the browser engine
+            cache: cache of results, names already checked in the same month reuse the result
+            log: structured log of the checks, None to not log
+            governor: governor that recycles leaking browsers (browser engine)
+            rate_limit: maximum number of requests to the site per second shared by every session, None for no limit
+        """
+        if engine not in ("browser", "http"):
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine == "browser" and browser_template is None:
+            raise ValueError("Browser template is needed for the browser engine")
+
+        # Set sessions and options
+        self.BROWSER_TEMPLATE = browser_template
+        self.SIZE = max(sessions, 1)
+        self.ENGINE = engine
+        self.URL = url
+        self.MAX_IN_FLIGHT = max_in_flight
+        self.ATTEMPTS = attempts
+        self.EVIDENCE_POLICY = evidence_policy
+        self.CACHE = cache
+        self.LOG = log if log is not None else NULL_LOG
+        self.GOVERNOR = governor
+        self.BREAKER = circuit_breaker()
+        self.LIMITER = token_bucket(rate_limit)
+
+        # Sessions are opened by start
+        self.EXECUTOR = None
+        self.POOL = None
+        self.SESSIONS = queue.Queue()
+
+        # Checks in flight by key and counters
+        self.IN_FLIGHT = {}
+        self.LOOKUPS = 0
+        self.COALESCED = 0
+        self.REJECTED = 0
+
+
+    async def __aenter__(self) -> "async_scanner":
+        await self.start()
+        return self
+
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+    async def start(self) -> None:
+        """Opens sessions (starts browsers or opens http sessions and loads the search forms)."""
+        self.EXECUTOR = ThreadPoolExecutor(max_workers=self.SIZE, thread_name_prefix="async_scanner")
+        await asyncio.get_running_loop().run_in_executor(None, self.open_sessions)
+
+
+    def open_sessions(self) -> None:
+        """Opens sessions (called in a thread by start)."""
+        if self.ENGINE == "browser":
+            self.POOL = browser_pool(
+                self.BROWSER_TEMPLATE,
+                self.SIZE,
+                url=self.URL,
+                log=self.LOG,
+                breaker=self.BREAKER,
+                evidence_policy=self.EVIDENCE_POLICY or "all",
+                governor=self.GOVERNOR,
+                limiter=self.LIMITER
+            )
+            return
+
+        # Http sessions load the search form right away, so first checks do not wait for it
+        evidence = self.EVIDENCE_POLICY or ("hits" if self.BROWSER_TEMPLATE is not None else "none")
+        for i in range(self.SIZE):
+            session = oig_http_scanner(self.BROWSER_TEMPLATE, self.URL, evidence=evidence, log=self.LOG, breaker=self.BREAKER, limiter=self.LIMITER)
+            try:
+                session.get_individuals_page()
+            except Exception as e:
+                print(str(e))
+            self.SESSIONS.put(session)
+
+
+    async def close(self) -> None:
+        """Waits for checks in flight and closes sessions."""
+        if self.IN_FLIGHT:
+            await asyncio.gather(*self.IN_FLIGHT.values(), return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(None, self.close_sessions)
+
+
+    def close_sessions(self) -> None:
+        """Closes sessions (called in a thread by close)."""
+        if self.EXECUTOR is not None:
+            self.EXECUTOR.shutdown(wait=True)
+        if self.POOL is not None:
+            self.POOL.close()
+        while not self.SESSIONS.empty():
+            try:
+                self.SESSIONS.get_nowait().quit()
+            except Exception as e:
+                print(str(e))
+
+
+    def scan(self, names: list[str], month: str, year: int) -> scan_result:
+        """Checks names with a free session (called in a thread of the executor).
+
+        Args:
+            names: normalized last name and first name or entity name
+            month: month to append to the name of the screenshot
+            year: year to append to the name of the screenshot
+
+        Returns:
+            Result of the scan
+        """
+
+        # Take a free session
+        if self.POOL is not None:
+            session = self.POOL.lease()
+        else:
+            session = self.SESSIONS.get()
+
+        # Check names and give the session back
+        try:
+            result = session.take_oig_screenshot(pd.Series(names), month, year, self.ATTEMPTS)
+        except Exception as e:
+            print(str(e))
+            result = scan_result(False, error=type(e).__name__)
+        finally:
+            if self.POOL is not None:
+                self.POOL.release(self.POOL.checkpoint(session))
+            else:
+                self.SESSIONS.put(session)
+        return result
+
+
+    async def lookup(
+        self,
+        key: str,
+        names: list[str],
+        month: str,
+        year: int
+        ) -> tuple[scan_result, bool]:
+        """Checks names once (shared by identical checks in flight).
+
+        Args:
+            key: canonical name key
+            names: normalized last name and first name or entity name
+            month: month to append to the name of the screenshot
+            year: year to append to the name of the screenshot
+
+        Returns:
+            Result of the scan and True if it was reused from the cache
+        """
+        period = f"{month} {year}"
+        loop = asyncio.get_running_loop()
+
+        # Reuse cached result (sqlite is not used on the event loop)
+        if self.CACHE is not None:
+            cached = await loop.run_in_executor(None, self.CACHE.get, key, period)
+            if cached is not None:
+                return cached, True
+
+        # Check with a session in a thread
+        self.LOOKUPS += 1
+        started = time.perf_counter()
+        result = await loop.run_in_executor(self.EXECUTOR, self.scan, names, month, year)
+        if result.success and self.CACHE is not None:
+            await loop.run_in_executor(None, self.CACHE.put, key, period, result)
+        self.LOG.log(
+            "lookup",
+            key=key,
+            status="done" if result.success else "failed",
+            found=result.found,
+            attempts=result.attempts,
+            error=result.error,
+            duration=round(time.perf_counter() - started, 3)
+        )
+        return result, False
+
+
+    async def check(
+        self,
+        *values: str,
+        month: Optional[str] = None,
+        year: Optional[int] = None
+        ) -> lookup_result:
+        """Checks an individual (last name and first name) or an entity (name).
+
+        Args:
+            values: last name and first name or entity name
+            month: month to append to the name of the screenshot, current month if not given
+            year: year to append to the name of the screenshot, current year if not given
+
+        Returns:
+            Result of the check
+        """
+        if len(values) not in (1, 2):
+            raise ValueError("Give last name and first name or entity name")
+        if self.EXECUTOR is None:
+            raise RuntimeError("Scanner is not started (use start or async with)")
+        start = time.perf_counter()
+
+        # Normalize names (names of individuals are capitalized)
+        names = [clean_name(value) for value in values]
+        if len(names) == 2:
+            names = [name.title() for name in names]
+        key = canonical_key(*names)
+        month = month if month is not None else datetime.now().strftime("%B")
+        year = year if year is not None else datetime.now().year
+
+        # Join identical check in flight or start new one
+        flight = (key, month, year)
+        task = self.IN_FLIGHT.get(flight)
+        coalesced = task is not None
+        if coalesced:
+            self.COALESCED += 1
+        else:
+            if len(self.IN_FLIGHT) >= self.MAX_IN_FLIGHT:
+                self.REJECTED += 1
+                raise scanner_busy(f"{len(self.IN_FLIGHT)} checks are in flight")
+            task = asyncio.ensure_future(self.lookup(key, names, month, year))
+            self.IN_FLIGHT[flight] = task
+            task.add_done_callback(lambda done: self.IN_FLIGHT.pop(flight, None))
+
+        # Wait for the result (cancelling one caller does not cancel the check of the others)
+        result, cached = await asyncio.shield(task)
+        return lookup_result(
+            names,
+            key,
+            result.success,
+            result.found,
+            result.path,
+            time.perf_counter() - start,
+            result.attempts,
+            result.error,
+            coalesced,
+            cached
+        )
+
+
+    async def check_individual(self, last_name: str, first_name: str, **kwargs) -> lookup_result:
+        """Checks an individual.
+
+        Args:
+            last_name: last name of the individual
+            first_name: first name of the individual
+            kwargs: month and year (see check)
+
+        Returns:
+            Result of the check
+        """
+        return await self.check(last_name, first_name, **kwargs)
+
+
+    async def check_entity(self, entity: str, **kwargs) -> lookup_result:
+        """Checks an entity.
+
+        Args:
+            entity: name of the entity
+            kwargs: month and year (see check)
+
+        Returns:
+            Result of the check
+        """
+        return await self.check(entity, **kwargs)
+
+
+    def print_summary(self) -> None:
+        """Prints number of lookups, coalesced and rejected checks."""
+        print(f"Lookups: {self.LOOKUPS}, coalesced: {self.COALESCED}, rejected: {self.REJECTED}")
@@ -0,0 +1,234 @@
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from selenium.webdriver.remote.webdriver import WebDriver
+from oigscanner.data.processing import canonical_key
+from oigscanner.interface import interface
+from oigscanner.mock.server import mock_oig_site
+from typing import Callable, Iterable, Optional
+
+
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez"]
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth"]
+ENTITY_WORDS = ["Health", "Care", "Medical", "Pharmacy", "Clinic", "Home", "Services", "Group", "Supply", "Center"]
+
+
+def synthetic_data(
+    rows: int,
+    hit_rate: float = 0.05,
+    entities: bool = False,
+    seed: int = 0
+    ) -> tuple[pd.DataFrame, list]:
+    """Creates roster of unique names and the list of records excluded on the mock site.
+
+    Args:
+        rows: number of rows
+        hit_rate: share of rows that are excluded
+        entities: create entities instead of individuals
+        seed: seed for random names
+
+    Returns:
+        Pandas dataframe in the format of normalize_data_oig and excluded records
+    """
+    generator = random.Random(seed)
+
+    # Make unique names
+    if entities:
+        data = pd.DataFrame({
+            "entity": [f"{generator.choice(ENTITY_WORDS)} {generator.choice(ENTITY_WORDS)} {i}" for i in range(rows)]
+        })
+    else:
+        data = pd.DataFrame({
+            "last name": [f"{generator.choice(LAST_NAMES)}{i}" for i in range(rows)],
+            "first name": [generator.choice(FIRST_NAMES) for i in range(rows)]
+        })
+
+    # Choose excluded records
+    hits = generator.sample(range(rows), int(rows * hit_rate))
+    if entities:
+        excluded = [data.iloc[i, 0] for i in hits]
+    else:
+        excluded = [(data.iloc[i, 0], data.iloc[i, 1]) for i in hits]
+    return data, excluded
+
+
+def benchmark(
+    browser_template: Optional[Callable[[], WebDriver]],
+    rows: int = 100,
+    workers: Iterable[int] = (1, 2, 4),
+    engines: Iterable[str] = ("browser", "http"),
+    schedulers: Iterable[str] = ("queue", "static"),
+    latency: float = 0.05,
+    jitter: float = 0.05,
+    failure_rate: float = 0.0,
+    hit_rate: float = 0.05,
+    entities: bool = False
+    ) -> pd.DataFrame:
+    """Runs interface against the local mock site for every engine, scheduler and number of workers.
+    The http engine saves html snapshots (it needs no browser). Raises AssertionError if a run misses
+    an excluded record or finds one that is not excluded.
+
+    Args:
+        browser_template: function that will return a browser instance
+        rows: number of rows in every run
+        workers: numbers of workers to run with
+        engines: engines to run ("browser", "http")
+        schedulers: schedulers to run ("queue", "static")
+        latency: seconds the mock site waits before every response
+        jitter: maximum random seconds added to the latency
+        failure_rate: share of responses of the mock site that fail
+        hit_rate: share of rows that are excluded
+        entities: scan entities instead of individuals
+
+    Returns:
+        Pandas dataframe with rows/sec, latency percentiles, hits, restarts and scaling of every run
+    """
+
+    # Make data and start mock site
+    data, excluded = synthetic_data(rows, hit_rate, entities)
+    excluded_keys = {canonical_key(record) if entities else canonical_key(*record) for record in excluded}
+    site = mock_oig_site(
+        individuals=[] if entities else excluded,
+        entities=excluded if entities else [],
+        latency=latency,
+        jitter=jitter,
+        failure_rate=failure_rate,
+        seed=0
+    )
+    site.start()
+
+    # Run every configuration in a temporary folder (screenshots are not kept)
+    results = []
+    directory = os.getcwd()
+    try:
+        for engine in engines:
+            for scheduler in schedulers:
+                for number_threads in workers:
+                    with tempfile.TemporaryDirectory() as folder:
+                        os.chdir(folder)
+                        start = time.perf_counter()
+                        stats = interface(
+                            browser_template,
+                            data,
+                            number_threads=number_threads,
+                            engine=engine,
+                            url=site.URL,
+                            scheduler=scheduler,
+                            defer_delay=0.0,
+                            adaptive=False,
+                            evidence_policy="html" if engine == "http" else None
+                        )
+                        wall_time = time.perf_counter() - start
+                        manifest = pd.read_csv("results_manifest.csv")
+                        os.chdir(directory)
+
+                    # Every excluded record that was scanned is found, nothing else is
+                    done = manifest[manifest["status"] == "done"]
+                    found = set(done.loc[done["found"].eq(True), "key"])
+                    missed = (set(done["key"]) & excluded_keys) - found
+                    if missed or found - excluded_keys:
+                        raise AssertionError(
+                            f"{engine} with {number_threads} workers missed {len(missed)} and wrongly found "
+                            f"{len(found - excluded_keys)} excluded records"
+                        )
+
+                    # Collect statistics of the run
+                    durations = np.array([duration for stat in stats for duration in stat.DURATIONS])
+                    results.append({
+                        "engine": engine,
+                        "scheduler": scheduler,
+                        "workers": number_threads,
+                        "rows/sec": len(data) / wall_time,
+                        "p50, s": float(np.percentile(durations, 50)) if len(durations) else 0.0,
+                        "p95, s": float(np.percentile(durations, 95)) if len(durations) else 0.0,
+                        "hits": len(found),
+                        "failed": sum(stat.FAILED for stat in stats),
+                        "restarts": sum(stat.RESTARTS for stat in stats),
+                        "time, s": wall_time
+                    })
+    finally:
+        os.chdir(directory)
+        site.stop()
+
+    # Scaling relative to the smallest number of workers of the same engine and scheduler
+    results = pd.DataFrame(results)
+    baseline = results.groupby(["engine", "scheduler"])["rows/sec"].transform("first")
+    results["scaling"] = results["rows/sec"] / baseline
+
+    # Print and return
+    print("----------------------------BENCHMARK--------------------------------")
+    print(results.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    return results
+
+
+def benchmark_templates(
+    templates: dict[str, Callable[[], WebDriver]],
+    url: Optional[str] = None,
+    loads: int = 10,
+    starts: int = 3
+    ) -> pd.DataFrame:
+    """Measures startup time and page load time of every browser template.
+
+    Args:
+        templates: names and browser templates to measure (for example default and lean firefox)
+        url: page to load, the local mock site if not given (it has no images or fonts,
+            so use the real site to see the effect of blocking them)
+        loads: number of page loads for every template
+        starts: number of browser starts for every template
+
+    Returns:
+        Pandas dataframe with startup and page load percentiles of every template
+    """
+
+    # Start mock site if no page is given
+    site = None
+    if url is None:
+        site = mock_oig_site(seed=0)
+        site.start()
+        url = site.URL
+
+    results = []
+    try:
+        for name, browser_template in templates.items():
+
+            # Measure starts (the last browser is kept for page loads)
+            startups = []
+            browser = None
+            for i in range(starts):
+                if browser is not None:
+                    browser.quit()
+                start = time.perf_counter()
+                browser = browser_template()
+                startups.append(time.perf_counter() - start)
+
+            # Measure page loads
+            load_times = []
+            try:
+                for i in range(loads):
+                    start = time.perf_counter()
+                    browser.get(url)
+                    load_times.append(time.perf_counter() - start)
+            finally:
+                browser.quit()
+
+            results.append({
+                "template": name,
+                "startup p50, s": float(np.percentile(startups, 50)),
+                "startup max, s": float(np.max(startups)),
+                "load p50, s": float(np.percentile(load_times, 50)),
+                "load p95, s": float(np.percentile(load_times, 95))
+            })
+    finally:
+        if site is not None:
+            site.stop()
+
+    # Print and return
+    results = pd.DataFrame(results)
+    print("-----------------------------TEMPLATES---------------------------------")
+    print(results.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    return results
@@ -0,0 +1,240 @@
+import atexit
+import os
+import signal
+import threading
+
+from selenium.webdriver.remote.webdriver import WebDriver
+from typing import Any, Optional
+
+
+# Every started browser that is not quit yet with pids of its driver and browser processes
+LIVE_BROWSERS = {}
+LIVE_BROWSERS_LOCK = threading.Lock()
+
+
+def browser_pids(browser: WebDriver) -> list[int]:
+    """Returns pids of the driver process (geckodriver, chromedriver) and the browser process if they are known.
+
+    Args:
+        browser: webdriver instance
+
+    Returns:
+        Pids of the processes
+    """
+    pids = []
+    process = getattr(getattr(browser, "service", None), "process", None)
+    if process is not None:
+        pids.append(process.pid)
+    capabilities = getattr(browser, "capabilities", None) or {}
+    if capabilities.get("moz:processID"):
+        pids.append(int(capabilities["moz:processID"]))
+    return pids
+
+
+def process_tree(pids: list[int]) -> Optional[list[Any]]:
+    """Returns processes with given pids and all their children.
+
+    Args:
+        pids: pids of the processes
+
+    Returns:
+        Psutil processes, None if psutil is not installed
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    processes = {}
+    for pid in pids:
+        try:
+            process = psutil.Process(pid)
+            processes[process.pid] = process
+            for child in process.children(recursive=True):
+                processes[child.pid] = child
+        except psutil.Error:
+            continue
+    return list(processes.values())
+
+
+def tree_rss(browser: WebDriver) -> Optional[int]:
+    """Returns resident memory of the driver, the browser and all their child processes.
+
+    Args:
+        browser: webdriver instance
+
+    Returns:
+        Memory in bytes, None if it can not be measured (psutil is not installed or pids are not known)
+    """
+    processes = process_tree(browser_pids(browser))
+    if not processes:
+        return None
+    import psutil
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return rss
+
+
+def track(browser: WebDriver) -> None:
+    """Remembers started browser, so it is quit (or its processes are killed) when the program exits.
+
+    Args:
+        browser: webdriver instance
+    """
+    pids = browser_pids(browser)
+    processes = process_tree(pids) or []
+    processes = [process for process in processes if process.pid in pids]
+    with LIVE_BROWSERS_LOCK:
+        LIVE_BROWSERS[id(browser)] = (browser, pids, processes)
+
+
+def untrack(browser: WebDriver) -> None:
+    """Forgets browser that was quit.
+
+    Args:
+        browser: webdriver instance
+    """
+    with LIVE_BROWSERS_LOCK:
+        LIVE_BROWSERS.pop(id(browser), None)
+
+
+def reap() -> int:
+    """Quits every browser that is still open and kills its processes if quitting did not stop them.
+    Called when the program exits.
+
+    Returns:
+        Number of browsers that were still open
+    """
+    with LIVE_BROWSERS_LOCK:
+        browsers = list(LIVE_BROWSERS.values())
+        LIVE_BROWSERS.clear()
+
+    for browser, pids, processes in browsers:
+
+        # Find processes of the browser before quitting it (children are reparented when their parent exits)
+        tree = []
+        for process in processes:
+            try:
+                if process.is_running():
+                    tree.append(process)
+                    tree.extend(process.children(recursive=True))
+            except Exception:
+                continue
+
+        # Quit normally
+        closed = True
+        try:
+            browser.quit()
+        except Exception:
+            closed = False
+
+        # Kill processes that are left (psutil checks that pids were not reused by other programs)
+        if processes:
+            for process in tree:
+                try:
+                    if process.is_running():
+                        process.kill()
+                except Exception:
+                    pass
+        elif not closed:
+            for pid in pids:
+                try:
+                    os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+                except OSError:
+                    pass
+
+    if browsers:
+        print(f"Closed {len(browsers)} browsers left open")
+    return len(browsers)
+
+
+atexit.register(reap)
+
+
+class resource_governor:
+
+    def __init__(
+        self,
+        max_rows: Optional[int] = 500,
+        max_rss_mb: Optional[float] = None,
+        check_every: int = 25
+        ):
+        """Decides when a browser should be recycled before it leaks too much memory:
+        after given number of rows or when its processes use more memory than given.
+
+        Args:
+            max_rows: number of rows after which the browser is recycled, None for no limit
+            max_rss_mb: memory of the driver, the browser and their child processes in MB after which
+                the browser is recycled, None for no limit (needs psutil, raises ImportError if it is not installed)
+            check_every: number of rows between measurements of the memory
+        """
+        self.MAX_ROWS = max_rows
+        self.MAX_RSS = max_rss_mb * 1024 * 1024 if max_rss_mb is not None else None
+        self.CHECK_EVERY = max(check_every, 1)
+
+        # Rows of every scanner since it was started and number of recycles by reason
+        self.ROWS = {}
+        self.RECYCLED = {}
+        self.PEAK_RSS = 0
+        self.LOCK = threading.Lock()
+
+        # Memory is measured only with psutil
+        if self.MAX_RSS is not None and process_tree([]) is None:
+            raise ImportError("Memory limit of browsers requires psutil (pip install oigscanner[memory])")
+
+
+    def count(self, scanner: Any) -> Optional[str]:
+        """Counts processed row of a scanner and checks if its browser should be recycled.
+
+        Args:
+            scanner: oig scanner that processed the row
+
+        Returns:
+            "rows" or "rss" if the browser should be recycled, None if not
+        """
+        with self.LOCK:
+            rows = self.ROWS.get(id(scanner), 0) + 1
+            self.ROWS[id(scanner)] = rows
+
+        # Check number of rows
+        reason = None
+        if self.MAX_ROWS is not None and rows >= self.MAX_ROWS:
+            reason = "rows"
+
+        # Measure memory every few rows
+        elif self.MAX_RSS is not None and rows % self.CHECK_EVERY == 0:
+            rss = tree_rss(scanner.BROWSER)
+            if rss is not None:
+                self.PEAK_RSS = max(self.PEAK_RSS, rss)
+                if rss > self.MAX_RSS:
+                    reason = "rss"
+
+        if reason is not None:
+            with self.LOCK:
+                self.RECYCLED[reason] = self.RECYCLED.get(reason, 0) + 1
+        return reason
+
+
+    def forget(self, scanner: Any) -> None:
+        """Removes counters of a scanner that was quit.
+
+        Args:
+            scanner: oig scanner
+        """
+        with self.LOCK:
+            self.ROWS.pop(id(scanner), None)
+
+
+    def print_summary(self) -> None:
+        """Prints number of recycled browsers."""
+        if not self.RECYCLED:
+            return
+        recycled = ", ".join(f"{reason} {number}" for reason, number in sorted(self.RECYCLED.items()))
+        line = f"Recycled browsers: {recycled}"
+        if self.PEAK_RSS:
+            line += f", peak memory {self.PEAK_RSS / 1024 / 1024:.0f} MB"
+        print(line)
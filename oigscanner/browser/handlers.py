@@ -1,5 +1,6 @@
 import os
-import re
+import time
+import uuid
 import pandas as pd
 
 from selenium.webdriver.remote.webdriver import WebDriver
@@ -7,8 +8,96 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException
-from selenium.common.exceptions import NoSuchWindowException
-from typing import Callable
+from selenium.common.exceptions import JavascriptException
+from oigscanner.browser import governor
+from oigscanner.browser.snapshots import EVIDENCE_POLICIES, snapshot_path, write_snapshot
+from oigscanner.control import token_bucket
+from oigscanner.data.evidence import evidence_store
+from oigscanner.data.manifest import PATH_INDEX, shard_path
+from oigscanner.logs import run_log, create_text_log_entry, NULL_LOG
+from oigscanner.metrics import metrics, stopwatch, timed, NULL_METRICS
+from oigscanner.recovery import LADDER, backoff_delay, circuit_breaker, classify, next_step, record_failure
+from oigscanner.results import scan_result
+from typing import Callable, Optional
+
+
+# Fills the search fields, checks their values and presses the search button (after the script returns),
+# the page that is left keeps the token of the navigation if given
+FILL_AND_SUBMIT_SCRIPT = """
+var fields = arguments[0];
+var button = document.getElementsByName(arguments[1])[0];
+if (!button) {
+    return false;
+}
+for (var name in fields) {
+    var element = document.getElementsByName(name)[0];
+    if (!element) {
+        return false;
+    }
+    element.focus();
+    element.value = fields[name];
+    element.dispatchEvent(new Event("input", {bubbles: true}));
+    element.dispatchEvent(new Event("change", {bubbles: true}));
+}
+for (var name in fields) {
+    if (document.getElementsByName(name)[0].value !== fields[name]) {
+        return false;
+    }
+}
+var token = arguments[2];
+setTimeout(function () { window.oigscannerNavigation = token; button.click(); }, 0);
+return true;
+"""
+
+# Returns null until the results page is loaded, then "empty" or "found" (a page that keeps the token of the
+# navigation is the page that was left, for example results of the previous search)
+RESULTS_SCRIPT = """
+if (document.readyState === "loading" || !document.getElementById("SP")) {
+    return null;
+}
+if (arguments[0] && window.oigscannerNavigation === arguments[0]) {
+    return null;
+}
+return document.getElementById("ctl00_cpExclusions_pnlEmpty") ? "empty" : "found";
+"""
+
+
+class page_not_loaded(Exception):
+    """Raised when the search page or the results page did not load correctly."""
+
+
+def screenshot_path(
+    names: list[str],
+    month: str,
+    year: int,
+    found: bool,
+    shard: bool = False
+    ) -> str:
+    """Creates path of a screenshot for an individual or entity.
+
+    Args:
+        names: last name and first name or entity name
+        month: month to append to the name of the screenshot
+        year: year to append to the name of the screenshot
+        found: True if record was found (appends CHECK to the name)
+        shard: put the screenshot into a subfolder named by its first letter
+
+    Returns:
+        Path of the screenshot
+    """
+
+    # Choose folder for individuals or entities
+    folder = "screenshots_individuals" if len(names) == 2 else "screenshots_entities"
+
+    # Create screenshot path
+    path_screenshot = f"{folder}/{' '.join(str(name) for name in names)} OIG {str(month)} {str(year)}"
+    path_screenshot = path_screenshot.strip()
+    if found:
+        path_screenshot += " CHECK"
+    path_screenshot += ".png"
+    if shard:
+        path_screenshot = shard_path(path_screenshot)
+    return path_screenshot
 
 
 class browser_wrapper:
@@ -17,7 +106,10 @@ class browser_wrapper:
         self,
         browser_template: Callable[[], WebDriver],
         wait_time: int = 10,
-        timeout: int = 20
+        timeout: int = 20,
+        metrics: Optional[metrics] = None,
+        evidence: Optional[evidence_store] = None,
+        log: Optional[run_log] = None
         ):
         """Set reference to an instance of a webdriver. Set time to wait for an html element. Set timout.
 
@@ -25,27 +117,34 @@ class browser_wrapper:
             browser_template: webdriver template
             wait_time: time to wait for an element to be found
             timout: time to wait if nothing is happening
+            metrics: metrics to record timings of every step to, None to not record
+            evidence: store that writes screenshots in the background, None to write them directly
+            log: structured log of the run, None to not log
         """
 
-        # Set browser template, wait time, timeout
+        # Set browser template, wait time, timeout, metrics, log
         self.BROWSER_TEMPLATE = browser_template
         self.WAIT_TIME = wait_time
         self.TIMEOUT = timeout
+        self.METRICS = metrics if metrics is not None else NULL_METRICS
+        self.EVIDENCE_STORE = evidence
+        self.LOG = log if log is not None else NULL_LOG
 
         # Create browser
         self.create_browser()
 
 
-    def __del__(self) -> None:
-        """Closes webdriver instance."""
-        self.BROWSER.quit()
+    def activate(self) -> None:
+        """Makes the browser ready for commands of the current thread (needed by tabs of a shared browser)."""
 
 
+    @timed("browser.create_browser")
     def create_browser(self) -> None:
         """Creates an instance of a webdriver with given options"""
 
-        # Set browser
+        # Set browser (quit when the program exits if it is not quit before)
         self.BROWSER = self.BROWSER_TEMPLATE()
+        governor.track(self.BROWSER)
 
         # Set wait time
         self.WAIT = WebDriverWait(self.BROWSER, self.WAIT_TIME)
@@ -54,11 +153,16 @@ class browser_wrapper:
         self.BROWSER.set_page_load_timeout(self.TIMEOUT)
 
 
+    @timed("browser.quit")
     def quit(self) -> None:
         "Close browser thus quitting webdriver."
-        self.BROWSER.quit()
+        try:
+            self.BROWSER.quit()
+        finally:
+            governor.untrack(self.BROWSER)
 
     
+    @timed("browser.get")
     def get(self, page: str) -> None:
         """Opens with the browser given page.
         
@@ -68,6 +172,7 @@ class browser_wrapper:
         self.BROWSER.get(page)
 
 
+    @timed("browser.back")
     def back(self) -> None:
         "Goes back to the previous page."
         self.BROWSER.back()
@@ -79,12 +184,10 @@ class browser_wrapper:
         Args:
             entry: string to write into log file
         """
-
-        log_file_name = "logs.txt"
-        with open(log_file_name, "a+", encoding="utf-8") as log:
-            log.write(entry)
+        create_text_log_entry(entry)
 
 
+    @timed("browser.check_exists")
     def check_exists(
         self,
         element_name: str,
@@ -107,6 +210,7 @@ class browser_wrapper:
         return True
 
 
+    @timed("browser.enter_value")
     def enter_value(
         self,
         element_name: str,
@@ -130,6 +234,7 @@ class browser_wrapper:
         element.send_keys(value)
 
 
+    @timed("browser.click_when_clickable")
     def click_when_clickable(
         self,
         element_name: str,
@@ -149,6 +254,43 @@ class browser_wrapper:
         element.click()
 
 
+    @timed("browser.fill_and_submit")
+    def fill_and_submit(self, fields: dict[str, str], button_name: str, token: Optional[str] = None) -> bool:
+        """Enters values into the fields, checks them and presses the button with one script.
+
+        Args:
+            fields: names of the fields and values to enter
+            button_name: name of the button to press
+            token: token of the navigation left on the page (to know that it was submitted), None for no token
+
+        Returns:
+            True if values were entered correctly and the button was pressed, otherwise false
+        """
+        return bool(self.BROWSER.execute_script(FILL_AND_SUBMIT_SCRIPT, fields, button_name, token))
+
+
+    @timed("browser.wait_for_script")
+    def wait_for_script(self, script: str, poll_frequency: float = 0.05, *args: object) -> object:
+        """Runs the script until it returns a value that is not empty.
+
+        Args:
+            script: javascript code that returns a value
+            poll_frequency: time between the runs of the script
+            args: arguments of the script
+
+        Returns:
+            Value returned by the script
+        """
+        wait = WebDriverWait(
+            self.BROWSER,
+            self.WAIT_TIME,
+            poll_frequency=poll_frequency,
+            ignored_exceptions=(JavascriptException,)
+        )
+        return wait.until(lambda browser: browser.execute_script(script, *args))
+
+
+    @timed("browser.take_screenshot")
     def take_screenshot(
         self,
         element_name: str,
@@ -166,8 +308,30 @@ class browser_wrapper:
         # Find
         element = self.WAIT.until(EC.visibility_of_element_located((attribute, element_name)))   
 
-        # Take a screenshot
-        element.screenshot(path_screenshot)
+        # Take a screenshot (write it in the background if there is an evidence store)
+        if self.EVIDENCE_STORE is not None:
+            self.EVIDENCE_STORE.put(element.screenshot_as_png, path_screenshot)
+        else:
+            element.screenshot(path_screenshot)
+
+
+    @timed("browser.take_snapshot")
+    def take_snapshot(
+        self,
+        element_name: str,
+        attribute: str,
+        path_snapshot: str
+        ) -> None:
+        """Saves html of the page once the element is visible, so it can be rendered later.
+
+        Args:
+            element_name: name of an html element
+            attribute: specifies html attribute
+            path_snapshot: path of the html snapshot
+        """
+        self.WAIT.until(EC.visibility_of_element_located((attribute, element_name)))
+        html = self.BROWSER.execute_script("return document.documentElement.outerHTML;")
+        write_snapshot(html, self.BROWSER.current_url, path_snapshot)
 
 
     def find_unique_path_screenshot(self, path_screenshot: str) -> str:
@@ -177,33 +341,11 @@ class browser_wrapper:
             path_screenshot: path of a screenshot
 
         Returns:
-            Unique screenshot path if found, False if not
+            Unique screenshot path
         """
 
-        # Number to append to copy
-        i = 1
-
-        # Search for duplicates
-        while os.path.isfile(path_screenshot):
-
-            # Remove file format
-            path_screenshot = path_screenshot.removesuffix(".png")
-
-            # Remove brackets with numbers
-            pattern = r"\(\d*?\)"
-            path_screenshot = re.sub(pattern, "", path_screenshot)
-
-            # Remove white space
-            path_screenshot = path_screenshot.strip()
-            
-            # Make new name
-            path_screenshot += "(" + str(i) + ")"
-            path_screenshot += ".png"
-
-            # Increase copy counter
-            i +=1
-
-        return path_screenshot
+        # Names are reserved in memory, the folder is listed only once
+        return PATH_INDEX.reserve(path_screenshot)
 
 
 class oig_scanner(browser_wrapper):
@@ -213,6 +355,15 @@ class oig_scanner(browser_wrapper):
         browser_template: Callable[[], WebDriver],
         wait_time: int = 10,
         timeout: int = 20,
+        url: str = "https://exclusions.oig.hhs.gov",
+        metrics: Optional[metrics] = None,
+        fast_path: bool = True,
+        evidence: Optional[evidence_store] = None,
+        log: Optional[run_log] = None,
+        breaker: Optional[circuit_breaker] = None,
+        shard: bool = False,
+        evidence_policy: str = "all",
+        limiter: Optional[token_bucket] = None
         ):
         """Opens the browser and gets the oig exclusions site.
         
@@ -220,206 +371,329 @@ class oig_scanner(browser_wrapper):
             browser_template: webdriver template
             wait_time: time to wait for an element to be found
             timout: time to wait if nothing is happening
+            url: URL of the oig exclusions site
+            metrics: metrics to record timings of every step to, None to not record
+            fast_path: fill and submit the search form with one script (falls back to step by step)
+            evidence: store that writes screenshots in the background, None to write them directly
+            log: structured log of the run, None to not log
+            breaker: circuit breaker shared by workers that pauses them when the site is failing
+            shard: put screenshots into subfolders named by their first letter
+            evidence_policy: "all" - screenshot of every row, "hits" - screenshots only of found records,
+                "html" - html snapshot of every row (rendered later with render_snapshots), "none" - no evidence
+            limiter: limit of requests to the site per second shared by workers (every page load and search
+                is counted, retries included), None for no limit
         """
 
+        # Set url of the site, search mode, circuit breaker, screenshot folders, evidence policy and rate limit
+        if evidence_policy not in EVIDENCE_POLICIES:
+            raise ValueError(f"Unknown evidence policy: {evidence_policy}")
+        self.URL = url
+        self.FAST_PATH = fast_path
+        self.BREAKER = breaker
+        self.SHARD = shard
+        self.EVIDENCE_POLICY = evidence_policy
+        self.LIMITER = limiter if limiter is not None else token_bucket()
+
+        # Search form opened in the browser ("individuals" or "entities"), None if not known
+        self.FORM = None
+
         # Initialize using parent (browser_wrapper)
-        super().__init__(browser_template, wait_time, timeout)
+        super().__init__(browser_template, wait_time, timeout, metrics, evidence, log)
 
 
     def get_individuals_page(self) -> None:
         """Gets first page of oig exclusions site."""
-        self.get("https://exclusions.oig.hhs.gov")
+        self.FORM = None
+        self.LIMITER.acquire()
+        self.get(self.URL)
+        self.FORM = "individuals"
 
 
     def get_entities_page(self) -> None:
         """Gets first page of oig exclusions site and sets searching for entities."""
-        self.get("https://exclusions.oig.hhs.gov")
+        self.FORM = None
+        self.LIMITER.acquire()
+        self.get(self.URL)
+        self.LIMITER.acquire()
         self.click_when_clickable("ctl00_cpExclusions_Linkbutton1", By.ID)
+        self.FORM = "entities"
+
+
+    def recover(self, step: int, get_page: Callable[[], None]) -> int:
+        """Recovers the browser with given step of the recovery ladder: "refind" - elements are found again
+        on the next try, "renavigate" - opens the search page, "reset" - clears the session cookies and opens
+        the search page, "relaunch" - restarts the browser. Goes up the ladder if the step fails.
+
+        Args:
+            step: index of the step in LADDER
+            get_page: function that opens the search page
+
+        Returns:
+            Index of the step that recovered the browser
+        """
+        while True:
+            name = LADDER[step]
+            self.METRICS.count(f"recovery.{name}")
+
+            # Restart the browser (the search page is opened again on the next try if it fails here)
+            if name == "relaunch":
+                try:
+                    self.quit()
+                except Exception:
+                    pass
+                self.FORM = None
+                self.create_browser()
+                self.METRICS.count("restarts")
+                try:
+                    get_page()
+                except Exception as e:
+                    print(str(e))
+                return step
+
+            # Clear the session and open the search page
+            try:
+                if name == "reset":
+                    self.BROWSER.delete_all_cookies()
+                if name != "refind":
+                    get_page()
+                return step
+            except Exception as e:
+                print(str(e))
+                step += 1
+
+
+    def search_step_by_step(self, fields: dict[str, str], phases: stopwatch) -> Optional[bool]:
+        """Enters values into the search form field by field, presses the search button and checks results.
+
+        Args:
+            fields: names of the search fields and values to enter
+            phases: stopwatch to record phases of the search
+
+        Returns:
+            True if found, False if not, None if the page did not load correctly
+        """
+
+        # Check if page loaded correctly
+        exists_fields = [self.check_exists(name, By.NAME) for name in fields]
+        if not all(exists_fields):
+            return None
+        phases.lap("check_page")
+
+        # Enter values
+        for name, value in fields.items():
+            self.enter_value(name, By.NAME, value)
+
+        # Check if fields are not empty and values are correct
+        for name, value in fields.items():
+            if self.BROWSER.find_element(By.NAME, name).get_attribute("value") != value:
+                return None
+        phases.lap("fill")
+
+        # Find and press the search button
+        self.click_when_clickable("ctl00$cpExclusions$ibSearchSP", By.NAME)
+
+        # Check if next page loaded
+        next_page = self.check_exists("SP", By.ID)
+        if (not next_page):
+            return None
+
+        # Check if results were found or not
+        return not self.check_exists("ctl00_cpExclusions_pnlEmpty", By.ID)
+
+
+    def search_fast(self, fields: dict[str, str], phases: stopwatch) -> Optional[bool]:
+        """Enters values, checks them and submits the search form with one script,
+        then waits for the results page and checks results with one condition.
+
+        Args:
+            fields: names of the search fields and values to enter
+            phases: stopwatch to record phases of the search
+
+        Returns:
+            True if found, False if not, None if the page did not load correctly
+        """
+
+        # Fill and submit the form (the page that is left keeps the token of this search)
+        token = uuid.uuid4().hex
+        if not self.fill_and_submit(fields, "ctl00$cpExclusions$ibSearchSP", token):
+            return None
+        phases.lap("fill")
+
+        # Wait for the results page of this search and check if results were found
+        return self.wait_for_script(RESULTS_SCRIPT, 0.05, token) == "found"
 
 
     def take_oig_screenshot(
         self,
         data: pd.Series,
         month: str,
-        year: int
-        ) -> None:
+        year: int,
+        attempts: int = 5,
+        policy: Optional[str] = None
+        ) -> scan_result:
         """Takes a screenshot of an individual or entity page.
 
         Args:
             data: last name and first name or entity name in pandas series.
             month: month to append to the name of the screenshot
             year: year to append to the name of the screenshot
+            attempts: number of tries before the row is reported as failed
+            policy: evidence policy for this row, evidence policy of the scanner if not given
+
+        Returns:
+            Result of the scan (true if able to take screenshot, otherwise false)
         """
 
-        def individual_take_screenshot(last_name: str, first_name: str) -> None:
-            """Helper function that takes a screenshot of an individual.
-            
+        def search_take_screenshot(
+            names: list[str],
+            fields: dict[str, str],
+            form: str,
+            get_page: Callable[[], None]
+            ) -> scan_result:
+            """Helper function that searches an individual or entity and takes a screenshot.
+
             Args:
-                last_name: last name of the individual.
-                first_name: first name of the individual
-            """
+                names: last name and first name or entity name
+                fields: names of the search fields and values to enter
+                form: search form of the row ("individuals" or "entities")
+                get_page: function that opens the search page
 
-            # Print individual
-            print(f"{last_name} , {first_name}")
+            Returns:
+                Result of the scan (true if able to take screenshot, otherwise false)
+            """
 
-            # Try to make a screenshot (5 tries for if something wrong)
-            for i in range(5):
+            # Print individual or entity
+            print(" , ".join(names))
 
+            # Open the search form of the row if the other one (or no form) is opened, so the first try does not fail
+            if self.FORM != form:
                 try:
-                    # Check if page loaded correctly
-                    exists_last_name = self.check_exists("ctl00$cpExclusions$txtSPLastName", By.NAME)
-                    exists_first_name = self.check_exists("ctl00$cpExclusions$txtSPFirstName", By.NAME)
-                    if not exists_last_name or not exists_first_name:
-                        self.get_individuals_page()
-                        continue
-
-                    # Enter last name and first name
-                    self.enter_value("ctl00$cpExclusions$txtSPLastName", By.NAME, last_name)
-                    self.enter_value("ctl00$cpExclusions$txtSPFirstName", By.NAME, first_name)
-
-                    # Check if fields are not empty and values are correct
-                    last_name_field = self.BROWSER.find_element(By.NAME, "ctl00$cpExclusions$txtSPLastName").get_attribute("value")
-                    first_name_field = self.BROWSER.find_element(By.NAME, "ctl00$cpExclusions$txtSPFirstName").get_attribute("value")
-                    if last_name_field != last_name or first_name_field != first_name:
-                        self.get_individuals_page()
-                        continue
-
-                    # Find and press the search button
-                    self.click_when_clickable("ctl00$cpExclusions$ibSearchSP", By.NAME)
-
-                    # Check if next page loaded
-                    next_page = self.check_exists("SP", By.ID)
-                    if (not next_page):
-                        self.get_individuals_page()
-                        continue
-                    
-                    # Check if results were found for the individual or not
-                    check = self.check_exists("ctl00_cpExclusions_pnlEmpty", By.ID)
-                    
-                    # Check if folder exists for screenshots and create it if needed
-                    if (os.path.exists("screenshots_individuals/") == False):
-                        os.makedirs("screenshots_individuals")
-                    
-                    # Create screenshot path
-                    path_screenshot = f"screenshots_individuals/{str(last_name)} {str(first_name)} OIG {str(month)} {str(year)}"
-                    path_screenshot = path_screenshot.strip()
-                    if not check:
-                        path_screenshot += " CHECK"
-                    path_screenshot += ".png"
-
-                    # Find unique screenshot path and make a screenshot
-                    unique_path_screenshot = self.find_unique_path_screenshot(path_screenshot)
-                    self.take_screenshot("content", By.ID, unique_path_screenshot)
-                    
-                    # Return to the search page
-                    self.back()
-
-                    # Exit loop
-                    break
-
+                    get_page()
                 except Exception as e:
-                    print("-------------------------EXCEPTION OCCURED-----------------------------")
                     print(str(e))
-                    print("---------------------------TRYING AGAIN--------------------------------")
-                    try:
-                        self.quit()
-                    except NoSuchWindowException:
-                        pass
-                    self.create_browser()
 
-            else:
-                log_entry = f"Failed for - {last_name} {first_name}\n"
-                print(log_entry)
-                self.create_log_entry(log_entry)
-
-
-        def entity_take_screenshot(entity: str) -> None:
-            """Helper function that takes a screenshot of an entity given its name.
-
-            Args:
-                entity: name of the entity
-
-            Returns:
-                True if able to take screenshot, otherwise false
-            """
-
-            # Print entity
-            print(entity)
-
-            # Try to make a screenshot (5 tries for if something wrong)
-            for i in range(5):
+            # Try to make a screenshot (several tries for if something wrong)
+            restarts = 0
+            error = None
+            step = -1
+            recoveries = {}
+            fast = self.FAST_PATH
+            for i in range(attempts):
+
+                # Count retries and measure phases of the attempt
+                if i > 0:
+                    self.METRICS.count("retries")
+                if self.BREAKER is not None:
+                    self.BREAKER.wait()
+                phases = self.METRICS.phases("take_oig_screenshot")
+                started = time.perf_counter()
 
                 try:
-                    # Check if page loaded correctly
-                    exists_entity = self.check_exists("ctl00$cpExclusions$txtSBName", By.NAME)
-                    if not exists_entity:
-                        self.get_entities_page()
-                        continue
-
-                    # Enter entity name
-                    self.enter_value("ctl00$cpExclusions$txtSBName", By.NAME, entity)
-
-                    # Check if fields are not empty
-                    entity_field = self.BROWSER.find_element(By.NAME, "ctl00$cpExclusions$txtSBName").get_attribute("value")
-                    if entity_field != entity:
-                        self.get_entities_page()
-                        continue
-                    
-                    # Find and press the search button
-                    self.click_when_clickable("ctl00$cpExclusions$ibSearchSP", By.NAME)
-
-                    # Check if next page loaded
-                    next_page = self.check_exists("SP", By.ID)
-                    if (not next_page):
-                        self.get_entities_page()
-                        continue
-                    
-                    # Check if results were found for the entity or not
-                    check = self.check_exists("ctl00_cpExclusions_pnlEmpty", By.ID)
-                    
-                    # Check if folder exists for screenshots and create it if needed
-                    if (os.path.exists("screenshots_entities/") == False):
-                        os.makedirs("screenshots_entities")
-                    
-                    # Create screenshot path
-                    path_screenshot = f"screenshots_entities/{str(entity)} OIG {str(month)} {str(year)}"
-                    path_screenshot = path_screenshot.strip()
-                    if not check:
-                        path_screenshot += " CHECK"
-                    path_screenshot += ".png"
-
-                    # Find unique screenshot path and make a screenshot
-                    unique_path_screenshot = self.find_unique_path_screenshot(path_screenshot)
-                    self.take_screenshot("content", By.ID, unique_path_screenshot)
-                    
+                    # Search with one script, or step by step if it failed before (waits if requests are limited)
+                    self.LIMITER.acquire()
+                    if fast:
+                        found = self.search_fast(fields, phases)
+                    else:
+                        found = self.search_step_by_step(fields, phases)
+
+                    # Page did not load correctly, recover it below
+                    if found is None:
+                        raise page_not_loaded("Search page did not load correctly")
+                    phases.lap("search")
+
+                    # Save evidence: screenshot, html snapshot to render later, or nothing
+                    unique_path_screenshot = None
+                    if evidence_policy in ("all", "html") or (evidence_policy == "hits" and found):
+
+                        # Create screenshot path and folder for it
+                        path_screenshot = screenshot_path(names, month, year, found, self.SHARD)
+                        os.makedirs(os.path.dirname(path_screenshot), exist_ok=True)
+
+                        # Find unique path (with the extension of the file that is written) and make a screenshot (or a snapshot)
+                        if evidence_policy == "html":
+                            unique_path_screenshot = self.find_unique_path_screenshot(snapshot_path(path_screenshot))
+                            self.take_snapshot("content", By.ID, unique_path_screenshot)
+                        else:
+                            unique_path_screenshot = self.find_unique_path_screenshot(path_screenshot)
+                            self.take_screenshot("content", By.ID, unique_path_screenshot)
+                    phases.lap("screenshot")
+
                     # Return to the search page
                     self.back()
+                    phases.lap("back")
 
-                    # Exit the loop
-                    break
+                    # Exit loop
+                    if self.BREAKER is not None:
+                        self.BREAKER.success()
+                    return scan_result(True, found, unique_path_screenshot, i + 1, restarts, recoveries=recoveries)
 
                 except Exception as e:
                     print("-------------------------EXCEPTION OCCURED-----------------------------")
                     print(str(e))
                     print("---------------------------TRYING AGAIN--------------------------------")
-                    try:
-                        self.quit()
-                    except NoSuchWindowException:
-                        pass
-                    self.create_browser()
-
-            else:
-                log_entry = f"Failed for - {entity}\n"
-                print(log_entry)
-                self.create_log_entry(log_entry)
 
+                    # Classify the error and choose recovery step
+                    error = type(e).__name__
+                    kind = classify(e)
+                    step = next_step(kind, step)
+                    record_failure(self.BREAKER, kind)
+                    self.LOG.log(
+                        "attempt_failed",
+                        key=" ".join(names),
+                        attempt=i + 1,
+                        error=error,
+                        kind=kind,
+                        recovery=LADDER[step],
+                        message=str(e).strip()[:500],
+                        duration=round(time.perf_counter() - started, 3),
+                        fast_path=fast
+                    )
+
+                    # Use step by step search for the next tries
+                    if fast and kind != "site":
+                        self.METRICS.count("fast_path_fallbacks")
+                        fast = False
+
+                    # Do not recover after the last try
+                    if i == attempts - 1:
+                        break
+
+                    # Wait before trying again and recover
+                    time.sleep(backoff_delay(i))
+                    step = self.recover(step, get_page)
+                    recoveries[LADDER[step]] = recoveries.get(LADDER[step], 0) + 1
+                    if LADDER[step] == "relaunch":
+                        restarts += 1
+
+            log_entry = f"Failed for - {' '.join(names)}\n"
+            print(log_entry)
+            self.create_log_entry(log_entry)
+            self.METRICS.count("failures")
+            return scan_result(False, attempts=attempts, restarts=restarts, error=error, recoveries=recoveries)
+
+
+        # Evidence policy of this row
+        evidence_policy = policy if policy is not None else self.EVIDENCE_POLICY
+        if evidence_policy not in EVIDENCE_POLICIES:
+            raise ValueError(f"Unknown evidence policy: {evidence_policy}")
 
         # Take a screenshot of either an entitiy or an individual
         data_len = len(data)
         if data_len == 1:
             entity = data.iloc[0]
-            entity_take_screenshot(entity)
+            return search_take_screenshot(
+                [entity],
+                {"ctl00$cpExclusions$txtSBName": entity},
+                "entities",
+                self.get_entities_page
+            )
         elif data_len == 2:
             last_name = data.iloc[0]
             first_name = data.iloc[1]
-            individual_take_screenshot(last_name, first_name)
\ No newline at end of file
+            return search_take_screenshot(
+                [last_name, first_name],
+                {"ctl00$cpExclusions$txtSPLastName": last_name, "ctl00$cpExclusions$txtSPFirstName": first_name},
+                "individuals",
+                self.get_individuals_page
+            )
+        return scan_result(False)
@@ -0,0 +1,301 @@
+import queue
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from selenium.webdriver.remote.webdriver import WebDriver
+from oigscanner.browser.governor import resource_governor
+from oigscanner.browser.handlers import oig_scanner
+from oigscanner.browser.tabs import oig_tab, tab_browser
+from oigscanner.control import token_bucket
+from oigscanner.data.evidence import evidence_store
+from oigscanner.logs import run_log
+from oigscanner.metrics import metrics, NULL_METRICS
+from oigscanner.recovery import circuit_breaker
+from typing import Callable, Iterator, Optional
+
+
+class browser_pool:
+
+    def __init__(
+        self,
+        browser_template: Callable[[], WebDriver],
+        size: int = 1,
+        wait_time: int = 10,
+        timeout: int = 20,
+        url: str = "https://exclusions.oig.hhs.gov",
+        metrics: Optional[metrics] = None,
+        fast_path: bool = True,
+        evidence: Optional[evidence_store] = None,
+        log: Optional[run_log] = None,
+        breaker: Optional[circuit_breaker] = None,
+        shard: bool = False,
+        evidence_policy: str = "all",
+        tabs: int = 1,
+        governor: Optional[resource_governor] = None,
+        limiter: Optional[token_bucket] = None
+        ):
+        """Launches given number of oig scanners in parallel and keeps them ready to be leased.
+        Can be used for several interface calls, so browsers are started only once.
+
+        Args:
+            browser_template: webdriver template
+            size: number of browsers in the pool
+            wait_time: time to wait for an element to be found
+            timeout: time to wait if nothing is happening
+            url: URL of the oig exclusions site
+            metrics: metrics to record timings of every step to, None to not record
+            fast_path: fill and submit the search form with one script (falls back to step by step)
+            evidence: store that writes screenshots in the background, None to write them directly
+            log: structured log of the run, None to not log
+            breaker: circuit breaker shared by every scanner of the pool
+            shard: put screenshots into subfolders named by their first letter
+            evidence_policy: "all", "hits", "html" or "none" (see oig_scanner)
+            tabs: number of scanners sharing one browser, each in its own tab (fewer browsers for the same size)
+            governor: governor that decides when a browser is recycled (by rows or memory), None to recycle
+                only broken browsers (tabs are not recycled)
+            limiter: limit of requests to the site per second shared by every scanner of the pool, None for no limit
+        """
+
+        # Set browser template, wait time, timeout, url, size, metrics
+        self.BROWSER_TEMPLATE = browser_template
+        self.WAIT_TIME = wait_time
+        self.TIMEOUT = timeout
+        self.URL = url
+        self.SIZE = size
+        self.METRICS = metrics if metrics is not None else NULL_METRICS
+        self.FAST_PATH = fast_path
+        self.EVIDENCE = evidence
+        self.LOG = log
+        self.BREAKER = breaker
+        self.SHARD = shard
+        self.EVIDENCE_POLICY = evidence_policy
+        self.TABS = max(tabs, 1)
+        self.GOVERNOR = governor
+        self.LIMITER = limiter
+
+        # Ready to lease scanners and every scanner of the pool
+        self.IDLE = queue.Queue()
+        self.SCANNERS = []
+        self.LOCK = threading.Lock()
+        self.CLOSED = False
+
+        # Scanners to recycle with launches of their replacements
+        self.RETIRING = {}
+
+        # Launch browsers in parallel (also used to replace broken browsers in the background)
+        self.EXECUTOR = ThreadPoolExecutor(max_workers=size, thread_name_prefix="browser_pool")
+        if self.TABS > 1:
+            launches = [
+                self.EXECUTOR.submit(self.launch_tabs, min(self.TABS, size - i))
+                for i in range(0, size, self.TABS)
+            ]
+        else:
+            launches = [self.EXECUTOR.submit(self.launch) for i in range(size)]
+        for launch in launches:
+            launch.result()
+
+
+    def __enter__(self) -> "browser_pool":
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+    def launch_tabs(self, tabs: int) -> None:
+        """Starts one browser and puts a scanner for every its tab into the pool.
+
+        Args:
+            tabs: number of tabs
+        """
+        browser = tab_browser(self.BROWSER_TEMPLATE, self.TIMEOUT)
+        for index in range(tabs):
+            self.launch(browser, index)
+
+
+    def launch(self, browser: Optional[tab_browser] = None, index: int = 0) -> None:
+        """Creates new oig scanner, opens the search page and puts scanner into the pool (scanners open the
+        entities form themselves before the first entity).
+
+        Args:
+            browser: shared browser to open the scanner in a tab of, None to start its own browser
+            index: index of the tab
+        """
+        if browser is not None:
+            scanner = oig_tab(browser, index, self.WAIT_TIME, self.TIMEOUT, self.URL, self.METRICS, self.FAST_PATH, self.EVIDENCE, self.LOG, self.BREAKER, self.SHARD, self.EVIDENCE_POLICY, self.LIMITER)
+        else:
+            scanner = oig_scanner(self.BROWSER_TEMPLATE, self.WAIT_TIME, self.TIMEOUT, self.URL, self.METRICS, self.FAST_PATH, self.EVIDENCE, self.LOG, self.BREAKER, self.SHARD, self.EVIDENCE_POLICY, self.LIMITER)
+        try:
+            scanner.get_individuals_page()
+        except Exception as e:
+            print(str(e))
+
+        with self.LOCK:
+            if self.CLOSED:
+                scanner.quit()
+                return
+            self.SCANNERS.append(scanner)
+        self.IDLE.put(scanner)
+
+
+    def healthy(self, scanner: oig_scanner) -> bool:
+        """Checks if the browser window is alive. If the site is not opened, the search form is opened by the
+        scanner before the next row (the form of the row, individuals or entities).
+
+        Args:
+            scanner: oig scanner to check
+
+        Returns:
+            True if scanner can be used, False if it should be replaced
+        """
+        try:
+            scanner.activate()
+            if not scanner.BROWSER.window_handles:
+                return False
+            if not scanner.BROWSER.current_url.startswith(self.URL):
+                scanner.FORM = None
+            return True
+        except Exception:
+            return False
+
+
+    def replace(self, scanner: oig_scanner) -> None:
+        """Quits broken scanner and launches new one in the background.
+
+        Args:
+            scanner: broken oig scanner
+        """
+
+        def relaunch() -> None:
+            """Helper function that quits broken scanner and launches new one."""
+            try:
+                scanner.quit()
+            except Exception:
+                pass
+
+            # Try to launch new scanner, in a new tab of the same browser for tabs (3 tries for if something wrong)
+            for i in range(3):
+                try:
+                    if isinstance(scanner, oig_tab):
+                        self.launch(scanner.TAB_BROWSER, scanner.INDEX)
+                    else:
+                        self.launch()
+                    return
+                except Exception as e:
+                    print(str(e))
+            print("Failed to replace browser in the pool")
+
+        # Counters of the broken scanner are not needed anymore
+        if self.GOVERNOR is not None:
+            self.GOVERNOR.forget(scanner)
+
+        with self.LOCK:
+            if scanner in self.SCANNERS:
+                self.SCANNERS.remove(scanner)
+            if self.CLOSED:
+                return
+        self.METRICS.count("pool.replacements")
+        self.EXECUTOR.submit(relaunch)
+
+
+    def lease(self) -> oig_scanner:
+        """Takes healthy scanner from the pool. Waits if every scanner is leased.
+
+        Returns:
+            Oig scanner
+        """
+        while True:
+            scanner = self.IDLE.get()
+            if self.healthy(scanner):
+                return scanner
+            self.replace(scanner)
+
+
+    def release(self, scanner: oig_scanner) -> None:
+        """Returns leased scanner to the pool.
+
+        Args:
+            scanner: leased oig scanner
+        """
+        self.IDLE.put(scanner)
+
+
+    def checkpoint(self, scanner: oig_scanner) -> oig_scanner:
+        """Called by the leaseholder after every row. When the governor decides that the browser should be
+        recycled, its replacement is launched in the background while the old one keeps working. Once the
+        replacement is ready, the old scanner is quit in the background and a ready one is leased instead.
+
+        Args:
+            scanner: leased oig scanner
+
+        Returns:
+            Oig scanner to use for the next row
+        """
+        if self.GOVERNOR is None or isinstance(scanner, oig_tab):
+            return scanner
+
+        # Replacement is ready, quit the old scanner and take a ready one
+        with self.LOCK:
+            replacement = self.RETIRING.get(scanner)
+        if replacement is not None:
+            if not replacement.done():
+                return scanner
+
+            # Keep the old scanner if replacement failed to launch (it is recycled again later)
+            if replacement.exception() is not None:
+                print(str(replacement.exception()))
+                with self.LOCK:
+                    del self.RETIRING[scanner]
+                self.GOVERNOR.forget(scanner)
+                return scanner
+
+            with self.LOCK:
+                del self.RETIRING[scanner]
+                if scanner in self.SCANNERS:
+                    self.SCANNERS.remove(scanner)
+                closed = self.CLOSED
+            self.GOVERNOR.forget(scanner)
+            if closed:
+                return scanner
+            self.EXECUTOR.submit(scanner.quit)
+            return self.lease()
+
+        # Launch replacement if the browser should be recycled
+        reason = self.GOVERNOR.count(scanner)
+        if reason is not None:
+            with self.LOCK:
+                if self.CLOSED:
+                    return scanner
+                self.RETIRING[scanner] = self.EXECUTOR.submit(self.launch)
+            self.METRICS.count(f"pool.recycled.{reason}")
+        return scanner
+
+
+    @contextmanager
+    def leased(self) -> Iterator[oig_scanner]:
+        """Leases scanner for the duration of the with block.
+
+        Yields:
+            Oig scanner
+        """
+        scanner = self.lease()
+        try:
+            yield scanner
+        finally:
+            self.release(scanner)
+
+
+    def close(self) -> None:
+        """Quits every browser of the pool."""
+        with self.LOCK:
+            self.CLOSED = True
+            scanners = list(self.SCANNERS)
+            self.SCANNERS.clear()
+        self.EXECUTOR.shutdown(wait=True)
+        for scanner in scanners:
+            try:
+                scanner.quit()
+            except Exception:
+                pass
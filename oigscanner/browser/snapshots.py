@@ -0,0 +1,123 @@
+import base64
+import glob
+import os
+import pathlib
+import re
+import time
+
+from html import escape
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.print_page_options import PrintOptions
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from oigscanner.data.manifest import PATH_INDEX
+from typing import Callable, Iterable, Union
+
+
+# Evidence policies: "all" - screenshot of every row, "hits" - screenshots only of found records (CHECK),
+# "html" - html snapshot of every row rendered later with render_snapshots, "none" - no evidence
+EVIDENCE_POLICIES = ("all", "hits", "html", "none")
+
+
+def snapshot_path(path_screenshot: str) -> str:
+    """Given path of a screenshot, returns path of its html snapshot.
+
+    Args:
+        path_screenshot: path of a screenshot
+
+    Returns:
+        Path of the html snapshot
+    """
+    return path_screenshot.removesuffix(".png") + ".html"
+
+
+def write_snapshot(html: str, url: str, path: str) -> None:
+    """Writes html of a results page, so it can be rendered later. Relative links (styles, images)
+    point to the site the page was loaded from.
+
+    Args:
+        html: html of the page
+        url: URL of the page
+        path: path of the snapshot
+    """
+
+    # Add base URL right after the head tag (or at the beginning if there is no head)
+    base = f'<base href="{escape(url, quote=True)}">'
+    html, added = re.subn(r"(<head(?:\s[^>]*)?>)", lambda match: match.group(1) + base, html, count=1, flags=re.IGNORECASE)
+    if not added:
+        html = base + html
+
+    # Write it whole or not at all
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        file.write(html)
+    os.replace(temporary, path)
+
+
+def render_snapshots(
+    browser_template: Callable[[], WebDriver],
+    snapshots: Union[str, Iterable[str]],
+    formats: Iterable[str] = ("png",),
+    remove: bool = False,
+    timeout: int = 20
+    ) -> dict[str, list[str]]:
+    """Renders saved html snapshots into png screenshots of the results and/or pdf files of the whole page.
+    Can be run after the scan on any machine with a browser.
+
+    Args:
+        browser_template: webdriver template
+        snapshots: folder with snapshots (searched recursively) or paths of snapshots
+        formats: "png" and/or "pdf"
+        remove: remove snapshots that were rendered
+        timeout: time to wait for the page to load
+
+    Returns:
+        Rendered files of every snapshot
+    """
+
+    # Find snapshots
+    if isinstance(snapshots, str):
+        snapshots = sorted(glob.glob(os.path.join(snapshots, "**", "*.html"), recursive=True))
+    formats = list(formats)
+    for file_format in formats:
+        if file_format not in ("png", "pdf"):
+            raise ValueError(f"Unknown format: {file_format}")
+
+    # Render every snapshot with one browser
+    browser = browser_template()
+    wait = WebDriverWait(browser, timeout)
+    rendered = {}
+    start = time.perf_counter()
+    try:
+        for snapshot in snapshots:
+            try:
+                browser.get(pathlib.Path(snapshot).resolve().as_uri())
+                element = wait.until(EC.visibility_of_element_located((By.ID, "content")))
+                files = []
+
+                # Screenshot of the results, same name as the snapshot
+                if "png" in formats:
+                    path = PATH_INDEX.reserve(snapshot.removesuffix(".html") + ".png")
+                    element.screenshot(path)
+                    files.append(path)
+
+                # Whole page printed by the browser
+                if "pdf" in formats:
+                    path = PATH_INDEX.reserve(snapshot.removesuffix(".html") + ".pdf")
+                    with open(path, "wb") as file:
+                        file.write(base64.b64decode(browser.print_page(PrintOptions())))
+                    files.append(path)
+
+                rendered[snapshot] = files
+                if remove:
+                    os.remove(snapshot)
+
+            except Exception as e:
+                print(f"Failed to render {snapshot}: {e}")
+    finally:
+        browser.quit()
+
+    # Print and return
+    print(f"Rendered {len(rendered)} snapshots in {time.perf_counter() - start:.1f} s")
+    return rendered
@@ -0,0 +1,389 @@
+import threading
+import uuid
+import pandas as pd
+
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.common.exceptions import NoSuchWindowException
+from oigscanner.browser import governor
+from oigscanner.browser.handlers import RESULTS_SCRIPT, oig_scanner, page_not_loaded
+from oigscanner.control import token_bucket
+from oigscanner.data.evidence import evidence_store
+from oigscanner.logs import run_log
+from oigscanner.metrics import metrics, stopwatch
+from oigscanner.recovery import LADDER, circuit_breaker
+from oigscanner.results import scan_result
+from typing import Any, Callable, Optional
+
+
+# Opens given page without waiting for it to load (the page that is left keeps the token of the navigation)
+NAVIGATE_SCRIPT = """
+window.oigscannerNavigation = arguments[1];
+window.location.href = arguments[0];
+return true;
+"""
+
+# Goes back to the previous page without waiting for it to load
+BACK_SCRIPT = """
+window.oigscannerNavigation = arguments[0];
+history.back();
+return true;
+"""
+
+# Clicks the element (postback link) without waiting for the next page to load
+CLICK_SCRIPT = """
+var element = document.getElementById(arguments[0]);
+if (!element) {
+    return false;
+}
+window.oigscannerNavigation = arguments[1];
+element.click();
+return true;
+"""
+
+# Returns true once a page other than the one left by the navigation is loaded (a page restored from
+# the back-forward cache keeps the token of an older navigation, so it counts as loaded too)
+LOADED_SCRIPT = """
+return (window.oigscannerNavigation !== arguments[0] && document.readyState === "complete") || null;
+"""
+
+# Commands of the whole browser, they are sent without switching to the tab of the thread
+BROWSER_COMMANDS = (Command.QUIT, Command.NEW_WINDOW, Command.W3C_GET_WINDOW_HANDLES, Command.SWITCH_TO_WINDOW)
+
+# Returns true once the search form was submitted (or the results page is already opened)
+SUBMITTED_SCRIPT = """
+return (window.oigscannerNavigation === arguments[0] || document.getElementById("SP") !== null) || null;
+"""
+
+
+class tab_browser:
+
+    def __init__(
+        self,
+        browser_template: Callable[[], WebDriver],
+        timeout: int = 20
+        ):
+        """One browser shared by several tabs. Every command (of the browser and its elements) is sent
+        to the tab of the thread that sends it, so threads keep searches in flight in their own tabs
+        while other tabs wait for pages to load.
+
+        Args:
+            browser_template: webdriver template
+            timeout: time to wait if nothing is happening
+        """
+        self.BROWSER_TEMPLATE = browser_template
+        self.TIMEOUT = timeout
+
+        # Commands of threads are sent one at a time
+        self.LOCK = threading.RLock()
+        self.LOCAL = threading.local()
+
+        # Window handle of every tab, windows not given to tabs yet, window commands are sent to
+        self.BROWSER = None
+        self.HANDLES = {}
+        self.SPARE = []
+        self.CURRENT = None
+        self.RELAUNCHES = 0
+
+        # Start browser
+        self.launch()
+
+
+    def launch(self) -> None:
+        """Starts the browser (every tab has to be opened again)."""
+        with self.LOCK:
+            browser = self.BROWSER_TEMPLATE()
+            governor.track(browser)
+            browser.set_page_load_timeout(self.TIMEOUT)
+
+            # Send every command through this browser
+            self.EXECUTE = browser.execute
+            browser.execute = self.execute
+
+            # First window is given to the first opened tab
+            self.BROWSER = browser
+            self.HANDLES = {}
+            self.CURRENT = self.EXECUTE(Command.W3C_GET_CURRENT_WINDOW_HANDLE)["value"]
+            self.SPARE = [self.CURRENT]
+
+
+    def alive(self) -> bool:
+        """Returns True if the browser responds."""
+        if self.BROWSER is None:
+            return False
+        try:
+            self.EXECUTE(Command.W3C_GET_WINDOW_HANDLES)
+            return True
+        except Exception:
+            return False
+
+
+    def execute(self, command: str, params: Optional[dict] = None) -> Any:
+        """Sends command to the tab of the current thread.
+
+        Args:
+            command: webdriver command
+            params: parameters of the command
+
+        Returns:
+            Response of the browser
+        """
+        with self.LOCK:
+
+            # Switch to the tab of the thread
+            index = getattr(self.LOCAL, "INDEX", None)
+            if index is not None and command not in BROWSER_COMMANDS:
+                handle = self.HANDLES.get(index)
+                if handle is None:
+                    raise NoSuchWindowException(f"Tab {index} was closed")
+                if handle != self.CURRENT:
+                    self.EXECUTE(Command.SWITCH_TO_WINDOW, {"handle": handle})
+                    self.CURRENT = handle
+
+            # Send the command
+            response = self.EXECUTE(command, params)
+            if command == Command.SWITCH_TO_WINDOW:
+                self.CURRENT = params["handle"]
+            elif command == Command.CLOSE:
+                self.CURRENT = None
+            return response
+
+
+    def bind(self, index: int) -> None:
+        """Sends commands of the current thread to given tab.
+
+        Args:
+            index: index of the tab
+        """
+        self.LOCAL.INDEX = index
+
+
+    def open_tab(self, index: int) -> None:
+        """Opens new tab with given index. Starts the browser again if it does not respond.
+
+        Args:
+            index: index of the tab
+        """
+        with self.LOCK:
+            if not self.alive():
+                if self.BROWSER is not None:
+                    self.RELAUNCHES += 1
+                    try:
+                        self.BROWSER.quit()
+                    except Exception:
+                        pass
+                    governor.untrack(self.BROWSER)
+                self.launch()
+            if index in self.HANDLES:
+                return
+            if self.SPARE:
+                self.HANDLES[index] = self.SPARE.pop()
+            else:
+                self.HANDLES[index] = self.EXECUTE(Command.NEW_WINDOW, {"type": "tab"})["value"]["handle"]
+
+
+    def close_tab(self, index: int) -> None:
+        """Closes tab with given index. Quits the browser when its last tab is closed.
+
+        Args:
+            index: index of the tab
+        """
+        with self.LOCK:
+            handle = self.HANDLES.pop(index, None)
+            if self.BROWSER is None:
+                return
+
+            # Quit the browser without tabs
+            if not self.HANDLES:
+                try:
+                    self.BROWSER.quit()
+                except Exception:
+                    pass
+                governor.untrack(self.BROWSER)
+                self.BROWSER = None
+                return
+
+            # Close the window of the tab
+            if handle is not None:
+                try:
+                    self.EXECUTE(Command.SWITCH_TO_WINDOW, {"handle": handle})
+                    self.EXECUTE(Command.CLOSE)
+                except Exception:
+                    pass
+                self.CURRENT = None
+
+
+class oig_tab(oig_scanner):
+
+    def __init__(
+        self,
+        browser: tab_browser,
+        index: int,
+        wait_time: int = 10,
+        timeout: int = 20,
+        url: str = "https://exclusions.oig.hhs.gov",
+        metrics: Optional[metrics] = None,
+        fast_path: bool = True,
+        evidence: Optional[evidence_store] = None,
+        log: Optional[run_log] = None,
+        breaker: Optional[circuit_breaker] = None,
+        shard: bool = False,
+        evidence_policy: str = "all",
+        limiter: Optional[token_bucket] = None
+        ):
+        """Oig scanner that uses one tab of a shared browser. Pages are opened without holding the browser,
+        so other tabs can search while this one waits.
+
+        Args:
+            browser: browser shared by tabs
+            index: index of the tab in the browser
+            wait_time: time to wait for an element to be found
+            timout: time to wait if nothing is happening
+            url: URL of the oig exclusions site
+            metrics: metrics to record timings of every step to, None to not record
+            fast_path: fill and submit the search form with one script (falls back to step by step)
+            evidence: store that writes screenshots in the background, None to write them directly
+            log: structured log of the run, None to not log
+            breaker: circuit breaker shared by workers that pauses them when the site is failing
+            shard: put screenshots into subfolders named by their first letter
+            evidence_policy: "all", "hits", "html" or "none" (see oig_scanner)
+            limiter: limit of requests to the site per second shared by workers, None for no limit
+        """
+
+        # Set shared browser and index of the tab
+        self.TAB_BROWSER = browser
+        self.INDEX = index
+
+        # Initialize using parent (oig_scanner)
+        super().__init__(
+            browser.BROWSER_TEMPLATE, wait_time, timeout, url, metrics, fast_path,
+            evidence, log, breaker, shard, evidence_policy, limiter
+        )
+
+
+    def activate(self) -> None:
+        """Sends commands of the current thread to this tab."""
+        self.TAB_BROWSER.bind(self.INDEX)
+
+
+    def create_browser(self) -> None:
+        """Opens the tab (and starts the browser again if it does not respond)."""
+        self.TAB_BROWSER.open_tab(self.INDEX)
+        self.activate()
+        self.BROWSER = self.TAB_BROWSER.BROWSER
+        self.WAIT = WebDriverWait(self.BROWSER, self.WAIT_TIME)
+
+
+    def quit(self) -> None:
+        """Closes the tab (the browser is quit with its last tab)."""
+        self.TAB_BROWSER.close_tab(self.INDEX)
+
+
+    def wait_until_loaded(self, token: str) -> None:
+        """Waits for the page opened by a script to load (other tabs can use the browser meanwhile).
+
+        Args:
+            token: token of the navigation given to the script that opened the page
+        """
+        WebDriverWait(self.BROWSER, self.TIMEOUT, poll_frequency=0.05).until(
+            lambda browser: browser.execute_script(LOADED_SCRIPT, token)
+        )
+
+
+    def get(self, page: str) -> None:
+        """Opens given page in the tab.
+
+        Args:
+            page: URL of the page
+        """
+        self.activate()
+        token = uuid.uuid4().hex
+        self.BROWSER.execute_script(NAVIGATE_SCRIPT, page, token)
+        self.wait_until_loaded(token)
+
+
+    def back(self) -> None:
+        """Goes back to the previous page in the tab."""
+        self.activate()
+        token = uuid.uuid4().hex
+        self.BROWSER.execute_script(BACK_SCRIPT, token)
+        self.wait_until_loaded(token)
+
+
+    def get_entities_page(self) -> None:
+        """Gets first page of oig exclusions site and sets searching for entities."""
+        self.FORM = None
+        self.LIMITER.acquire()
+        self.get(self.URL)
+        self.LIMITER.acquire()
+        token = uuid.uuid4().hex
+        if not self.BROWSER.execute_script(CLICK_SCRIPT, "ctl00_cpExclusions_Linkbutton1", token):
+            raise page_not_loaded("Entities search link was not found")
+        self.wait_until_loaded(token)
+        self.FORM = "entities"
+
+
+    def search_fast(self, fields: dict[str, str], phases: stopwatch) -> Optional[bool]:
+        """Submits the search form, then waits for the form to be submitted and for the results page while
+        other tabs use the browser. Every check switches to this tab again, so a tab put in the background
+        by other tabs does not delay its submit for long.
+
+        Args:
+            fields: names of the search fields and values to enter
+            phases: stopwatch to record phases of the search
+
+        Returns:
+            True if found, False if not, None if the page did not load correctly
+        """
+        self.activate()
+        token = uuid.uuid4().hex
+        if not self.fill_and_submit(fields, "ctl00$cpExclusions$ibSearchSP", token):
+            return None
+
+        # The browser is held only while a check runs, not between the checks
+        self.wait_for_script(SUBMITTED_SCRIPT, 0.01, token)
+        phases.lap("fill")
+
+        # Wait for the results page of this search and check if results were found
+        return self.wait_for_script(RESULTS_SCRIPT, 0.05, token) == "found"
+
+
+    def recover(self, step: int, get_page: Callable[[], None]) -> int:
+        """Recovers the tab like oig_scanner, but never clears cookies (they are shared by every tab).
+
+        Args:
+            step: index of the step in LADDER
+            get_page: function that opens the search page
+
+        Returns:
+            Index of the step that recovered the tab
+        """
+        self.activate()
+        if LADDER[step] == "reset":
+            step += 1
+        return super().recover(step, get_page)
+
+
+    def take_oig_screenshot(
+        self,
+        data: pd.Series,
+        month: str,
+        year: int,
+        attempts: int = 5,
+        policy: Optional[str] = None
+        ) -> scan_result:
+        """Takes a screenshot of an individual or entity page in this tab (see oig_scanner).
+
+        Args:
+            data: last name and first name or entity name in pandas series.
+            month: month to append to the name of the screenshot
+            year: year to append to the name of the screenshot
+            attempts: number of tries before the row is reported as failed
+            policy: evidence policy for this row, evidence policy of the scanner if not given
+
+        Returns:
+            Result of the scan (true if able to take screenshot, otherwise false)
+        """
+        self.activate()
+        return super().take_oig_screenshot(data, month, year, attempts, policy)
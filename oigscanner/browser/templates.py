@@ -1,47 +1,237 @@
+import atexit
+import shutil
+import tempfile
+
+from functools import partial
 from selenium import webdriver
 from selenium.webdriver.firefox.service import Service
 from selenium.webdriver.firefox.options import Options
-from typing import Callable
+from selenium.webdriver.chrome.service import Service as ChromiumService
+from selenium.webdriver.chrome.options import Options as ChromiumOptions
+from typing import Callable, Optional
+
+
+# Window size of lean browsers (screenshots have the same layout on every machine)
+LEAN_WINDOW_SIZE = (1366, 768)
+
+# Firefox preferences of a lean scanning profile: no images, no remote fonts, no trackers,
+# no first run pages, updates or telemetry
+FIREFOX_LEAN_PREFERENCES = {
+    "permissions.default.image": 2,
+    "gfx.downloadable_fonts.enabled": False,
+    "browser.display.use_document_fonts": 0,
+    "privacy.trackingprotection.enabled": True,
+    "media.autoplay.default": 5,
+    "browser.shell.checkDefaultBrowser": False,
+    "browser.startup.homepage_override.mstone": "ignore",
+    "browser.startup.page": 0,
+    "app.update.auto": False,
+    "datareporting.policy.dataSubmissionEnabled": False,
+    "toolkit.telemetry.enabled": False
+}
+
+# Url patterns that lean chromium does not load (images and remote fonts)
+CHROMIUM_BLOCKED_URLS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.woff", "*.woff2", "*.ttf", "*.otf"]
+
+
+def create_firefox(
+    path_binary: str = "",
+    path_driver: str = "",
+    page_load_strategy: str = "normal",
+    block_assets: bool = False,
+    profile_dir: str = "",
+    window_size: Optional[tuple[int, int]] = None
+    ) -> webdriver.Firefox:
+    """Creates a firefox webdriver with given options.
+
+    Args:
+        path_binary: path to firefox browser
+        path_driver: path to geckodriver
+        page_load_strategy: "normal" - wait for every asset, "eager" - wait only for the html document
+        block_assets: do not load images, remote fonts and trackers
+        profile_dir: pre-built profile folder, copied for every instance (empty for a new profile)
+        window_size: width and height of the window, None to maximize
+
+    Returns:
+        Firefox webdriver with given options
+    """
+
+    # Set Options
+    options = Options()
+    if path_binary:
+        options.binary_location = path_binary
+    options.add_argument("--headless")
+    options.page_load_strategy = page_load_strategy
+    if profile_dir:
+        options.profile = profile_dir
+    if block_assets:
+        for name, value in FIREFOX_LEAN_PREFERENCES.items():
+            options.set_preference(name, value)
+    if window_size is not None:
+        options.add_argument(f"--width={window_size[0]}")
+        options.add_argument(f"--height={window_size[1]}")
+
+    # Set Service
+    service = Service()
+    if path_driver:
+        service = Service(path_driver)
+
+    # Create browser instance and set its size
+    browser = webdriver.Firefox(options=options, service=service)
+    if window_size is None:
+        browser.maximize_window()
+    else:
+        browser.set_window_size(*window_size)
+
+    # Return browser instance
+    return browser
 
 
 def firefox_template(
     path_binary: str = "",
-    path_driver: str = ""
+    path_driver: str = "",
+    lean: bool = False,
+    profile_dir: str = "",
+    window_size: Optional[tuple[int, int]] = None
     ) -> Callable[[], webdriver.Firefox]:
     """Creates function that will hold options for firefox webdriver instances.
+    The function can be pickled, so it can be passed to worker processes.
 
     Args:
         path_binary: path to firefox browser
         path_driver: path to geckodriver
+        lean: scanning profile that loads faster: eager page loads, no images, remote fonts or trackers,
+            fixed window size
+        profile_dir: pre-built profile folder reused by every instance (empty for a new profile)
+        window_size: width and height of the window, None to maximize (or LEAN_WINDOW_SIZE if lean)
 
     Returns:
         Function that creates firefox webdriver with given options
     """
 
-    def browser_template() -> webdriver.Firefox:
-        """Creates a firefox webdriver with given options.
+    # Lean browsers have fixed window size
+    if lean and window_size is None:
+        window_size = LEAN_WINDOW_SIZE
+
+    # Return template for browser
+    return partial(
+        create_firefox,
+        path_binary,
+        path_driver,
+        "eager" if lean else "normal",
+        lean,
+        profile_dir,
+        window_size
+    )
+
+
+def copy_profile(profile_dir: str) -> str:
+    """Copies pre-built chromium profile, because one profile folder can not be used by two instances.
+    The copy is removed when the program exits.
+
+    Args:
+        profile_dir: pre-built profile folder
+
+    Returns:
+        Path to the copy
+    """
+    copy = tempfile.mkdtemp(prefix="oigscanner_chromium_")
+    shutil.copytree(profile_dir, copy, dirs_exist_ok=True)
+    atexit.register(shutil.rmtree, copy, True)
+    return copy
+
+
+def create_chromium(
+    path_binary: str = "",
+    path_driver: str = "",
+    page_load_strategy: str = "normal",
+    block_assets: bool = False,
+    profile_dir: str = "",
+    window_size: Optional[tuple[int, int]] = None
+    ) -> webdriver.Chrome:
+    """Creates a headless chromium (or chrome) webdriver with given options.
 
-        Returns:
-            Firefox webdriver with given options
-        """
+    Args:
+        path_binary: path to chromium browser
+        path_driver: path to chromedriver
+        page_load_strategy: "normal" - wait for every asset, "eager" - wait only for the html document
+        block_assets: do not load images and remote fonts
+        profile_dir: pre-built profile folder, copied for every instance (empty for a new profile)
+        window_size: width and height of the window, None to maximize
 
-        # Set Options
-        options = Options()
-        if path_binary:
-            options.binary_location = path_binary
-        options.add_argument("--headless")
+    Returns:
+        Chromium webdriver with given options
+    """
 
-        # Set Service
-        service = Service()
-        if path_driver:
-            service = Service(path_driver)
+    # Set Options
+    options = ChromiumOptions()
+    if path_binary:
+        options.binary_location = path_binary
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--no-first-run")
+    options.add_argument("--no-default-browser-check")
+    options.page_load_strategy = page_load_strategy
+    if profile_dir:
+        options.add_argument(f"--user-data-dir={copy_profile(profile_dir)}")
+    if block_assets:
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        options.add_argument("--blink-settings=imagesEnabled=false")
+    if window_size is not None:
+        options.add_argument(f"--window-size={window_size[0]},{window_size[1]}")
 
-        # Create browser instance and maximize
-        browser = webdriver.Firefox(options=options, service=service)
+    # Set Service
+    service = ChromiumService()
+    if path_driver:
+        service = ChromiumService(path_driver)
+
+    # Create browser instance and set its size
+    browser = webdriver.Chrome(options=options, service=service)
+    if window_size is None:
         browser.maximize_window()
 
-        # Return browser instance
-        return browser
+    # Block remote fonts and images that the preferences do not cover
+    if block_assets:
+        browser.execute_cdp_cmd("Network.enable", {})
+        browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": CHROMIUM_BLOCKED_URLS})
+
+    # Return browser instance
+    return browser
+
+
+def chromium_template(
+    path_binary: str = "",
+    path_driver: str = "",
+    lean: bool = False,
+    profile_dir: str = "",
+    window_size: Optional[tuple[int, int]] = None
+    ) -> Callable[[], webdriver.Chrome]:
+    """Creates function that will hold options for headless chromium webdriver instances.
+    The function can be pickled, so it can be passed to worker processes.
+
+    Args:
+        path_binary: path to chromium browser
+        path_driver: path to chromedriver
+        lean: scanning profile that loads faster: eager page loads, no images or remote fonts,
+            fixed window size
+        profile_dir: pre-built profile folder reused by every instance (empty for a new profile)
+        window_size: width and height of the window, None to maximize (or LEAN_WINDOW_SIZE if lean)
+
+    Returns:
+        Function that creates chromium webdriver with given options
+    """
+
+    # Lean browsers have fixed window size
+    if lean and window_size is None:
+        window_size = LEAN_WINDOW_SIZE
 
     # Return template for browser
-    return browser_template
\ No newline at end of file
+    return partial(
+        create_chromium,
+        path_binary,
+        path_driver,
+        "eager" if lean else "normal",
+        lean,
+        profile_dir,
+        window_size
+    )
@@ -0,0 +1,351 @@
+import argparse
+import os
+import signal
+import sys
+import time
+
+from datetime import datetime
+from typing import Optional
+
+
+# Heavy modules (pandas, selenium) are imported inside the commands that need them,
+# so help and argument errors are shown right away
+
+
+def make_template(args: argparse.Namespace):
+    """Creates browser template from command line options.
+
+    Args:
+        args: parsed command line options
+
+    Returns:
+        Function that creates browser with given options
+    """
+    from oigscanner.browser.templates import chromium_template, firefox_template
+    if args.browser == "chromium":
+        return chromium_template(args.binary, args.driver, lean=args.lean, profile_dir=args.profile)
+    return firefox_template(args.binary, args.driver, lean=args.lean, profile_dir=args.profile)
+
+
+def read_data(path: str, stream: bool = True):
+    """Reads xlsx, xls or csv file in normalized chunks, or as one dataframe.
+
+    Args:
+        path: path to the file
+        stream: return chunks that are read while scanning
+
+    Returns:
+        Chunks of normalized data or one normalized dataframe
+    """
+    from oigscanner.data.streaming import stream_data_oig
+    chunks = stream_data_oig(path)
+    if stream:
+        return chunks
+    import pandas as pd
+    return pd.concat(list(chunks))
+
+
+def scan_options(args: argparse.Namespace) -> dict:
+    """Makes arguments of interface from command line options shared by scan, resume and rescreen.
+
+    Args:
+        args: parsed command line options
+
+    Returns:
+        Keyword arguments of interface (without journal, log and cache)
+    """
+    from oigscanner.browser.governor import resource_governor
+    from oigscanner.data.manifest import results_manifest
+    return {
+        "number_threads": args.threads,
+        "engine": args.engine,
+        "url": args.url,
+        "retry": args.retry,
+        "adaptive": args.adaptive,
+        "rate_limit": args.rate_limit,
+        "manifest": results_manifest(args.manifest or None, args.parquet or None),
+        "shard": args.shard,
+        "evidence_policy": args.evidence,
+        "tabs": args.tabs,
+        "governor": resource_governor(args.recycle_rows or None, args.max_rss),
+        "mode": args.mode
+    }
+
+
+def scan(args: argparse.Namespace) -> int:
+    """Runs scan (or resumes it from the journal)."""
+    from oigscanner.data.cache import result_cache
+    from oigscanner.data.journal import run_journal
+    from oigscanner.interface import interface
+    from oigscanner.logs import run_log
+
+    # Open journal, log and cache
+    journal = run_journal(args.journal)
+    log = run_log(args.log, args.failures)
+    cache = result_cache(args.cache) if args.cache else None
+
+    # Run scanner (worker processes need the whole dataframe)
+    try:
+        stats = interface(
+            make_template(args),
+            read_data(args.file, stream=args.mode == "thread"),
+            args.month,
+            args.year,
+            cache=cache,
+            journal=journal,
+            resume=args.command == "resume",
+            log=log,
+            source=args.file,
+            **scan_options(args)
+        )
+    finally:
+        journal.close()
+        log.close()
+        if cache is not None:
+            cache.close()
+    return 1 if any(stat.FAILED for stat in stats) else 0
+
+
+def rescreen(args: argparse.Namespace) -> int:
+    """Scans only new rows and rows matching changed LEIE records, carries the rest forward."""
+    from oigscanner.data.cache import result_cache
+    from oigscanner.incremental import rescreen as run_rescreen
+    from oigscanner.logs import run_log
+
+    # Open log and cache with results of the previous month
+    log = run_log(args.log, args.failures)
+    cache = result_cache(args.cache) if args.cache else result_cache()
+
+    # Run rescreen
+    try:
+        stats = run_rescreen(
+            make_template(args),
+            read_data(args.file, stream=False),
+            args.month,
+            args.year,
+            args.previous_month,
+            args.previous_year,
+            cache,
+            args.supplements,
+            not args.exact,
+            log=log,
+            **scan_options(args)
+        )
+    finally:
+        log.close()
+        cache.close()
+    return 1 if any(stat.FAILED for stat in stats) else 0
+
+
+def worker(args: argparse.Namespace) -> int:
+    """Takes rows from the shared queue of a coordinator and scans them."""
+    from oigscanner.distributed import run_worker
+    run_worker(
+        args.queue,
+        make_template(args),
+        args.month,
+        args.year,
+        engine=args.engine,
+        url=args.url,
+        worker_id=args.worker_id or None,
+        stay=args.stay,
+        poll_interval=args.poll_interval,
+        rate_limit=args.rate_limit,
+        evidence_policy=args.evidence,
+        shard=args.shard,
+        log_path=args.log or None,
+        max_rows=args.recycle_rows or None,
+        max_rss_mb=args.max_rss
+    )
+    return 0
+
+
+def coordinate(args: argparse.Namespace) -> int:
+    """Adds rows of the file to the shared queue and waits until workers process them."""
+    from oigscanner.distributed import coordinate as run_coordinator
+    results = run_coordinator(args.queue, read_data(args.file, stream=False), args.poll_interval)
+    results.to_csv(args.output, index=False)
+    print(f"Wrote {args.output}")
+    return 1 if (results["status"] == "failed").any() else 0
+
+
+def prescreen(args: argparse.Namespace) -> int:
+    """Splits data into rows to scan and clean rows using the LEIE exclusion file."""
+    from oigscanner.data.leie import leie_index
+
+    # Match data against the exclusion file
+    start = time.perf_counter()
+    data = read_data(args.file, stream=False)
+    to_scan, clean = leie_index(args.leie).prescreen(data, args.policy, not args.exact)
+
+    # Write both parts
+    to_scan.to_csv(args.output, index=False)
+    clean.to_csv(args.clean, index=False)
+    print(f"Wrote {args.output} and {args.clean} in {time.perf_counter() - start:.2f} s")
+    return 0
+
+
+def render(args: argparse.Namespace) -> int:
+    """Renders html snapshots saved with the "html" evidence policy into png and/or pdf files."""
+    from oigscanner.browser.snapshots import render_snapshots
+    snapshots = args.snapshots[0] if len(args.snapshots) == 1 and os.path.isdir(args.snapshots[0]) else args.snapshots
+    rendered = render_snapshots(make_template(args), snapshots, args.formats, args.remove)
+    return 0 if all(rendered.values()) else 1
+
+
+def measure_startup(runs: int = 5) -> None:
+    """Prints time to start the command line and show help (import time of the entry point)."""
+    import subprocess
+    times = []
+    for i in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "oigscanner", "--help"], stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(f"oigscanner --help: median {times[len(times) // 2] * 1000:.0f} ms, max {times[-1] * 1000:.0f} ms")
+
+
+def bench(args: argparse.Namespace) -> int:
+    """Measures startup of the command line, browser templates or the whole scan against the mock site."""
+    if args.startup:
+        measure_startup()
+        return 0
+    from oigscanner.bench import benchmark, benchmark_templates
+    if args.templates:
+        from oigscanner.browser.templates import chromium_template, firefox_template
+        make = chromium_template if args.browser == "chromium" else firefox_template
+        benchmark_templates({
+            args.browser: make(args.binary, args.driver, profile_dir=args.profile),
+            f"{args.browser} lean": make(args.binary, args.driver, lean=True, profile_dir=args.profile)
+        })
+        return 0
+    benchmark(make_template(args), rows=args.rows, workers=args.workers, engines=args.engines)
+    return 0
+
+
+def make_parser() -> argparse.ArgumentParser:
+    """Creates parser of command line options.
+
+    Returns:
+        Parser with scan, resume, rescreen, prescreen, worker, coordinate, render and bench commands
+    """
+    parser = argparse.ArgumentParser(prog="oigscanner", description="Checks names in the OIG exclusions database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Browser options shared by commands that start browsers
+    browser = argparse.ArgumentParser(add_help=False)
+    browser.add_argument("--browser", choices=("firefox", "chromium"), default="firefox", help="browser to use")
+    browser.add_argument("--binary", default="", help="path to the browser (installed one if not given)")
+    browser.add_argument("--driver", default="", help="path to geckodriver or chromedriver")
+    browser.add_argument("--profile", default="", help="pre-built browser profile folder")
+    browser.add_argument("--lean", action="store_true", help="eager page loads, no images or remote fonts")
+
+    # Options of the site shared by commands that search it
+    site = argparse.ArgumentParser(add_help=False)
+    site.add_argument("-e", "--engine", choices=("browser", "http"), default="browser", help="how to search")
+    site.add_argument("--month", default=datetime.now().strftime("%B"), help="month in screenshot names")
+    site.add_argument("--year", type=int, default=datetime.now().year, help="year in screenshot names")
+    site.add_argument("--url", default="https://exclusions.oig.hhs.gov", help="URL of the exclusions site")
+
+    # Options of a scan shared by scan, resume and rescreen
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("file", help="xlsx, xls or csv file with last name and first name, or entity name")
+    options.add_argument("-t", "--threads", type=int, default=1, help="maximum number of workers")
+    options.add_argument("--mode", choices=("thread", "process"), default="thread", help="workers are threads or processes")
+    options.add_argument("--tabs", type=int, default=1, help="workers sharing one browser (one tab each)")
+    options.add_argument("--recycle-rows", type=int, default=500, help="restart browsers after rows (0 never)")
+    options.add_argument("--max-rss", type=float, default=None, help="restart browsers above MB (needs psutil)")
+    options.add_argument("--log", default="logs.jsonl", help="structured log")
+    options.add_argument("--failures", default="failures.jsonl", help="rows that failed for good")
+    options.add_argument("--retry", choices=("deferred", "immediate"), default="deferred", help="retry policy")
+    options.add_argument("--rate-limit", type=float, default=None, help="maximum requests to the site per second")
+    options.add_argument("--adaptive", action="store_true", help="grow and shrink number of workers by latency")
+    options.add_argument("--manifest", default="results_manifest.csv", help="csv with outcome of every row")
+    options.add_argument("--parquet", default="", help="parquet copy of the manifest (needs pyarrow)")
+    options.add_argument("--shard", action="store_true", help="screenshot subfolders by first letter")
+    options.add_argument(
+        "--evidence",
+        choices=("all", "hits", "html", "none"),
+        default=None,
+        help="screenshots of every row or only hits, html snapshots to render later, or nothing"
+    )
+
+    # Scan and resume
+    for name, description in (("scan", "scan every row of the file"), ("resume", "scan rows not done in the journal")):
+        command = commands.add_parser(name, parents=[browser, site, options], help=description)
+        command.add_argument("--cache", default="", help="sqlite file with cached results")
+        command.add_argument("--journal", default="journal.jsonl", help="journal of row outcomes")
+        command.set_defaults(run=scan)
+
+    # Rescreen
+    command = commands.add_parser("rescreen", parents=[browser, site, options], help="scan new and changed rows only")
+    command.add_argument("--previous-month", required=True, help="month of the previous scan")
+    command.add_argument("--previous-year", type=int, required=True, help="year of the previous scan")
+    command.add_argument("--supplements", nargs="*", default=[], help="LEIE exclusion and reinstatement supplements")
+    command.add_argument("--exact", action="store_true", help="match full first names instead of initials")
+    command.add_argument("--cache", default="", help="sqlite file with results of the previous month")
+    command.set_defaults(run=rescreen)
+
+    # Prescreen
+    command = commands.add_parser("prescreen", help="split the file into rows to scan and clean rows")
+    command.add_argument("file", help="xlsx, xls or csv file with last name and first name, or entity name")
+    command.add_argument("--leie", required=True, help="LEIE exclusion file (UPDATED.csv)")
+    command.add_argument("--policy", choices=("hits", "all"), default="hits", help="rows that need evidence")
+    command.add_argument("--exact", action="store_true", help="match full first names instead of initials")
+    command.add_argument("--output", default="to_scan.csv", help="rows to scan")
+    command.add_argument("--clean", default="clean.csv", help="clean rows")
+    command.set_defaults(run=prescreen)
+
+    # Worker and coordinator sharing a queue
+    command = commands.add_parser("worker", parents=[browser, site], help="scan rows from the queue of a coordinator")
+    command.add_argument("queue", help="sqlite file of the queue")
+    command.add_argument("--worker-id", default="", help="id of the worker (host name and process id if not given)")
+    command.add_argument("--stay", action="store_true", help="keep waiting for new rows when the queue is empty")
+    command.add_argument("--poll-interval", type=float, default=1.0, help="seconds to wait for new rows")
+    command.add_argument("--rate-limit", type=float, default=None, help="maximum requests of this worker per second")
+    command.add_argument("--evidence", choices=("all", "hits", "html", "none"), default=None, help="evidence policy")
+    command.add_argument("--shard", action="store_true", help="screenshot subfolders by first letter")
+    command.add_argument("--log", default="", help="structured log of this worker")
+    command.add_argument("--recycle-rows", type=int, default=500, help="restart the browser after rows (0 never)")
+    command.add_argument("--max-rss", type=float, default=None, help="restart the browser above MB (needs psutil)")
+    command.set_defaults(run=worker)
+    command = commands.add_parser("coordinate", help="add rows to the queue and wait for workers")
+    command.add_argument("queue", help="sqlite file of the queue")
+    command.add_argument("file", help="xlsx, xls or csv file with last name and first name, or entity name")
+    command.add_argument("--output", default="results.csv", help="result of every row")
+    command.add_argument("--poll-interval", type=float, default=10.0, help="seconds between progress reports")
+    command.set_defaults(run=coordinate)
+
+    # Render
+    command = commands.add_parser("render", parents=[browser], help="render html snapshots into png or pdf")
+    command.add_argument("snapshots", nargs="+", help="folder with snapshots or snapshot files")
+    command.add_argument("--formats", nargs="+", choices=("png", "pdf"), default=["png"], help="formats to render")
+    command.add_argument("--remove", action="store_true", help="remove snapshots that were rendered")
+    command.set_defaults(run=render)
+
+    # Bench
+    command = commands.add_parser("bench", parents=[browser], help="benchmark against the local mock site")
+    command.add_argument("--rows", type=int, default=100, help="number of rows")
+    command.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="numbers of workers")
+    command.add_argument("--engines", nargs="+", choices=("browser", "http"), default=["browser", "http"])
+    command.add_argument("--templates", action="store_true", help="measure startup and page loads of templates")
+    command.add_argument("--startup", action="store_true", help="measure startup time of the command line")
+    command.set_defaults(run=bench)
+
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Runs the command line.
+
+    Args:
+        argv: command line arguments, sys.argv if not given
+
+    Returns:
+        Exit code
+    """
+    args = make_parser().parse_args(argv)
+
+    # Browsers left open are quit at exit, also when the run is terminated
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    return args.run(args)
@@ -0,0 +1,205 @@
+import statistics
+import threading
+import time
+
+from typing import Optional
+
+
+class token_bucket:
+
+    def __init__(self, rate: Optional[float] = None, burst: int = 1):
+        """Limits number of requests to the site per second shared by every worker.
+
+        Args:
+            rate: maximum number of requests per second, None for no limit
+            burst: number of requests that can start at once after a pause
+        """
+        self.RATE = rate
+        self.BURST = max(burst, 1)
+        self.TOKENS = float(self.BURST)
+        self.LAST = time.monotonic()
+        self.WAITED = 0.0
+        self.LOCK = threading.Lock()
+
+
+    def acquire(self) -> float:
+        """Takes one token, waits until there is one.
+
+        Returns:
+            Seconds waited
+        """
+        if not self.RATE:
+            return 0.0
+        with self.LOCK:
+
+            # Add tokens for the time since the last call
+            now = time.monotonic()
+            self.TOKENS = min(self.BURST, self.TOKENS + (now - self.LAST) * self.RATE)
+            self.LAST = now
+
+            # Take a token (can go below zero, the caller waits for it)
+            self.TOKENS -= 1
+            wait = max(-self.TOKENS / self.RATE, 0.0)
+            self.WAITED += wait
+
+        # Wait outside of the lock, so other workers can reserve their tokens
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class concurrency_controller:
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        initial: int = 1,
+        window: int = 10,
+        latency_factor: float = 1.5,
+        error_threshold: float = 0.1,
+        decrease: float = 0.5,
+        probe_every: int = 10
+        ):
+        """Grows and shrinks number of active workers (additive increase, multiplicative decrease).
+        After every window of rows one worker is added if latency and errors stay low. The number
+        is cut when median latency grows over the best one seen or too many rows fail. The number
+        that overloaded the site is tried again only after several good windows below it.
+
+        Args:
+            maximum: maximum number of active workers (number of started workers)
+            minimum: minimum number of active workers
+            initial: number of active workers at the start
+            window: number of rows between decisions
+            latency_factor: median latency above the best median times this factor means the site is overloaded
+            error_threshold: share of failed rows that means the site is overloaded
+            decrease: factor the number of workers is multiplied with when the site is overloaded
+            probe_every: number of good windows before the number that overloaded the site is tried again
+        """
+
+        # Set limits and thresholds
+        self.MAXIMUM = maximum
+        self.MINIMUM = min(max(minimum, 1), maximum)
+        self.WINDOW = window
+        self.LATENCY_FACTOR = latency_factor
+        self.ERROR_THRESHOLD = error_threshold
+        self.DECREASE = decrease
+        self.PROBE_EVERY = probe_every
+
+        # Current number of active workers, rows of the current window and the best median latency
+        self.LIMIT = min(max(initial, self.MINIMUM), maximum)
+        self.SAMPLES = []
+        self.WINDOW_START = time.monotonic()
+        self.BEST_LATENCY = None
+
+        # Number of workers that overloaded the site, good windows since then and time of the last change
+        self.CEILING = None
+        self.STABLE = 0
+        self.LAST_CHANGE = time.monotonic()
+
+        # Window after a cut still has rows that overlapped with workers that were stopped
+        self.SETTLING = False
+
+        # Decisions with number of workers and throughput of every window
+        self.HISTORY = []
+        self.CLOSED = False
+        self.CONDITION = threading.Condition()
+
+
+    def admit(self, worker_id: int) -> None:
+        """Waits while the worker is not active (its id is not below the current limit).
+
+        Args:
+            worker_id: id of the worker, starting from 0
+        """
+        with self.CONDITION:
+            while worker_id >= self.LIMIT and not self.CLOSED:
+                self.CONDITION.wait()
+
+
+    def report(self, duration: float, success: bool) -> None:
+        """Records processed row, changes number of active workers after every window.
+
+        Args:
+            duration: time spent on the row in seconds
+            success: True if the row was processed successfully
+        """
+        with self.CONDITION:
+
+            # Rows started before the last change do not show its effect
+            now = time.monotonic()
+            if now - duration < self.LAST_CHANGE:
+                return
+            self.SAMPLES.append((duration, success))
+            if len(self.SAMPLES) < self.WINDOW:
+                return
+
+            # Measure the window
+            median = statistics.median(duration for duration, success in self.SAMPLES)
+            error_rate = sum(not success for duration, success in self.SAMPLES) / len(self.SAMPLES)
+            throughput = len(self.SAMPLES) / max(now - self.WINDOW_START, 1e-9)
+            overloaded = error_rate > self.ERROR_THRESHOLD or (
+                self.BEST_LATENCY is not None and median > self.BEST_LATENCY * self.LATENCY_FACTOR
+            )
+            if error_rate <= self.ERROR_THRESHOLD:
+                self.BEST_LATENCY = median if self.BEST_LATENCY is None else min(self.BEST_LATENCY, median)
+
+            # Cut number of workers when overloaded, otherwise add one (below the number that overloaded the site)
+            limit = self.LIMIT
+            if overloaded and self.SETTLING:
+                self.SETTLING = False
+            elif overloaded:
+                self.CEILING = self.LIMIT
+                self.STABLE = 0
+                self.LIMIT = max(self.MINIMUM, int(self.LIMIT * self.DECREASE))
+                self.SETTLING = True
+            else:
+                self.SETTLING = False
+                self.STABLE += 1
+                if self.CEILING is not None and self.LIMIT + 1 >= self.CEILING and self.STABLE < self.PROBE_EVERY:
+                    pass
+                elif self.LIMIT < self.MAXIMUM:
+                    self.LIMIT += 1
+            if self.LIMIT != limit:
+                self.LAST_CHANGE = now
+                print(f"Active workers: {limit} -> {self.LIMIT} (median {median:.2f} s, errors {error_rate:.0%})")
+            self.HISTORY.append({
+                "workers": limit,
+                "throughput": throughput,
+                "median": median,
+                "error_rate": error_rate,
+                "overloaded": overloaded
+            })
+
+            # Start next window
+            self.SAMPLES = []
+            self.WINDOW_START = now
+            self.CONDITION.notify_all()
+
+
+    def close(self) -> None:
+        """Lets every waiting worker go, so it can see that the work is done."""
+        with self.CONDITION:
+            self.CLOSED = True
+            self.CONDITION.notify_all()
+
+
+    def best(self) -> Optional[dict]:
+        """Returns window with the highest throughput without overload.
+
+        Returns:
+            Number of workers, throughput, median latency and error rate of the window, None if there were none
+        """
+        with self.CONDITION:
+            windows = [window for window in self.HISTORY if not window["overloaded"]] or self.HISTORY
+        if not windows:
+            return None
+        return max(windows, key=lambda window: window["throughput"])
+
+
+    def print_summary(self) -> None:
+        """Prints final number of active workers and the best throughput found."""
+        best = self.best()
+        print(f"Active workers at the end: {self.LIMIT} of {self.MAXIMUM}")
+        if best is not None:
+            print(f"Best throughput: {best['throughput']:.2f} rows/s with {best['workers']} workers")
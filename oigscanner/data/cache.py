@@ -0,0 +1,189 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from oigscanner.data.evidence import evidence_exists, evidence_store
+from oigscanner.data.manifest import PATH_INDEX
+from oigscanner.results import scan_result
+from typing import Optional
+
+
+class result_cache:
+
+    def __init__(
+        self,
+        path: str = "results_cache.sqlite3",
+        ttl_days: Optional[float] = None
+        ):
+        """Opens persistent cache of scan results keyed by canonical name key and month/year.
+
+        Args:
+            path: path to the sqlite database file
+            ttl_days: number of days after which cached result is not used, None to keep forever
+        """
+
+        # Set path and time to live
+        self.PATH = path
+        self.TTL = ttl_days * 24 * 60 * 60 if ttl_days is not None else None
+
+        # Open database (shared by threads)
+        self.LOCK = threading.Lock()
+        self.CONNECTION = sqlite3.connect(path, check_same_thread=False)
+        with self.LOCK, self.CONNECTION:
+            self.CONNECTION.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT NOT NULL, "
+                "period TEXT NOT NULL, "
+                "found INTEGER NOT NULL, "
+                "path TEXT, "
+                "created REAL NOT NULL, "
+                "PRIMARY KEY (key, period))"
+            )
+
+
+    def close(self) -> None:
+        """Closes database."""
+        with self.LOCK:
+            self.CONNECTION.close()
+
+
+    def get(self, key: str, period: str, evidence: Optional[evidence_store] = None) -> Optional[scan_result]:
+        """Gets cached result if it is not expired and its evidence still exists.
+
+        Args:
+            key: canonical name key
+            period: month and year of the scan
+            evidence: store that may keep the evidence only in its manifest (hardlinks not supported)
+
+        Returns:
+            Cached result, None if not cached
+        """
+
+        # Find result
+        with self.LOCK:
+            row = self.CONNECTION.execute(
+                "SELECT found, path, created FROM results WHERE key = ? AND period = ?",
+                (key, period)
+            ).fetchone()
+        if row is None:
+            return None
+        found, path, created = row
+
+        # Check if expired or evidence was removed
+        if self.TTL is not None and time.time() - created > self.TTL:
+            return None
+        if path and not evidence_exists(path, evidence):
+            return None
+        return scan_result(True, bool(found), path, 0)
+
+
+    def get_period(self, period: str, evidence: Optional[evidence_store] = None) -> dict[str, scan_result]:
+        """Gets every cached result of a month/year that is not expired and whose evidence still exists.
+
+        Args:
+            period: month and year of the scan
+            evidence: store that may keep the evidence only in its manifest (hardlinks not supported)
+
+        Returns:
+            Cached result of every key
+        """
+        with self.LOCK:
+            rows = self.CONNECTION.execute(
+                "SELECT key, found, path, created FROM results WHERE period = ?",
+                (period,)
+            ).fetchall()
+        results = {}
+        for key, found, path, created in rows:
+            if self.TTL is not None and time.time() - created > self.TTL:
+                continue
+            if path and not evidence_exists(path, evidence):
+                continue
+            results[key] = scan_result(True, bool(found), path, 0)
+        return results
+
+
+    def put(self, key: str, period: str, result: scan_result) -> None:
+        """Saves result of a successful scan.
+
+        Args:
+            key: canonical name key
+            period: month and year of the scan
+            result: result of the scan
+        """
+        if not result.success or result.found is None:
+            return
+        with self.LOCK, self.CONNECTION:
+            self.CONNECTION.execute(
+                "INSERT OR REPLACE INTO results (key, period, found, path, created) VALUES (?, ?, ?, ?, ?)",
+                (key, period, int(result.found), result.path, time.time())
+            )
+
+
+    def invalidate(self, key: Optional[str] = None, period: Optional[str] = None) -> int:
+        """Removes cached results. Without arguments removes everything.
+
+        Args:
+            key: canonical name key to remove, None for every key
+            period: month and year to remove, None for every period
+
+        Returns:
+            Number of removed results
+        """
+        conditions, values = [], []
+        if key is not None:
+            conditions.append("key = ?")
+            values.append(key)
+        if period is not None:
+            conditions.append("period = ?")
+            values.append(period)
+        query = "DELETE FROM results"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self.LOCK, self.CONNECTION:
+            return self.CONNECTION.execute(query, values).rowcount
+
+
+    def purge_expired(self) -> int:
+        """Removes expired results.
+
+        Returns:
+            Number of removed results
+        """
+        if self.TTL is None:
+            return 0
+        with self.LOCK, self.CONNECTION:
+            return self.CONNECTION.execute(
+                "DELETE FROM results WHERE created < ?",
+                (time.time() - self.TTL,)
+            ).rowcount
+
+
+def reuse_evidence(source: str, destination: str, evidence: Optional[evidence_store] = None) -> str:
+    """Makes evidence available under given path by hardlinking (or copying) existing file.
+
+    Args:
+        source: path of the existing evidence
+        destination: path the evidence is expected at (extension of the source is kept)
+        evidence: store that may keep the source only in its manifest (its stored file is linked instead)
+
+    Returns:
+        Path of the evidence
+    """
+
+    # Evidence keeps its format (html snapshot or png screenshot)
+    destination = os.path.splitext(destination)[0] + os.path.splitext(source)[1]
+    if source == destination or os.path.isfile(destination):
+        return destination
+    if evidence is not None:
+        source = evidence.resolve(source) or source
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+    # Keep the name from being reserved for a new screenshot
+    PATH_INDEX.add(destination)
+    return destination
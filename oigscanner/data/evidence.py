@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import queue
+import struct
+import threading
+import zlib
+
+from oigscanner.data.manifest import PATH_INDEX
+from typing import Any, Callable, Optional
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def recompress_png(png: bytes, level: int = 9) -> bytes:
+    """Recompresses image data of a png losslessly (pixels and other chunks stay the same).
+
+    Args:
+        png: png file
+        level: zlib compression level
+
+    Returns:
+        Recompressed png, or the original one if it is not smaller or not a valid png
+    """
+    if not png.startswith(PNG_SIGNATURE):
+        return png
+
+    # Split into chunks
+    chunks = []
+    position = len(PNG_SIGNATURE)
+    while position + 8 <= len(png):
+        length, kind = struct.unpack(">I4s", png[position:position + 8])
+        chunks.append((kind, png[position + 8:position + 8 + length]))
+        position += 12 + length
+
+    # Join image data and compress it again
+    data = b"".join(chunk for kind, chunk in chunks if kind == b"IDAT")
+    try:
+        data = zlib.compress(zlib.decompress(data), level)
+    except zlib.error:
+        return png
+
+    # Put single image data chunk where the first one was
+    result = [PNG_SIGNATURE]
+    written = False
+    for kind, chunk in chunks:
+        if kind == b"IDAT":
+            if written:
+                continue
+            chunk = data
+            written = True
+        result.append(struct.pack(">I", len(chunk)) + kind + chunk + struct.pack(">I", zlib.crc32(kind + chunk)))
+    recompressed = b"".join(result)
+    return recompressed if len(recompressed) < len(png) else png
+
+
+class evidence_store:
+
+    def __init__(
+        self,
+        blobs: str = "evidence_blobs",
+        manifest: str = "evidence_manifest.jsonl",
+        recompress: bool = False,
+        queue_size: int = 100
+        ):
+        """Stores screenshots by their hash, so identical screenshots are saved once. Screenshots are
+        written by a background thread, their names are hardlinks to the stored file (or manifest entries
+        if hardlinks are not supported).
+
+        Only screenshots with the same pixels are the same: results pages show the searched name (the
+        "no results" page too), so screenshots of different names are never saved once. Saved space comes
+        from the same name screenshotted again (retries, duplicated rows, repeated runs of the same month).
+
+        Args:
+            blobs: folder where unique screenshots are stored
+            manifest: json lines file with name, hash and size of every screenshot
+            recompress: recompress png data losslessly before storing
+            queue_size: maximum number of screenshots waiting to be written
+        """
+
+        # Set folders and options
+        self.BLOBS = blobs
+        self.MANIFEST = manifest
+        self.RECOMPRESS = recompress
+
+        # Counters of written screenshots
+        self.WRITTEN = 0
+        self.DUPLICATES = 0
+
+        # Stored file of every written screenshot (from the manifest of previous runs too), screenshots
+        # waiting to be written and functions called once they are written
+        self.LOCK = threading.Lock()
+        self.PATHS = read_evidence_manifest(manifest, blobs)
+        self.PENDING = {}
+
+        # Start background writer
+        self.QUEUE = queue.Queue(maxsize=queue_size)
+        self.WRITER = threading.Thread(target=self.write_loop, name="evidence_store", daemon=True)
+        self.WRITER.start()
+
+
+    def __enter__(self) -> "evidence_store":
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+    def reserve(self, path: str) -> str:
+        """Reserves unique name for a screenshot, adds number to the name if it is taken.
+
+        Args:
+            path: path of the screenshot
+
+        Returns:
+            Unique path of the screenshot
+        """
+        return PATH_INDEX.reserve(path)
+
+
+    def put(self, png: bytes, path: str) -> None:
+        """Queues screenshot to be written. Waits if too many screenshots are waiting.
+
+        Args:
+            png: png file
+            path: path of the screenshot (reserved with reserve)
+        """
+        with self.LOCK:
+            self.PENDING.setdefault(path, [])
+        self.QUEUE.put((png, path))
+
+
+    def when_written(self, path: str, callback: Callable[[], Any]) -> None:
+        """Calls function once the screenshot is written, right away if it is not waiting to be written.
+        Functions of a screenshot that failed to be written are not called.
+
+        Args:
+            path: path of the screenshot
+            callback: function without arguments (called by the writer thread if the screenshot is waiting)
+        """
+        with self.LOCK:
+            if path in self.PENDING:
+                self.PENDING[path].append(callback)
+                return
+        callback()
+
+
+    def write(self, png: bytes, path: str) -> None:
+        """Writes screenshot once by its hash and links its name to it.
+
+        Args:
+            png: png file
+            path: path of the screenshot
+        """
+
+        # Write unique screenshot (exact hash, so screenshots of different names always differ)
+        digest = hashlib.sha256(png).hexdigest()
+        blob = os.path.join(self.BLOBS, digest[:2], digest + ".png")
+        if os.path.isfile(blob):
+            self.DUPLICATES += 1
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            temporary = blob + ".tmp"
+            with open(temporary, "wb") as file:
+                file.write(recompress_png(png) if self.RECOMPRESS else png)
+            os.replace(temporary, blob)
+            self.WRITTEN += 1
+
+        # Link the name to the screenshot (manifest entry is enough if links are not supported)
+        linked = True
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            os.link(blob, path)
+        except OSError:
+            linked = False
+
+        # Add manifest entry, the screenshot can be found by its name from now on
+        with open(self.MANIFEST, "a", encoding="utf-8") as manifest:
+            manifest.write(json.dumps({"path": path, "sha256": digest, "size": len(png), "linked": linked}) + "\n")
+        with self.LOCK:
+            self.PATHS[path] = blob
+
+
+    def write_loop(self) -> None:
+        """Writes queued screenshots until the store is closed."""
+        while True:
+            item = self.QUEUE.get()
+            try:
+                if item is None:
+                    return
+                png, path = item
+                written = False
+                try:
+                    self.write(png, path)
+                    written = True
+                except Exception as e:
+                    print(f"Failed to write screenshot {path}: {e}")
+
+                # Call functions waiting for the screenshot
+                with self.LOCK:
+                    callbacks = self.PENDING.pop(path, [])
+                for callback in callbacks if written else ():
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"Failed after writing screenshot {path}: {e}")
+            finally:
+                self.QUEUE.task_done()
+
+
+    def flush(self) -> None:
+        """Waits until every queued screenshot is written."""
+        self.QUEUE.join()
+
+
+    def close(self) -> None:
+        """Writes queued screenshots and stops the writer."""
+        self.QUEUE.put(None)
+        self.WRITER.join()
+
+
+    def resolve(self, path: str) -> Optional[str]:
+        """Finds file of a screenshot by its name: the name itself if it is a file (a link), otherwise the stored
+        file from the manifest. Screenshots waiting to be written are not found.
+
+        Args:
+            path: path of the screenshot
+
+        Returns:
+            Path of the file, None if not found
+        """
+        if os.path.isfile(path):
+            return path
+        with self.LOCK:
+            blob = self.PATHS.get(path)
+        return blob if blob is not None and os.path.isfile(blob) else None
+
+
+def read_evidence_manifest(manifest: str, blobs: str) -> dict[str, str]:
+    """Reads manifest of an evidence store.
+
+    Args:
+        manifest: json lines file with name, hash and size of every screenshot
+        blobs: folder where unique screenshots are stored
+
+    Returns:
+        Stored file of every screenshot name (the last entry of a name)
+    """
+    paths = {}
+    if not os.path.isfile(manifest):
+        return paths
+    with open(manifest, encoding="utf-8") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            paths[entry["path"]] = os.path.join(blobs, entry["sha256"][:2], entry["sha256"] + ".png")
+    return paths
+
+
+def evidence_exists(path: str, evidence: Optional[evidence_store] = None) -> bool:
+    """Checks if evidence exists as a file or, if hardlinks are not supported, in the evidence store.
+
+    Args:
+        path: path of the evidence
+        evidence: store the evidence may have been written to
+
+    Returns:
+        True if the evidence can be read
+    """
+    if evidence is not None:
+        return evidence.resolve(path) is not None
+    return os.path.isfile(path)
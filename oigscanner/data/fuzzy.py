@@ -0,0 +1,294 @@
+import unicodedata
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from oigscanner.data.leie import read_leie
+from typing import Union
+
+
+# Number of bits in a hashed set of trigrams of a name
+TRIGRAM_BITS = 512
+
+# Number of names whose bits are set at once (bits of a block are kept as bytes before they are packed)
+TRIGRAM_BLOCK = 4096
+
+# Number of set bits of every byte
+BYTE_BITS = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint16)
+
+# Words that do not tell entities apart
+ENTITY_STOP_WORDS = {
+    "the", "of", "and", "a", "an", "inc", "llc", "llp", "lp", "ltd", "co", "corp", "corporation",
+    "company", "pc", "pa", "pllc", "dba", "group", "services", "service", "health", "care",
+    "healthcare", "medical", "center", "centre"
+}
+
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6"
+}
+
+
+def soundex(word: str) -> str:
+    """Returns american soundex code of a word ("Jon" and "John" are "J500").
+
+    Args:
+        word: lowercase word
+
+    Returns:
+        Soundex code, empty string for a word without letters
+    """
+    letters = [letter for letter in word if "a" <= letter <= "z"]
+    if not letters:
+        return ""
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code, vowels do
+        if letter not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def name_tokens(names: pd.Series) -> pd.Series:
+    """Normalizes names into lists of words (accents, hyphens and punctuation removed).
+
+    Args:
+        names: pandas series with names
+
+    Returns:
+        Pandas series with lists of lowercase words
+    """
+    names = names.astype(object).fillna("").astype(str)
+    names = names.map(lambda name: unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii"))
+    names = names.str.casefold().str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip()
+    return names.str.split()
+
+
+def trigram_hash(trigram: str) -> int:
+    """Returns the bit of a trigram in a set of bits.
+
+    Args:
+        trigram: three characters
+
+    Returns:
+        Position of the bit
+    """
+    return zlib.crc32(trigram.encode("utf-8")) % TRIGRAM_BITS
+
+
+def trigram_bits(names: pd.Series) -> np.ndarray:
+    """Hashes trigrams of every name (words sorted, so transposed names match) into a set of bits.
+    Trigrams of every name are taken at once from the bytes of the joined names (words of name_tokens
+    are ascii), each distinct trigram is hashed once.
+
+    Args:
+        names: pandas series with lists of words
+
+    Returns:
+        Array with one row of bits (as 64 bit words) for every name
+    """
+    texts = [" " + " ".join(sorted(tokens)) + " " for tokens in names]
+    joined = "".join(texts)
+
+    # Words that are not ascii have trigrams of characters, not bytes
+    if not joined.isascii():
+        rows = [i for i, text in enumerate(texts) for j in range(len(text) - 2)]
+        hashes = [trigram_hash(text[j:j + 3]) for text in texts for j in range(len(text) - 2)]
+        return pack_bits(np.array(rows, dtype=np.intp), np.array(hashes, dtype=np.intp), len(texts))
+
+    # Trigram at every position that is not across two names (as a number of its three 7 bit characters)
+    characters = np.frombuffer(joined.encode("ascii"), dtype=np.uint8).astype(np.int32)
+    lengths = np.fromiter(map(len, texts), np.intp, len(texts))
+    rows = np.repeat(np.arange(len(texts)), lengths)
+    offsets = np.arange(len(characters)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    inside = (offsets <= np.repeat(lengths, lengths) - 3)[:-2]
+    trigrams = ((characters[:-2] << 14) | (characters[1:-1] << 7) | characters[2:])[inside]
+
+    # Hash every distinct trigram once (a table of every possible trigram)
+    table = np.zeros(1 << 21, dtype=bool)
+    table[trigrams] = True
+    distinct = np.flatnonzero(table)
+    hashes = np.zeros(1 << 21, dtype=np.int16)
+    hashes[distinct] = [
+        trigram_hash(chr(code >> 14) + chr((code >> 7) & 127) + chr(code & 127)) for code in distinct.tolist()
+    ]
+    return pack_bits(rows[:-2][inside], hashes[trigrams], len(texts))
+
+
+def pack_bits(rows: np.ndarray, hashes: np.ndarray, number: int) -> np.ndarray:
+    """Sets bits of trigrams in blocks of names and packs them into 64 bit words.
+
+    Args:
+        rows: name of every trigram (in order)
+        hashes: bit of every trigram
+        number: number of names
+
+    Returns:
+        Array with one row of bits (as 64 bit words) for every name
+    """
+    packed = np.zeros((number, TRIGRAM_BITS // 8), dtype=np.uint8)
+    bounds = np.searchsorted(rows, np.arange(0, number + TRIGRAM_BLOCK, TRIGRAM_BLOCK))
+    for start, first, last in zip(range(0, number, TRIGRAM_BLOCK), bounds[:-1], bounds[1:]):
+        bits = np.zeros((min(TRIGRAM_BLOCK, number - start), TRIGRAM_BITS), dtype=bool)
+        bits[rows[first:last] - start, hashes[first:last]] = True
+        packed[start:start + len(bits)] = np.packbits(bits, axis=1)
+    return packed.view(np.uint64).reshape(number, TRIGRAM_BITS // 64)
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """Counts set bits in every row.
+
+    Args:
+        bits: array of 64 bit words
+
+    Returns:
+        Number of set bits of every row
+    """
+    return BYTE_BITS[bits.view(np.uint8)].sum(axis=1)
+
+
+def blocking_keys(tokens: pd.Series, others: pd.Series = None) -> pd.DataFrame:
+    """Makes keys of records that can be similar: soundex of every word of the name plus the initial of the
+    other name (for individuals), or soundex of the first two significant words (for entities).
+
+    Args:
+        tokens: words of last names or entity names
+        others: words of first names, None for entities
+
+    Returns:
+        Pandas dataframe with position of the record and its key
+    """
+    positions, keys = [], []
+    for position, words in enumerate(tokens):
+        if others is None:
+            significant = [word for word in words if word not in ENTITY_STOP_WORDS] or words
+            record_keys = {soundex(word) for word in significant[:2]}
+        else:
+            initial = others.iloc[position][0][0] if others.iloc[position] else ""
+            record_keys = {soundex(word) + initial for word in words}
+        for key in record_keys:
+            if key:
+                positions.append(position)
+                keys.append(key)
+    return pd.DataFrame({"position": positions, "key": keys})
+
+
+class fuzzy_index:
+
+    def __init__(self, leie: Union[str, pd.DataFrame]):
+        """Builds phonetic and trigram index over the LEIE exclusion file to find near misses
+        (misspelled, hyphenated or transposed names).
+
+        Args:
+            leie: path to the LEIE csv file or dataframe returned by read_leie
+        """
+
+        # Read exclusion file
+        if isinstance(leie, str):
+            leie = read_leie(leie)
+
+        # Index individuals
+        individuals = leie[leie["LASTNAME"].str.strip() != ""].reset_index(drop=True)
+        last_names = name_tokens(individuals["LASTNAME"])
+        first_names = name_tokens(individuals["FIRSTNAME"])
+        self.INDIVIDUALS = individuals
+        self.INDIVIDUAL_KEYS = blocking_keys(last_names, first_names)
+        self.INDIVIDUAL_BITS = trigram_bits(last_names + first_names)
+
+        # Index entities
+        entities = leie[leie["BUSNAME"].str.strip() != ""].reset_index(drop=True)
+        entity_names = name_tokens(entities["BUSNAME"])
+        self.ENTITIES = entities
+        self.ENTITY_KEYS = blocking_keys(entity_names)
+        self.ENTITY_BITS = trigram_bits(entity_names)
+
+
+    def candidates(
+        self,
+        data: pd.DataFrame,
+        threshold: float = 0.8,
+        limit: int = 3,
+        batch_size: int = 200000
+        ) -> pd.DataFrame:
+        """Scores every row of the data against similar records of the exclusion file.
+
+        Args:
+            data: pandas dataframe from normalize_data_oig with either two columns or one
+            threshold: minimum similarity (0 to 1) of a candidate
+            limit: maximum number of candidates of a row
+            batch_size: number of pairs scored at once
+
+        Returns:
+            Pandas dataframe with index of the row, similarity score and the record of the exclusion file
+        """
+
+        # Make keys and trigram bits of the data (transposed individuals match on both orders of names)
+        if len(data.columns) == 1:
+            records, record_keys, record_bits = self.ENTITIES, self.ENTITY_KEYS, self.ENTITY_BITS
+            tokens = name_tokens(data.iloc[:, 0])
+            keys = blocking_keys(tokens)
+        else:
+            records, record_keys, record_bits = self.INDIVIDUALS, self.INDIVIDUAL_KEYS, self.INDIVIDUAL_BITS
+            last_names = name_tokens(data.iloc[:, 0])
+            first_names = name_tokens(data.iloc[:, 1])
+            tokens = last_names + first_names
+            keys = pd.concat([blocking_keys(last_names, first_names), blocking_keys(first_names, last_names)])
+        bits = trigram_bits(tokens)
+
+        # Find pairs of rows and records with the same key
+        pairs = keys.merge(record_keys, on="key", suffixes=("", "_record"))
+        pairs = pairs[["position", "position_record"]].drop_duplicates().to_numpy()
+
+        # Score pairs in batches with trigram similarity (dice coefficient)
+        counts = popcount(bits)
+        record_counts = popcount(record_bits)
+        scored = []
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            shared = popcount(bits[batch[:, 0]] & record_bits[batch[:, 1]])
+            total = counts[batch[:, 0]] + record_counts[batch[:, 1]]
+            scores = np.divide(2 * shared, total, out=np.zeros(len(batch)), where=total > 0)
+            keep = scores >= threshold
+            scored.append(pd.DataFrame({
+                "position": batch[keep, 0],
+                "record": batch[keep, 1],
+                "score": scores[keep]
+            }))
+        if not scored:
+            scored = [pd.DataFrame({"position": [], "record": [], "score": []})]
+
+        # Keep best candidates of every row
+        candidates = pd.concat(scored).astype({"position": int, "record": int})
+        candidates = candidates.sort_values(["position", "score"], ascending=[True, False])
+        candidates = candidates.groupby("position").head(limit)
+
+        # Add index of the row and the record
+        result = records.iloc[candidates["record"].to_numpy()].reset_index(drop=True)
+        result.insert(0, "score", candidates["score"].to_numpy())
+        result.insert(0, "row", data.index[candidates["position"].to_numpy()])
+        return result
+
+
+    def flag(self, data: pd.DataFrame, threshold: float = 0.8) -> pd.Series:
+        """Flags rows that have a similar record in the exclusion file, so they are verified with the browser.
+
+        Args:
+            data: pandas dataframe from normalize_data_oig with either two columns or one
+            threshold: minimum similarity (0 to 1) of a candidate
+
+        Returns:
+            Pandas series with True for rows that have candidates
+        """
+        candidates = self.candidates(data, threshold, limit=1)
+        return pd.Series(data.index.isin(candidates["row"]), index=data.index)
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from oigscanner.data.evidence import evidence_exists, evidence_store
+from typing import Any, Optional
+
+
+class run_journal:
+
+    def __init__(
+        self,
+        path: str = "journal.jsonl",
+        flush_every: int = 100,
+        flush_interval: float = 1.0
+        ):
+        """Opens append-only journal of row outcomes. Entries are written in batches by a background
+        thread, so recording an outcome does not wait for the disk. Every run starts with a header
+        (input file, its hash and the period), see start.
+
+        Args:
+            path: path to the journal file (json lines)
+            flush_every: number of entries that triggers writing to the disk
+            flush_interval: maximum number of seconds entries stay in memory
+        """
+
+        # Set path and flushing options
+        self.PATH = path
+        self.FLUSH_EVERY = flush_every
+        self.FLUSH_INTERVAL = flush_interval
+
+        # Read header and entries of previous runs
+        self.HEADER, self.PREVIOUS = read_journal(path)
+
+        # Open file and buffer for entries (end incomplete line of a crashed run)
+        self.FILE = open(path, "a", encoding="utf-8")
+        if self.FILE.tell() > 0:
+            with open(path, "rb") as journal:
+                journal.seek(-1, os.SEEK_END)
+                if journal.read(1) != b"\n":
+                    self.FILE.write("\n")
+        self.BUFFER = []
+        self.CONDITION = threading.Condition()
+        self.CLOSED = False
+
+        # Start background writer
+        self.WRITER = threading.Thread(target=self.write_loop, name="run_journal", daemon=True)
+        self.WRITER.start()
+
+
+    def __enter__(self) -> "run_journal":
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+    def start(
+        self,
+        period: str,
+        source: Optional[str] = None,
+        digest: Optional[str] = None,
+        resume: bool = False
+        ) -> None:
+        """Writes header of a run. When resuming, checks that previous runs were of the same input and period,
+        so rows of another roster are never taken as done.
+
+        Args:
+            period: month and year of the scan
+            source: path of the input file
+            digest: hash of the input (see file_digest and frame_digest), None if it is not known
+            resume: True if the run resumes previous runs, False if it starts over
+
+        Raises:
+            ValueError: resuming a journal of another input or period, or an input without hash
+        """
+        if resume and self.PREVIOUS:
+            if self.HEADER is None:
+                raise ValueError(f"Journal {self.PATH} has no run header, scan again instead of resuming")
+            if self.HEADER["period"] != period:
+                raise ValueError(f"Journal {self.PATH} is for {self.HEADER['period']}, not for {period}")
+            if digest is None or self.HEADER["hash"] != digest:
+                raise ValueError(f"Journal {self.PATH} is for another input ({self.HEADER['input'] or 'a dataframe'})")
+
+        # Rows of previous runs count only when resuming
+        if not resume:
+            self.PREVIOUS = {}
+        self.HEADER = {
+            "type": "run",
+            "input": source,
+            "hash": digest,
+            "period": period,
+            "resume": resume,
+            "time": round(time.time(), 3)
+        }
+        with self.CONDITION:
+            self.BUFFER.append(self.HEADER)
+
+
+    def record(
+        self,
+        row_id: Any,
+        key: str,
+        status: str,
+        path: Optional[str] = None,
+        attempts: int = 0,
+        duration: float = 0.0,
+        found: Optional[bool] = None
+        ) -> None:
+        """Records outcome of a row.
+
+        Args:
+            row_id: id of the row (index of the dataframe)
+            key: canonical name key
+            status: "done" or "failed"
+            path: path of the evidence
+            attempts: number of attempts made
+            duration: time spent on the row in seconds
+            found: True if the record was found, None if unknown
+        """
+        entry = {
+            "row": str(row_id),
+            "key": key,
+            "status": status,
+            "found": found,
+            "path": path,
+            "attempts": attempts,
+            "duration": round(duration, 3),
+            "time": round(time.time(), 3)
+        }
+        with self.CONDITION:
+            self.BUFFER.append(entry)
+            if len(self.BUFFER) >= self.FLUSH_EVERY:
+                self.CONDITION.notify()
+
+
+    def write(self) -> None:
+        """Writes buffered entries to the disk and syncs the file."""
+        with self.CONDITION:
+            entries, self.BUFFER = self.BUFFER, []
+        if not entries:
+            return
+        self.FILE.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self.FILE.flush()
+        os.fsync(self.FILE.fileno())
+
+
+    def write_loop(self) -> None:
+        """Writes entries every flush interval or when enough entries are buffered."""
+        while True:
+            with self.CONDITION:
+                if not self.CLOSED and len(self.BUFFER) < self.FLUSH_EVERY:
+                    self.CONDITION.wait(self.FLUSH_INTERVAL)
+                closed = self.CLOSED
+            self.write()
+            if closed:
+                return
+
+
+    def close(self) -> None:
+        """Writes remaining entries and closes the journal."""
+        with self.CONDITION:
+            if self.CLOSED:
+                return
+            self.CLOSED = True
+            self.CONDITION.notify()
+        self.WRITER.join()
+        self.FILE.close()
+
+
+    def completed(self, row_id: Any, key: str, evidence: Optional[evidence_store] = None) -> Optional[dict]:
+        """Checks if a row was done in previous runs of the same input: the row with the same id has the same
+        canonical key, is done and its evidence still exists.
+
+        Args:
+            row_id: id of the row (index of the dataframe)
+            key: canonical name key of the row
+            evidence: store that may keep the evidence only in its manifest (hardlinks not supported)
+
+        Returns:
+            Entry of the row, None if the row has to be scanned
+        """
+        entry = self.PREVIOUS.get(str(row_id))
+        if entry is None or entry["status"] != "done" or entry["key"] != key:
+            return None
+        if entry["path"] is not None and not evidence_exists(entry["path"], evidence):
+            return None
+        return entry
+
+
+def read_journal(path: str) -> tuple[Optional[dict], dict[str, dict]]:
+    """Reads journal and returns header of the last run and the last entry of every row since the run that
+    the last run resumes. Ignores incomplete last line of a crashed run.
+
+    Args:
+        path: path to the journal file
+
+    Returns:
+        Header of the last run (None if there is none) and last entry of every row id
+    """
+    header, entries = None, {}
+    if not os.path.isfile(path):
+        return header, entries
+    with open(path, encoding="utf-8") as journal:
+        for line in journal:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            # Run header, rows of earlier runs are forgotten unless the run resumes the same input and period
+            if entry.get("type") == "run":
+                resumed = entry.get("resume") and header is not None and (
+                    (header["hash"], header["period"]) == (entry["hash"], entry["period"])
+                )
+                if not resumed:
+                    entries = {}
+                header = entry
+                continue
+            entries[entry["row"]] = entry
+    return header, entries
+
+
+def file_digest(path: str) -> str:
+    """Returns sha256 hash of a file (read in blocks, so big files are not loaded into memory).
+
+    Args:
+        path: path to the file
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def frame_digest(data: pd.DataFrame) -> str:
+    """Returns sha256 hash of the index and values of a dataframe.
+
+    Args:
+        data: pandas dataframe
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    digest.update("|".join(str(column) for column in data.columns).encode("utf-8"))
+    return digest.hexdigest()
@@ -0,0 +1,134 @@
+import pandas as pd
+
+from oigscanner.data.processing import canonical_key, canonical_keys
+from typing import Callable, Union
+
+
+# Columns of the LEIE exclusion file (UPDATED.csv) used for matching
+LEIE_COLUMNS = ["LASTNAME", "FIRSTNAME", "MIDNAME", "BUSNAME", "EXCLTYPE", "EXCLDATE", "REINDATE"]
+
+
+def read_leie(path_csv: str) -> pd.DataFrame:
+    """Reads LEIE exclusion file (UPDATED.csv layout) or its monthly supplement.
+
+    Args:
+        path_csv: path to the csv file
+
+    Returns:
+        Pandas dataframe with LEIE columns as strings
+    """
+    data = pd.read_csv(
+        path_csv,
+        dtype=str,
+        keep_default_na=False,
+        usecols=lambda column: column.strip().upper() in LEIE_COLUMNS
+    )
+    data.columns = [column.strip().upper() for column in data.columns]
+    return data
+
+
+class leie_index:
+
+    def __init__(self, leie: Union[str, pd.DataFrame]):
+        """Loads LEIE exclusion file and builds hash indexes on normalized names.
+
+        Args:
+            leie: path to the LEIE csv file or dataframe returned by read_leie
+        """
+
+        # Read exclusion file
+        if isinstance(leie, str):
+            leie = read_leie(leie)
+        self.RECORDS = leie
+
+        # Individuals have last name, entities have business name
+        individuals = leie["LASTNAME"].str.strip() != ""
+        entities = leie["BUSNAME"].str.strip() != ""
+
+        # Make keys of every record once (lookup uses them too): last name and first name, last name and
+        # first initial, business name
+        self.INDIVIDUAL_KEYS = canonical_keys(leie[["LASTNAME", "FIRSTNAME"]])
+        self.ENTITY_KEYS = canonical_keys(leie[["BUSNAME"]])
+        initial_keys = canonical_keys(pd.DataFrame({
+            "LASTNAME": leie.loc[individuals, "LASTNAME"],
+            "FIRSTNAME": leie.loc[individuals, "FIRSTNAME"].str.strip().str[:1]
+        }))
+
+        # Build indexes
+        self.INDIVIDUALS = pd.Index(self.INDIVIDUAL_KEYS[individuals].unique())
+        self.INITIALS = pd.Index(initial_keys.unique())
+        self.ENTITIES = pd.Index(self.ENTITY_KEYS[entities].unique())
+
+
+    def match(self, data: pd.DataFrame, partial: bool = False) -> pd.Series:
+        """Matches every row of the data against the exclusion file in one pass.
+
+        Args:
+            data: pandas dataframe from normalize_data_oig with either two columns or one
+            partial: for individuals match last name and first initial instead of full first name
+
+        Returns:
+            Pandas series with True for rows found in the exclusion file
+        """
+
+        # Match entities
+        if len(data.columns) == 1:
+            return canonical_keys(data).isin(self.ENTITIES)
+
+        # Match individuals
+        if partial:
+            initials = pd.DataFrame({
+                "last": data.iloc[:, 0],
+                "first": data.iloc[:, 1].astype(str).str.strip().str[:1]
+            }, index=data.index)
+            return canonical_keys(initials).isin(self.INITIALS)
+        return canonical_keys(data).isin(self.INDIVIDUALS)
+
+
+    def lookup(self, *values: str) -> pd.DataFrame:
+        """Finds records of the exclusion file for a single name.
+
+        Args:
+            values: last name and first name or entity name
+
+        Returns:
+            Pandas dataframe with matching records of the exclusion file
+        """
+        keys = self.ENTITY_KEYS if len(values) == 1 else self.INDIVIDUAL_KEYS
+        return self.RECORDS[keys == canonical_key(*values)]
+
+
+    def prescreen(
+        self,
+        data: pd.DataFrame,
+        evidence_policy: Union[str, Callable[[pd.DataFrame], pd.Series]] = "hits",
+        partial: bool = True
+        ) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Splits the data into rows that should go to the browser and rows that are clean.
+
+        Args:
+            data: pandas dataframe from normalize_data_oig with either two columns or one
+            evidence_policy: which rows need a screenshot besides hits. "hits" - only hits,
+                "all" - every row, or function that returns True for rows that need evidence
+            partial: for individuals match last name and first initial (more hits, nothing missed)
+
+        Returns:
+            Rows to scan with the browser and rows that are clean
+        """
+
+        # Match the data
+        hits = self.match(data, partial)
+
+        # Add rows required by the policy
+        if evidence_policy == "hits":
+            scan = hits
+        elif evidence_policy == "all":
+            scan = pd.Series(True, index=data.index)
+        elif callable(evidence_policy):
+            scan = hits | evidence_policy(data).astype(bool)
+        else:
+            raise ValueError(f"Unknown evidence policy: {evidence_policy}")
+
+        # Print and return
+        print(f"Prescreen: {int(hits.sum())} hits, {int(scan.sum())} to scan, {int((~scan).sum())} clean")
+        return data[scan], data[~scan]
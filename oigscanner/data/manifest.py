@@ -0,0 +1,311 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from oigscanner.results import scan_result
+from typing import Any, Optional
+
+
+def shard_path(path: str) -> str:
+    """Puts a file into a subfolder named by the first letter of its name ("0-9" for digits, "_" for others),
+    so folders stay small.
+
+    Args:
+        path: path of the file
+
+    Returns:
+        Path of the file in the subfolder
+    """
+    folder, name = os.path.split(path)
+    first = name[:1].upper()
+    if first.isdigit():
+        shard = "0-9"
+    elif "A" <= first <= "Z":
+        shard = first
+    else:
+        shard = "_"
+    return os.path.join(folder, shard, name)
+
+
+class path_index:
+
+    def __init__(self):
+        """Index of taken file names shared by every thread. Each folder is listed once, after that
+        unique names are reserved in memory without checking the disk. Other processes do not see the
+        names, so worker processes also take every name in the queue they share (see SHARED)."""
+        self.TAKEN = set()
+        self.FOLDERS = set()
+        self.NEXT_NUMBER = {}
+        self.LOCK = threading.Lock()
+
+        # Function that takes a name for every process (True if no process took it before), None for one process
+        self.SHARED = None
+
+
+    def load(self, folder: str) -> None:
+        """Adds names of files in the folder to the index (called holding the lock).
+
+        Args:
+            folder: path of the folder
+        """
+        self.FOLDERS.add(folder)
+        if not os.path.isdir(folder or "."):
+            return
+        with os.scandir(folder or ".") as entries:
+            for entry in entries:
+                self.TAKEN.add(os.path.join(folder, entry.name))
+
+
+    def reserve(self, path: str) -> str:
+        """Reserves unique name for a file, adds number to the name if it is taken ("name(1).png").
+
+        Args:
+            path: path of the file
+
+        Returns:
+            Unique path of the file
+        """
+        folder = os.path.dirname(path)
+        base, extension = os.path.splitext(path)
+        with self.LOCK:
+            if folder not in self.FOLDERS:
+                self.load(folder)
+
+            # Take the name or the next free number of the name (free in every process)
+            unique_path = path
+            i = self.NEXT_NUMBER.get(path, 1)
+            while unique_path in self.TAKEN or (self.SHARED is not None and not self.SHARED(unique_path)):
+                self.TAKEN.add(unique_path)
+                unique_path = f"{base}({i}){extension}"
+                i += 1
+            self.NEXT_NUMBER[path] = i
+            self.TAKEN.add(unique_path)
+            return unique_path
+
+
+    def add(self, path: str) -> None:
+        """Marks a file created without reserve as taken (for example reused evidence).
+
+        Args:
+            path: path of the file
+        """
+        folder = os.path.dirname(path)
+        with self.LOCK:
+            if folder not in self.FOLDERS:
+                self.load(folder)
+            self.TAKEN.add(path)
+            if self.SHARED is not None:
+                self.SHARED(path)
+
+
+# Index shared by every scanner of the process
+PATH_INDEX = path_index()
+
+
+# Columns of the manifest
+COLUMNS = [
+    "row", "key", "name", "status", "found", "path", "attempts", "restarts", "error", "cached", "origin", "worker",
+    "duration", "time"
+]
+
+
+class results_manifest:
+
+    def __init__(
+        self,
+        path_csv: Optional[str] = "results_manifest.csv",
+        path_parquet: Optional[str] = None,
+        shard_rows: int = 10000
+        ):
+        """Collects outcome of every row of a run and writes it as csv and parquet. Rows are appended to
+        shard files as they finish, so memory does not grow with the run, and write merges the shards
+        into the manifest.
+
+        Args:
+            path_csv: path to the csv file, None to not write it
+            path_parquet: path to the parquet file, None to not write it (needs pyarrow, raises ImportError
+                if it is not installed, so the run does not find out at the end)
+            shard_rows: number of rows kept in memory before they are appended to a shard file
+        """
+        if path_parquet:
+            try:
+                import pyarrow.parquet
+            except ImportError as e:
+                raise ImportError("Parquet manifest requires pyarrow (pip install oigscanner[parquet])") from e
+
+        self.PATH_CSV = path_csv
+        self.PATH_PARQUET = path_parquet
+        self.SHARD_ROWS = max(shard_rows, 1)
+
+        # Rows not written yet, shard files (created in a temporary folder next to the manifest)
+        self.ROWS = []
+        self.SHARDS = []
+        self.FOLDER = None
+        self.LOCK = threading.Lock()
+        self.WRITE_LOCK = threading.Lock()
+
+        # Counters for the summary
+        self.COUNT = 0
+        self.HITS = 0
+        self.FAILED = 0
+
+
+    def add(
+        self,
+        row_id: Any,
+        key: str,
+        values: list[str],
+        result: scan_result,
+        duration: float,
+        worker: Any = None,
+        cached: bool = False,
+        origin: Optional[str] = None
+        ) -> None:
+        """Adds final outcome of a row.
+
+        Args:
+            row_id: id of the row (index of the dataframe)
+            key: canonical name key
+            values: normalized last name and first name or entity name
+            result: result of the scan
+            duration: time spent on the row in seconds
+            worker: id of the worker that scanned the row
+            cached: True if the result was reused from the cache
+            origin: where the result comes from: "scan", "cache", "duplicate" (result of the same name in the run),
+                "journal" (done in a resumed run) or "carried" (carried forward by rescreen); "scan" or "cache" if not given
+        """
+        row = {
+            "row": str(row_id),
+            "key": key,
+            "name": " ".join(str(value) for value in values),
+            "status": "done" if result.success else "failed",
+            "found": result.found,
+            "path": result.path,
+            "attempts": result.attempts,
+            "restarts": result.restarts,
+            "error": result.error,
+            "cached": cached,
+            "origin": origin or ("cache" if cached else "scan"),
+            "worker": None if worker is None else str(worker),
+            "duration": round(duration, 3),
+            "time": round(time.time(), 3)
+        }
+        with self.LOCK:
+            self.ROWS.append(row)
+            self.COUNT += 1
+            self.HITS += bool(result.found)
+            self.FAILED += not result.success
+            if len(self.ROWS) < self.SHARD_ROWS:
+                return
+            rows, self.ROWS = self.ROWS, []
+        self.write_shard(rows)
+
+
+    def write_shard(self, rows: list[dict]) -> None:
+        """Appends rows to a new shard file.
+
+        Args:
+            rows: rows of the manifest
+        """
+        with self.WRITE_LOCK:
+            if self.FOLDER is None:
+                folder = os.path.dirname(self.PATH_CSV or self.PATH_PARQUET or "") or "."
+                self.FOLDER = tempfile.mkdtemp(prefix=".results_manifest-", dir=folder)
+            path = os.path.join(self.FOLDER, f"{len(self.SHARDS):06d}.pkl")
+            manifest_frame(rows).to_pickle(path)
+            self.SHARDS.append(path)
+
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns outcomes of every row added so far as a dataframe (loads every shard into memory)."""
+        with self.LOCK:
+            rows = list(self.ROWS)
+        with self.WRITE_LOCK:
+            shards = [pd.read_pickle(shard) for shard in self.SHARDS]
+        return pd.concat(shards + [manifest_frame(rows)], ignore_index=True)
+
+
+    def write(self) -> int:
+        """Merges shards into the manifest files one shard at a time and removes them.
+
+        Returns:
+            Number of rows in the manifest
+        """
+
+        # Rows left in memory are the last shard
+        with self.LOCK:
+            rows, self.ROWS = self.ROWS, []
+        if rows or not self.SHARDS:
+            self.write_shard(rows)
+
+        with self.WRITE_LOCK:
+
+            # pyarrow is needed only for parquet (checked when the manifest is made)
+            parquet = None
+            if self.PATH_PARQUET:
+                import pyarrow
+                import pyarrow.parquet
+                schema = parquet_schema(pyarrow)
+                parquet = pyarrow.parquet.ParquetWriter(self.PATH_PARQUET + ".tmp", schema)
+
+            # Append every shard to the files (replaced whole when done)
+            csv = open(self.PATH_CSV + ".tmp", "w", encoding="utf-8", newline="") if self.PATH_CSV else None
+            try:
+                for i, shard in enumerate(self.SHARDS):
+                    data = pd.read_pickle(shard)
+                    if csv is not None:
+                        data.to_csv(csv, header=i == 0, index=False)
+                    if parquet is not None:
+                        parquet.write_table(pyarrow.Table.from_pandas(data, schema=schema, preserve_index=False))
+            finally:
+                if csv is not None:
+                    csv.close()
+                if parquet is not None:
+                    parquet.close()
+            if csv is not None:
+                os.replace(self.PATH_CSV + ".tmp", self.PATH_CSV)
+            if parquet is not None:
+                os.replace(self.PATH_PARQUET + ".tmp", self.PATH_PARQUET)
+
+            # Remove shards
+            shutil.rmtree(self.FOLDER, ignore_errors=True)
+            self.FOLDER = None
+            self.SHARDS = []
+
+        # Print summary
+        print(f"Manifest: {self.COUNT} rows, {self.HITS} hits, {self.FAILED} failed")
+        return self.COUNT
+
+
+def manifest_frame(rows: list[dict]) -> pd.DataFrame:
+    """Makes dataframe with columns and types of the manifest.
+
+    Args:
+        rows: rows of the manifest
+
+    Returns:
+        Pandas dataframe
+    """
+    data = pd.DataFrame(rows, columns=COLUMNS)
+    return data.astype({"found": "boolean", "attempts": "int64", "restarts": "int64", "cached": "bool"})
+
+
+def parquet_schema(pyarrow: Any) -> Any:
+    """Returns schema of the parquet manifest, so every shard is written with the same types.
+
+    Args:
+        pyarrow: pyarrow module
+
+    Returns:
+        Pyarrow schema
+    """
+    string, boolean, integer, number = pyarrow.string(), pyarrow.bool_(), pyarrow.int64(), pyarrow.float64()
+    return pyarrow.schema([
+        ("row", string), ("key", string), ("name", string), ("status", string), ("found", boolean),
+        ("path", string), ("attempts", integer), ("restarts", integer), ("error", string), ("cached", boolean),
+        ("origin", string), ("worker", string), ("duration", number), ("time", number)
+    ])
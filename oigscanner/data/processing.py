@@ -1,28 +1,274 @@
-import pandas as pd 
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+# Typographic variants of quotes, dashes and spaces replaced with plain ones
+PUNCTUATION_VARIANTS = str.maketrans({
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "`": "'", "´": "'",
+    "“": '"', "”": '"', "„": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "―": "-", "−": "-",
+    "\u00a0": " ", "\u200b": "", "\ufeff": ""
+})
+
+# Characters stripped from both ends of a name (stray commas and quotes around cells)
+EDGE_CHARACTERS = " ,;:'\""
+
+
+# Typographic variants found in a name (replaced with PUNCTUATION_VARIANTS)
+VARIANTS = re.compile("[" + "".join(map(chr, PUNCTUATION_VARIANTS)) + "]")
+
+# Separator of names joined into one string, so every name is normalized at once
+SEPARATOR = "\x00"
+
+# Edge characters as a lookup table of bytes
+EDGE_BYTES = np.zeros(256, dtype=bool)
+EDGE_BYTES[list(EDGE_CHARACTERS.encode("ascii"))] = True
+
+
+def clean_name(value: str) -> str:
+    """Normalizes a single name: unicode NFKC, plain punctuation, single spaces, no stray edge characters.
+
+    Args:
+        value: name
+
+    Returns:
+        Normalized name
+    """
+    value = unicodedata.normalize("NFKC", str(value)).translate(PUNCTUATION_VARIANTS)
+    value = re.sub(r"\s*-\s*", "-", re.sub(r"\s+", " ", value))
+    return value.strip(EDGE_CHARACTERS)
+
+
+def split_joined(joined: str, number: int) -> list[str]:
+    """Splits names joined with SEPARATOR, None if a name contains the separator itself.
+
+    Args:
+        joined: joined names
+        number: number of joined names
+    """
+    names = joined.split(SEPARATOR)
+    return names if len(names) == number else None
+
+
+def clean_joined(values: list[str]) -> list[str]:
+    """Normalizes names the same way as clean_name, joined into one string, so unicode normalization,
+    punctuation and spacing run once for every name.
+
+    Args:
+        values: names
+
+    Returns:
+        Normalized names
+    """
+    joined = unicodedata.normalize("NFKC", SEPARATOR.join(values))
+    joined = VARIANTS.sub(lambda match: match.group().translate(PUNCTUATION_VARIANTS), joined)
+    joined = re.sub(r"\s*-\s*", "-", re.sub(r"\s+", " ", joined))
+    names = split_joined(joined, len(values))
+    if names is None:
+        return [clean_name(value) for value in values]
+    return [name.strip(EDGE_CHARACTERS) for name in names]
+
+
+def check_names(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Checks every name at once on the bytes of the joined names: names that are not clean (outside of
+    printable ascii, with backticks, double spaces or spaces around dashes) and names with edge characters.
+
+    Args:
+        values: names
+
+    Returns:
+        True for every name that needs clean_name, True for every name that starts or ends with an edge character
+    """
+    dirty = np.zeros(len(values), dtype=bool)
+    edged = np.zeros(len(values), dtype=bool)
+    if not values:
+        return dirty, edged
+
+    # Start and end of every name in the joined names
+    lengths = np.fromiter(map(len, values), np.intp, len(values))
+    starts = np.concatenate(([0], np.cumsum(lengths[:-1] + 1)))
+    ends = starts + lengths - 1
+
+    # Characters outside of ascii become "?" (one byte for one character, so positions do not move)
+    joined = SEPARATOR.join(values)
+    characters = np.frombuffer(joined.encode("ascii", "replace"), dtype=np.uint8)
+    bad = ((characters < 32) & (characters != 0)) | (characters >= 127) | (characters == ord("`"))
+    spaces = characters == ord(" ")
+    dashes = characters == ord("-")
+    bad[:-1] |= spaces[:-1] & (spaces[1:] | dashes[1:])
+    bad[:-1] |= dashes[:-1] & spaces[1:]
+    dirty[np.searchsorted(starts, np.flatnonzero(bad), side="right") - 1] = True
+
+    # Names outside of ascii ("?" may be a real question mark, so they are checked by name)
+    if not joined.isascii():
+        dirty |= ~np.fromiter(map(str.isascii, values), bool, len(values))
+
+    # Names with edge characters
+    named = lengths > 0
+    edged[named] = EDGE_BYTES[characters[starts[named]]] | EDGE_BYTES[characters[ends[named]]]
+    return dirty, edged
+
+
+def change_case(values: list[str], title: bool = False, casefold: bool = False) -> list[str]:
+    """Capitalizes every word or makes names lowercase, joined into one string (as bytes if it is ascii).
+
+    Args:
+        values: names
+        title: capitalize every word
+        casefold: make names lowercase
+
+    Returns:
+        Names with changed case
+    """
+    if not (title or casefold) or not values:
+        return values
+    joined = SEPARATOR.join(values)
+    if joined.isascii():
+        joined = joined.encode("ascii")
+        joined = (joined.title() if title else joined.lower()).decode("ascii")
+    else:
+        joined = joined.title() if title else joined.casefold()
+    names = split_joined(joined, len(values))
+    if names is None:
+        return [value.title() if title else value.casefold() for value in values]
+    return names
+
+
+def clean_names(values: pd.Series, title: bool = False, casefold: bool = False) -> pd.Series:
+    """Normalizes every name of a column the same way as clean_name. Each unique name is normalized once:
+    edge characters are stripped only from names that have them, the rest of clean_name runs only for names
+    that need it (see check_names).
+
+    Args:
+        values: pandas series with names (only categories of a categorical series are normalized)
+        title: capitalize every word (for names of individuals)
+        casefold: make names lowercase (for keys)
+
+    Returns:
+        Pandas series with normalized names (categorical, missing names stay missing)
+    """
+
+    # Unique names of the column
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        uniques = values.cat.categories.to_numpy()
+    else:
+        codes, uniques = pd.factorize(values)
+    if pd.api.types.infer_dtype(uniques, skipna=False) == "string":
+        names = uniques.tolist()
+    else:
+        names = [str(value) for value in uniques]
+
+    # Strip edge characters (names are checked again without them), normalize names that still need it
+    cleaned = list(names)
+    dirty, edged = check_names(names)
+    stripped = np.flatnonzero(edged).tolist()
+    if stripped:
+        for position in stripped:
+            cleaned[position] = names[position].strip(EDGE_CHARACTERS)
+        dirty[stripped] = check_names([cleaned[position] for position in stripped])[0]
+    dirty = np.flatnonzero(dirty).tolist()
+    if dirty:
+        for position, value in zip(dirty, clean_joined([names[position] for position in dirty])):
+            cleaned[position] = value
+    cleaned = change_case(cleaned, title, casefold)
+
+    # Different names may be the same after normalization, so categories are made unique again
+    categories = pd.Index(cleaned, dtype=object)
+    if not categories.is_unique:
+        merged, categories = pd.factorize(categories)
+        codes = np.where(codes >= 0, merged[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=values.index)
 
 
 def normalize_data_oig(data: pd.DataFrame) -> pd.DataFrame:
     """Given pandas dataframe with data, normalize it for usage in oig scans.
-    
+    Columns are categorical, so names repeated in the data are stored once.
+
     Args:
         data: pandas dataframe with either two columns or one
 
     Returns:
         Pandas dataframe with normalized data
     """
-    assert len(data.columns) == 1 or len(data.columns) == 2
+    if len(data.columns) not in (1, 2):
+        raise ValueError(
+            f"Data should have two columns (last name, first name) or one column (entity name), got {len(data.columns)}"
+        )
 
     # Get columns
     columns = len(data.columns)
 
-    # Normalize
-    data = data.dropna()
-    data = data.map(str)
-    data = data.map(str.strip)
+    # Normalize (names of individuals are capitalized)
+    names = {column: clean_names(data[column], title=columns == 2) for column in data.columns}
+
+    # Drop rows with missing or empty names and return
+    keep = np.ones(len(data), dtype=bool)
+    for column in names.values():
+        codes = column.cat.codes.to_numpy()
+        keep &= codes >= 0
+        if "" in column.cat.categories:
+            keep &= codes != column.cat.categories.get_loc("")
+    data = pd.DataFrame(names, index=data.index)
+    return data if keep.all() else data[keep]
+
+
+def canonical_key(*values: str) -> str:
+    """Given last name and first name or entity name, make a key used to compare names.
+
+    Args:
+        values: last name and first name or entity name
+
+    Returns:
+        Lowercase key with normalized names separated by "|"
+    """
+    return "|".join(clean_name(value).casefold() for value in values)
+
+
+def canonical_keys(data: pd.DataFrame) -> pd.Series:
+    """Given pandas dataframe with data, make keys used to compare names for every row at once. Keys are made
+    for unique names and unique pairs of names only (categories of normalized data are not normalized again),
+    rows with the same key are duplicates.
+
+    Args:
+        data: pandas dataframe with either two columns or one
+
+    Returns:
+        Pandas series with keys in the same format as canonical_key (rows with the same key share one string)
+    """
+
+    # Normalize every column (missing names make "nan" like in canonical_key)
+    codes = []
+    categories = []
+    for column in data.columns:
+        names = clean_names(data[column], casefold=True)
+        codes.append(names.cat.codes.to_numpy().astype(np.int64))
+        categories.append(names.cat.categories.to_numpy())
+        if (codes[-1] < 0).any():
+            codes[-1][codes[-1] < 0] = len(categories[-1])
+            categories[-1] = np.append(categories[-1], "nan")
+
+    # Make keys of unique names, or of unique pairs of names, and take the key of every row
+    if len(codes) == 1:
+        pairs, keys = codes[0], categories[0]
+    else:
+        pairs, uniques = pd.factorize(codes[0] * len(categories[1]) + codes[1])
+        keys = (categories[0] + "|")[uniques // len(categories[1])] + categories[1][uniques % len(categories[1])]
+    return pd.Series(keys[pairs], index=data.index, dtype=object)
+
 
-    # Normalize for individuals
-    if (columns == 2):
-        data = data.map(str.title)         
+def compact_data_oig(data: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """Normalizes data and makes the canonical key of every row, names are normalized only once.
 
-    # Print and return
-    return data
\ No newline at end of file
+    Args:
+        data: pandas dataframe with either two columns or one
+
+    Returns:
+        Normalized data with categorical columns, and canonical key of every row
+        (rows with the same key are duplicates and are scanned once, see interface)
+    """
+    data = normalize_data_oig(data)
+    return data, canonical_keys(data)
@@ -0,0 +1,131 @@
+import os
+import pandas as pd
+
+from oigscanner.data.processing import normalize_data_oig
+from typing import Iterable, Iterator
+
+
+def sheets_to_chunks(sheets: Iterable[Iterable[tuple]], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Groups rows of every sheet (first row of a sheet is the header) into normalized dataframes.
+
+    Args:
+        sheets: rows of every sheet as tuples of cell values
+        chunk_size: number of rows in every dataframe
+
+    Yields:
+        Normalized pandas dataframes with index running through all sheets
+    """
+    start = 0
+    for rows in sheets:
+        rows = iter(rows)
+
+        # Read header (trailing empty cells are not columns)
+        header = list(next(rows, ()))
+        while header and header[-1] is None:
+            header.pop()
+        if not header:
+            continue
+        columns = [str(column) for column in header]
+        width = len(columns)
+
+        # Group rows into chunks
+        chunk = []
+        for row in rows:
+            row = list(row[:width])
+            row += [None] * (width - len(row))
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield normalize_data_oig(pd.DataFrame(chunk, columns=columns, index=range(start, start + len(chunk))))
+                start += len(chunk)
+                chunk = []
+        if chunk:
+            yield normalize_data_oig(pd.DataFrame(chunk, columns=columns, index=range(start, start + len(chunk))))
+            start += len(chunk)
+
+
+def stream_xlsx(path: str, chunk_size: int = 1000) -> Iterator[pd.DataFrame]:
+    """Reads every sheet of an xlsx file in read-only mode without loading the whole workbook.
+
+    Args:
+        path: path to the xlsx file
+        chunk_size: number of rows in every dataframe
+
+    Yields:
+        Normalized pandas dataframes with running index
+    """
+    # openpyxl is imported only for xlsx files, so csv files start faster
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheets = (sheet.iter_rows(values_only=True) for sheet in workbook.worksheets)
+        yield from sheets_to_chunks(sheets, chunk_size)
+    finally:
+        workbook.close()
+
+
+def stream_xls(path: str, chunk_size: int = 1000) -> Iterator[pd.DataFrame]:
+    """Reads every sheet of an xls file, loading one sheet at a time.
+
+    Args:
+        path: path to the xls file
+        chunk_size: number of rows in every dataframe
+
+    Yields:
+        Normalized pandas dataframes with running index
+    """
+    # xlrd is needed only for xls files
+    try:
+        import xlrd
+    except ImportError:
+        raise ImportError("Reading xls files requires xlrd (pip install xlrd)")
+
+    def sheet_rows(sheet_name: str) -> Iterator[tuple]:
+        """Helper function that loads one sheet, yields its rows and unloads it."""
+        sheet = workbook.sheet_by_name(sheet_name)
+        for i in range(sheet.nrows):
+            yield tuple(None if cell.ctype == xlrd.XL_CELL_EMPTY else cell.value for cell in sheet.row(i))
+        workbook.unload_sheet(sheet_name)
+
+    workbook = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheets = (sheet_rows(sheet_name) for sheet_name in workbook.sheet_names())
+        yield from sheets_to_chunks(sheets, chunk_size)
+    finally:
+        workbook.release_resources()
+
+
+def stream_csv(path: str, chunk_size: int = 1000) -> Iterator[pd.DataFrame]:
+    """Reads csv file in chunks.
+
+    Args:
+        path: path to the csv file
+        chunk_size: number of rows in every dataframe
+
+    Yields:
+        Normalized pandas dataframes with running index
+    """
+    with pd.read_csv(path, dtype=str, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            yield normalize_data_oig(chunk)
+
+
+def stream_data_oig(path: str, chunk_size: int = 1000) -> Iterator[pd.DataFrame]:
+    """Reads xlsx, xls or csv file in chunks of normalized rows, so scanning can start before the file is read
+    and memory does not depend on the size of the file.
+
+    Args:
+        path: path to the file
+        chunk_size: number of rows in every dataframe
+
+    Yields:
+        Normalized pandas dataframes with running index
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        return stream_xlsx(path, chunk_size)
+    if extension == ".xls":
+        return stream_xls(path, chunk_size)
+    if extension == ".csv":
+        return stream_csv(path, chunk_size)
+    raise ValueError(f"Unsupported file format: {extension}")
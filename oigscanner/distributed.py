@@ -0,0 +1,460 @@
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import tempfile
+import time
+import uuid
+
+import pandas as pd
+
+from selenium.webdriver.remote.webdriver import WebDriver
+from oigscanner.browser.governor import resource_governor
+from oigscanner.browser.handlers import oig_scanner
+from oigscanner.control import token_bucket
+from oigscanner.data.manifest import PATH_INDEX
+from oigscanner.http_client.handlers import oig_http_scanner
+from oigscanner.logs import run_log
+from oigscanner.results import scan_result
+from typing import Callable, Optional, Union
+
+
+class sqlite_queue:
+
+    def __init__(self, path: str, lease_seconds: float = 300, max_attempts: int = 3):
+        """Queue of rows in a sqlite file shared by worker processes (on one or several hosts).
+        A row taken by a worker that died is given to other workers after the lease expires.
+        Every enqueue starts a new run, results and remaining rows are counted per run, so a reused
+        file does not mix runs.
+
+        Sqlite locks are not reliable on many network file systems (NFS, some SMB shares), two workers
+        may then take the same row or the file may get corrupted. Keep the file on a local disk and run
+        the workers on the same host (process mode), or make sure the shared folder supports file locks
+        before running workers on several hosts.
+
+        Args:
+            path: path to the sqlite file (on a folder shared by the hosts, see above)
+            lease_seconds: time a worker has to process a row before it is given to other workers
+            max_attempts: number of attempts before a row is marked as failed
+        """
+
+        # Set path, lease time and attempts
+        self.PATH = path
+        self.LEASE_SECONDS = lease_seconds
+        self.MAX_ATTEMPTS = max_attempts
+
+        # Open database (transactions are started manually)
+        self.CONNECTION = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.CONNECTION.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "run TEXT, "
+            "row_id TEXT NOT NULL, "
+            "data TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', "
+            "worker TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "lease_until REAL, "
+            "found INTEGER, "
+            "path TEXT, "
+            "duration REAL)"
+        )
+
+        # Names of evidence files taken by the workers (every process has its own index of names)
+        self.CONNECTION.execute("CREATE TABLE IF NOT EXISTS names (path TEXT PRIMARY KEY)")
+
+        # Queues created before runs were added get the column (their rows belong to no run)
+        columns = [column[1] for column in self.CONNECTION.execute("PRAGMA table_info(tasks)")]
+        if "run" not in columns:
+            self.CONNECTION.execute("ALTER TABLE tasks ADD COLUMN run TEXT")
+        self.CONNECTION.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status)")
+        self.CONNECTION.execute("CREATE INDEX IF NOT EXISTS tasks_run ON tasks (run, status)")
+
+
+    def close(self) -> None:
+        """Closes database."""
+        self.CONNECTION.close()
+
+
+    def enqueue(self, data: pd.DataFrame) -> str:
+        """Adds every row of the data to the queue as a new run.
+
+        Args:
+            data: pandas dataframe with either one column (enitties) or two columns (individuals)
+
+        Returns:
+            Id of the run
+        """
+        run = uuid.uuid4().hex
+        rows = [(run, str(index), json.dumps([str(value) for value in row])) for index, row in data.iterrows()]
+        self.CONNECTION.execute("BEGIN IMMEDIATE")
+        self.CONNECTION.executemany("INSERT INTO tasks (run, row_id, data) VALUES (?, ?, ?)", rows)
+        self.CONNECTION.execute("COMMIT")
+        return run
+
+
+    def claim(self, worker_id: str) -> Optional[tuple[int, str, list[str], int]]:
+        """Takes next pending row (or row with expired lease). Rows with expired leases that ran out
+        of attempts are marked as failed instead.
+
+        Args:
+            worker_id: id of the worker
+
+        Returns:
+            Id of the task, id of the row, values of the row and number of attempts, None if nothing to take
+        """
+        now = time.time()
+        self.CONNECTION.execute("BEGIN IMMEDIATE")
+        try:
+            # Rows whose workers died on every attempt (for example rows that crash the browser) fail for good
+            self.CONNECTION.execute(
+                "UPDATE tasks SET status = 'failed', lease_until = NULL "
+                "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, self.MAX_ATTEMPTS)
+            )
+            task = self.CONNECTION.execute(
+                "SELECT id, row_id, data, attempts FROM tasks "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if task is None:
+                self.CONNECTION.execute("COMMIT")
+                return None
+            task_id, row_id, data, attempts = task
+            self.CONNECTION.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, attempts = attempts + 1, lease_until = ? WHERE id = ?",
+                (worker_id, now + self.LEASE_SECONDS, task_id)
+            )
+            self.CONNECTION.execute("COMMIT")
+        except Exception:
+            self.CONNECTION.execute("ROLLBACK")
+            raise
+        return task_id, row_id, json.loads(data), attempts + 1
+
+
+    def complete(
+        self,
+        task_id: int,
+        worker_id: str,
+        result: scan_result,
+        duration: float
+        ) -> bool:
+        """Reports result of a row. Failed rows are put back into the queue until they run out of attempts.
+        The result is dropped if the lease of the worker expired and the row was taken by another worker.
+
+        Args:
+            task_id: id of the task
+            worker_id: id of the worker that claimed the row
+            result: result of the scan
+            duration: time spent on the row in seconds
+
+        Returns:
+            True if the result was saved, False if the worker does not hold the lease anymore
+        """
+        if result.success:
+            cursor = self.CONNECTION.execute(
+                "UPDATE tasks SET status = 'done', found = ?, path = ?, duration = ?, lease_until = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (None if result.found is None else int(result.found), result.path, duration, task_id, worker_id)
+            )
+        else:
+            cursor = self.CONNECTION.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "duration = ?, lease_until = NULL WHERE id = ? AND worker = ? AND status = 'leased'",
+                (self.MAX_ATTEMPTS, duration, task_id, worker_id)
+            )
+        return cursor.rowcount > 0
+
+
+    def reserve_name(self, path: str) -> bool:
+        """Takes name of an evidence file for this worker, so workers never write the same file.
+
+        Args:
+            path: path of the evidence file (relative to the folder every worker runs in)
+
+        Returns:
+            True if no worker took the name before
+        """
+        cursor = self.CONNECTION.execute("INSERT OR IGNORE INTO names (path) VALUES (?)", (path,))
+        return cursor.rowcount > 0
+
+
+    def remaining(self, run: Optional[str] = None) -> int:
+        """Returns number of rows that are not done or failed.
+
+        Args:
+            run: id of the run, None for every run
+        """
+        if run is None:
+            return self.CONNECTION.execute(
+                "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')"
+            ).fetchone()[0]
+        return self.CONNECTION.execute(
+            "SELECT COUNT(*) FROM tasks WHERE run = ? AND status IN ('pending', 'leased')", (run,)
+        ).fetchone()[0]
+
+
+    def results(self, run: Optional[str] = None) -> pd.DataFrame:
+        """Returns every row with its status, worker, attempts, found flag, evidence path and duration.
+
+        Args:
+            run: id of the run, None for every run
+        """
+        if run is None:
+            return pd.read_sql_query(
+                "SELECT row_id, data, status, worker, attempts, found, path, duration FROM tasks ORDER BY id",
+                self.CONNECTION
+            )
+        return pd.read_sql_query(
+            "SELECT row_id, data, status, worker, attempts, found, path, duration FROM tasks WHERE run = ? ORDER BY id",
+            self.CONNECTION,
+            params=(run,)
+        )
+
+
+def run_worker(
+    queue_path: str,
+    browser_template: Optional[Callable[[], WebDriver]],
+    month: str,
+    year: int,
+    engine: str = "browser",
+    url: str = "https://exclusions.oig.hhs.gov",
+    worker_id: Optional[str] = None,
+    stay: bool = False,
+    poll_interval: float = 1.0,
+    rate_limit: Optional[float] = None,
+    attempts: int = 2,
+    max_attempts: int = 3,
+    evidence_policy: Optional[str] = None,
+    shard: bool = False,
+    fast_path: bool = True,
+    log_path: Optional[str] = None,
+    max_rows: Optional[int] = None,
+    max_rss_mb: Optional[float] = None
+    ) -> int:
+    """Takes rows from the sqlite queue, scans them and reports results back.
+
+    Args:
+        queue_path: path to the sqlite file of the queue
+        browser_template: function that will return a browser instance
+        month: month to append to the name of the screenshot
+        year: year to append to the name of the screenshot
+        engine: "browser" or "http"
+        url: URL of the oig exclusions site
+        worker_id: id of the worker, host name and process id if not given
+        stay: keep waiting for new rows when the queue is empty
+        poll_interval: seconds to wait when there is nothing to take
+        rate_limit: maximum number of requests to the site per second of this worker, None for no limit
+        attempts: number of tries of a row every time it is taken from the queue
+        max_attempts: number of times a row is taken from the queue before it is marked as failed
+        evidence_policy: "all", "hits", "html" or "none" (see interface), "all" for the browser engine
+            and "hits" for http if not given
+        shard: put screenshots into subfolders named by their first letter
+        fast_path: fill and submit the search form with one script (falls back to step by step)
+        log_path: path to the structured log of this worker, None to not log
+        max_rows: number of rows after which the browser is recycled, None for no limit
+        max_rss_mb: memory of the browser in MB after which it is recycled, None for no limit (needs psutil)
+
+    Returns:
+        Number of processed rows
+    """
+
+    # Set id and open queue
+    if worker_id is None:
+        worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    tasks = sqlite_queue(queue_path, max_attempts=max_attempts)
+
+    # Limit of requests, log and governor of this worker
+    limiter = token_bucket(rate_limit)
+    log = run_log(log_path, os.devnull) if log_path else None
+    governor = None
+    if engine == "browser" and (max_rows is not None or max_rss_mb is not None):
+        governor = resource_governor(max_rows, max_rss_mb)
+
+    def create_scanner() -> Union[oig_scanner, oig_http_scanner]:
+        """Helper function that creates the scanner of the worker"""
+        if engine == "http":
+            return oig_http_scanner(browser_template, url, evidence=evidence_policy or "hits", log=log, shard=shard, limiter=limiter)
+        return oig_scanner(browser_template, url=url, fast_path=fast_path, log=log, shard=shard, evidence_policy=evidence_policy or "all", limiter=limiter)
+
+    oig = create_scanner()
+    processed = 0
+
+    # Names of evidence files are taken in the queue, other workers do not see the index of this process
+    PATH_INDEX.SHARED = tasks.reserve_name
+    try:
+        while True:
+
+            # Take next row, wait if other workers may still return rows
+            task = tasks.claim(worker_id)
+            if task is None:
+                if tasks.remaining() == 0 and not stay:
+                    break
+                time.sleep(poll_interval)
+                continue
+            task_id, row_id, values, claims = task
+
+            # Scan the row and report result (the browser opens the search form of the row first)
+            start = time.perf_counter()
+            try:
+                result = oig.take_oig_screenshot(pd.Series(values), month, year, attempts)
+            except Exception as e:
+                print(str(e))
+                result = scan_result(False)
+            if not tasks.complete(task_id, worker_id, result, time.perf_counter() - start):
+                print(f"Lease of row {row_id} expired and it was given to another worker, the result is dropped")
+                continue
+            processed += 1
+
+            # Recycle leaking browser
+            if governor is not None and governor.count(oig) is not None:
+                governor.forget(oig)
+                oig.quit()
+                oig = create_scanner()
+    finally:
+        PATH_INDEX.SHARED = None
+        tasks.close()
+        oig.quit()
+        if log is not None:
+            log.close()
+
+    print(f"Worker {worker_id} processed {processed} rows")
+    if limiter.WAITED:
+        print(f"Rate limit: worker {worker_id} waited {limiter.WAITED:.1f} s")
+    if governor is not None:
+        governor.print_summary()
+    return processed
+
+
+def worker_log_path(log_path: Optional[str], worker_id: str) -> Optional[str]:
+    """Returns path to the log of a worker process next to the log of the run (logs.jsonl -> logs.process-0.jsonl).
+
+    Args:
+        log_path: path to the log of the run, None to not log
+        worker_id: id of the worker
+    """
+    if not log_path:
+        return None
+    root, extension = os.path.splitext(log_path)
+    return f"{root}.{worker_id}{extension}"
+
+
+def run_processes(
+    browser_template: Optional[Callable[[], WebDriver]],
+    data: pd.DataFrame,
+    month: str,
+    year: int,
+    number_processes: int = 1,
+    engine: str = "browser",
+    url: str = "https://exclusions.oig.hhs.gov",
+    queue_path: Optional[str] = None,
+    rate_limit: Optional[float] = None,
+    attempts: int = 2,
+    max_attempts: int = 3,
+    evidence_policy: Optional[str] = None,
+    shard: bool = False,
+    fast_path: bool = True,
+    log_path: Optional[str] = None,
+    max_rows: Optional[int] = None,
+    max_rss_mb: Optional[float] = None,
+    lease_seconds: float = 300
+    ) -> pd.DataFrame:
+    """Runs OIG scans with given number of worker processes that share a sqlite queue.
+
+    Args:
+        browser_template: function that will return a browser instance (must be picklable)
+        data: pandas dataframe with either one column (enitties) or two columns (individuals)
+        month: month to append to the name of the screenshot
+        year: year to append to the name of the screenshot
+        number_processes: number of worker processes
+        engine: "browser" or "http"
+        url: URL of the oig exclusions site
+        queue_path: path to the sqlite file of the queue, temporary file if not given
+        rate_limit: maximum number of requests to the site per second of all processes together
+            (every process gets its share), None for no limit
+        attempts: number of tries of a row every time it is taken from the queue
+        max_attempts: number of times a row is taken from the queue before it is marked as failed
+        evidence_policy: "all", "hits", "html" or "none" (see interface)
+        shard: put screenshots into subfolders named by their first letter
+        fast_path: fill and submit the search form with one script (falls back to step by step)
+        log_path: path to the structured log of the run, every process writes its own log next to it
+        max_rows: number of rows after which a browser is recycled, None for no limit
+        max_rss_mb: memory of a browser in MB after which it is recycled, None for no limit (needs psutil)
+        lease_seconds: time a worker has to process a row before it is given to other workers
+
+    Returns:
+        Pandas dataframe with result of every row (in the order of the data)
+    """
+
+    # Create queue with the data
+    folder = None
+    if queue_path is None:
+        folder = tempfile.TemporaryDirectory()
+        queue_path = os.path.join(folder.name, "queue.sqlite3")
+    tasks = sqlite_queue(queue_path, lease_seconds, max_attempts)
+    run = tasks.enqueue(data)
+
+    # Start worker processes (spawn works the same on windows and linux)
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for i in range(number_processes):
+        worker_id = f"process-{i}"
+        processes.append(context.Process(
+            target=run_worker,
+            args=(queue_path, browser_template, month, year, engine, url, worker_id),
+            kwargs={
+                "rate_limit": rate_limit / number_processes if rate_limit else None,
+                "attempts": attempts,
+                "max_attempts": max_attempts,
+                "evidence_policy": evidence_policy,
+                "shard": shard,
+                "fast_path": fast_path,
+                "log_path": worker_log_path(log_path, worker_id),
+                "max_rows": max_rows,
+                "max_rss_mb": max_rss_mb
+            }
+        ))
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    # Collect results of this run
+    results = tasks.results(run)
+    tasks.close()
+    if folder is not None:
+        folder.cleanup()
+    return results
+
+
+def coordinate(
+    queue_path: str,
+    data: pd.DataFrame,
+    poll_interval: float = 10.0
+    ) -> pd.DataFrame:
+    """Adds the data to the shared queue as a new run and waits until workers on every host process it.
+    See sqlite_queue for the limits of sqlite on shared folders.
+
+    Args:
+        queue_path: path to the sqlite file of the queue (on a folder shared by the hosts)
+        data: pandas dataframe with either one column (enitties) or two columns (individuals)
+        poll_interval: seconds between progress reports
+
+    Returns:
+        Pandas dataframe with result of every row
+    """
+    tasks = sqlite_queue(queue_path)
+    run = tasks.enqueue(data)
+    print(f"Added {len(data)} rows to {queue_path} (run {run})")
+    try:
+        while True:
+            remaining = tasks.remaining(run)
+            print(f"Remaining: {remaining}")
+            if remaining == 0:
+                break
+            time.sleep(poll_interval)
+        return tasks.results(run)
+    finally:
+        tasks.close()
@@ -0,0 +1,422 @@
+import os
+import time
+import pandas as pd
+import requests
+
+from html.parser import HTMLParser
+from requests.adapters import HTTPAdapter
+from selenium.webdriver.remote.webdriver import WebDriver
+from oigscanner.browser.handlers import oig_scanner, screenshot_path
+from oigscanner.browser.snapshots import EVIDENCE_POLICIES, snapshot_path, write_snapshot
+from oigscanner.control import token_bucket
+from oigscanner.data.evidence import evidence_store
+from oigscanner.data.manifest import PATH_INDEX
+from oigscanner.logs import run_log, create_text_log_entry, NULL_LOG
+from oigscanner.metrics import metrics, timed, NULL_METRICS
+from oigscanner.recovery import backoff_delay, circuit_breaker, record_failure
+from oigscanner.results import scan_result
+from typing import Callable, Optional
+from urllib.parse import urljoin
+
+
+class form_parser(HTMLParser):
+
+    def __init__(self):
+        """Collects form action, input fields and ids of elements from an html page."""
+        super().__init__()
+        self.ACTION = ""
+        self.FIELDS = {}
+        self.IDS = set()
+
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        """Saves attributes of every start tag.
+
+        Args:
+            tag: name of the tag
+            attrs: attributes of the tag
+        """
+        attrs = dict(attrs)
+
+        # Save ids of elements
+        if attrs.get("id"):
+            self.IDS.add(attrs["id"])
+
+        # Save form action
+        if tag == "form" and not self.ACTION:
+            self.ACTION = attrs.get("action") or ""
+
+        # Save hidden fields (view state, event validation, ...)
+        if tag == "input" and (attrs.get("type") or "").lower() == "hidden" and attrs.get("name"):
+            self.FIELDS[attrs["name"]] = attrs.get("value") or ""
+
+
+def parse_form(html: str) -> form_parser:
+    """Parses html page.
+
+    Args:
+        html: html of the page
+
+    Returns:
+        Parser with form action, hidden fields and element ids
+    """
+    parser = form_parser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def classify_http(error: Exception) -> str:
+    """Classifies an exception of an http step.
+
+    Args:
+        error: exception raised by the step
+
+    Returns:
+        "site" - the site is unreachable, too slow or returns server errors, "page" - anything else
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return "site"
+    if isinstance(error, requests.HTTPError) and error.response is not None and error.response.status_code >= 500:
+        return "site"
+    return "page"
+
+
+class http_wrapper:
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        timeout: int = 20,
+        metrics: Optional[metrics] = None,
+        log: Optional[run_log] = None,
+        limiter: Optional[token_bucket] = None
+        ):
+        """Creates http session with a pool of connections.
+
+        Args:
+            pool_size: number of connections kept open per host
+            timeout: time to wait if nothing is happening
+            metrics: metrics to record timings of every step to, None to not record
+            log: structured log of the run, None to not log
+            limiter: limit of requests per second shared by workers (every request is counted, retries included),
+                None for no limit
+        """
+
+        # Set timeout, metrics, log, rate limit
+        self.TIMEOUT = timeout
+        self.METRICS = metrics if metrics is not None else NULL_METRICS
+        self.LOG = log if log is not None else NULL_LOG
+        self.LIMITER = limiter if limiter is not None else token_bucket()
+
+        # Create session with connection pool
+        self.SESSION = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.SESSION.mount("http://", adapter)
+        self.SESSION.mount("https://", adapter)
+
+
+    def __del__(self) -> None:
+        """Closes http session."""
+        self.SESSION.close()
+
+
+    @timed("http.get")
+    def get(self, page: str) -> requests.Response:
+        """Gets given page.
+
+        Args:
+            page: URL of the page
+
+        Returns:
+            Response of the server
+        """
+        self.LIMITER.acquire()
+        response = self.SESSION.get(page, timeout=self.TIMEOUT)
+        response.raise_for_status()
+        return response
+
+
+    @timed("http.post")
+    def post(self, page: str, fields: dict[str, str]) -> requests.Response:
+        """Posts form fields to given page.
+
+        Args:
+            page: URL of the page
+            fields: form fields
+
+        Returns:
+            Response of the server
+        """
+        self.LIMITER.acquire()
+        response = self.SESSION.post(page, data=fields, timeout=self.TIMEOUT)
+        response.raise_for_status()
+        return response
+
+
+    def create_log_entry(self, entry: str) -> None:
+        """Creates log entry.
+
+        Args:
+            entry: string to write into log file
+        """
+        create_text_log_entry(entry)
+
+
+class oig_http_scanner(http_wrapper):
+
+    def __init__(
+        self,
+        browser_template: Optional[Callable[[], WebDriver]] = None,
+        url: str = "https://exclusions.oig.hhs.gov",
+        pool_size: int = 10,
+        timeout: int = 20,
+        evidence: str = "hits",
+        metrics: Optional[metrics] = None,
+        evidence_store: Optional[evidence_store] = None,
+        log: Optional[run_log] = None,
+        breaker: Optional[circuit_breaker] = None,
+        shard: bool = False,
+        limiter: Optional[token_bucket] = None
+        ):
+        """Searches oig exclusions site by posting its search form without a browser.
+        Opens the browser only to take screenshots.
+
+        Args:
+            browser_template: webdriver template used for screenshots, None to save html snapshots instead
+            url: URL of the oig exclusions site
+            pool_size: number of connections kept open per host
+            timeout: time to wait if nothing is happening
+            evidence: "hits" - take screenshots only of found records, "all" - of every record,
+                "html" - save html of every results page (rendered later with render_snapshots, never opens the browser),
+                "none" - never open the browser
+            metrics: metrics to record timings of every step to, None to not record
+            evidence_store: store that writes screenshots in the background, None to write them directly
+            log: structured log of the run, None to not log
+            breaker: circuit breaker shared by workers that pauses them when the site is failing
+            shard: put screenshots into subfolders named by their first letter
+            limiter: limit of requests to the site per second shared by workers (the browser for screenshots
+                is counted too), None for no limit
+        """
+
+        # Initialize using parent (http_wrapper)
+        super().__init__(pool_size, timeout, metrics, log, limiter)
+
+        # Set browser template, url, evidence, circuit breaker
+        if evidence not in EVIDENCE_POLICIES:
+            raise ValueError(f"Unknown evidence policy: {evidence}")
+        self.BROWSER_TEMPLATE = browser_template
+        self.URL = url
+        self.EVIDENCE = evidence
+        self.EVIDENCE_STORE = evidence_store
+        self.BREAKER = breaker
+        self.SHARD = shard
+        if browser_template is None and evidence in ("all", "hits"):
+            print("No browser template is given, html snapshots are saved instead of screenshots")
+
+        # Browser is created when first screenshot is needed
+        self.SCREENSHOT_SCANNER = None
+
+        # Search forms are loaded on first search
+        self.INDIVIDUALS_FORM = None
+        self.ENTITIES_FORM = None
+
+        # Html and URL of the last results page (saved as evidence with the "html" policy)
+        self.LAST_PAGE = None
+
+
+    def quit(self) -> None:
+        """Closes http session and the browser used for screenshots."""
+        self.SESSION.close()
+        if self.SCREENSHOT_SCANNER is not None:
+            self.SCREENSHOT_SCANNER.quit()
+            self.SCREENSHOT_SCANNER = None
+
+
+    def get_individuals_page(self) -> tuple[str, dict[str, str]]:
+        """Gets first page of oig exclusions site.
+
+        Returns:
+            URL to post the search to and form fields of the page
+        """
+        response = self.get(self.URL)
+        page = parse_form(response.text)
+        self.INDIVIDUALS_FORM = (urljoin(response.url, page.ACTION), page.FIELDS)
+        return self.INDIVIDUALS_FORM
+
+
+    def get_entities_page(self) -> tuple[str, dict[str, str]]:
+        """Gets first page of oig exclusions site and sets searching for entities.
+
+        Returns:
+            URL to post the search to and form fields of the page
+        """
+        action, fields = self.get_individuals_page()
+        fields = dict(fields)
+        fields["__EVENTTARGET"] = "ctl00$cpExclusions$Linkbutton1"
+        fields["__EVENTARGUMENT"] = ""
+        response = self.post(action, fields)
+        page = parse_form(response.text)
+        self.ENTITIES_FORM = (urljoin(response.url, page.ACTION), page.FIELDS)
+        return self.ENTITIES_FORM
+
+
+    def search(self, fields: dict[str, str], entity: bool) -> bool:
+        """Posts search form and checks if anything was found.
+
+        Args:
+            fields: values of the search fields
+            entity: True if searching for an entity
+
+        Returns:
+            True if found, False if not
+        """
+
+        # Get search form
+        form = self.ENTITIES_FORM if entity else self.INDIVIDUALS_FORM
+        if form is None:
+            form = self.get_entities_page() if entity else self.get_individuals_page()
+        action, hidden_fields = form
+
+        # Post hidden fields (view state, event validation) with search fields and the search button
+        data = dict(hidden_fields)
+        data.update(fields)
+        data["ctl00$cpExclusions$ibSearchSP.x"] = "0"
+        data["ctl00$cpExclusions$ibSearchSP.y"] = "0"
+        response = self.post(action, data)
+        page = parse_form(response.text)
+
+        # Check if results page loaded
+        if "SP" not in page.IDS:
+            # Form state is probably expired, load it again on the next try
+            self.INDIVIDUALS_FORM = None
+            self.ENTITIES_FORM = None
+            raise ValueError("Search results were not found on the page")
+
+        # Check if results were found or not
+        self.LAST_PAGE = (response.text, response.url)
+        return "ctl00_cpExclusions_pnlEmpty" not in page.IDS
+
+
+    def check_individual(self, last_name: str, first_name: str) -> bool:
+        """Checks if individual is in the exclusions database.
+
+        Args:
+            last_name: last name of the individual
+            first_name: first name of the individual
+
+        Returns:
+            True if found, False if not
+        """
+        return self.search({
+            "ctl00$cpExclusions$txtSPLastName": last_name,
+            "ctl00$cpExclusions$txtSPFirstName": first_name
+        }, entity=False)
+
+
+    def check_entity(self, entity: str) -> bool:
+        """Checks if entity is in the exclusions database.
+
+        Args:
+            entity: name of the entity
+
+        Returns:
+            True if found, False if not
+        """
+        return self.search({"ctl00$cpExclusions$txtSBName": entity}, entity=True)
+
+
+    def take_oig_screenshot(
+        self,
+        data: pd.Series,
+        month: str,
+        year: int,
+        attempts: int = 5
+        ) -> scan_result:
+        """Checks an individual or entity and takes a screenshot with the browser if evidence is needed.
+
+        Args:
+            data: last name and first name or entity name in pandas series.
+            month: month to append to the name of the screenshot
+            year: year to append to the name of the screenshot
+            attempts: number of tries before the row is reported as failed
+
+        Returns:
+            Result of the scan (true if able to check and take screenshot if needed, otherwise false)
+        """
+
+        # Print data
+        print(" , ".join(str(value) for value in data))
+
+        # Try to check (several tries for if something wrong)
+        error = None
+        for i in range(attempts):
+            if i > 0:
+                self.METRICS.count("retries")
+            if self.BREAKER is not None:
+                self.BREAKER.wait()
+            started = time.perf_counter()
+            try:
+                if len(data) == 1:
+                    found = self.check_entity(data.iloc[0])
+                else:
+                    found = self.check_individual(data.iloc[0], data.iloc[1])
+                if self.BREAKER is not None:
+                    self.BREAKER.success()
+                break
+
+            except Exception as e:
+                print("-------------------------EXCEPTION OCCURED-----------------------------")
+                print(str(e))
+                print("---------------------------TRYING AGAIN--------------------------------")
+                error = type(e).__name__
+                kind = classify_http(e)
+                record_failure(self.BREAKER, kind)
+                self.LOG.log(
+                    "attempt_failed",
+                    key=" ".join(str(value) for value in data),
+                    attempt=i + 1,
+                    error=error,
+                    kind=kind,
+                    message=str(e).strip()[:500],
+                    duration=round(time.perf_counter() - started, 3)
+                )
+
+                # Load search forms again after waiting
+                self.INDIVIDUALS_FORM = None
+                self.ENTITIES_FORM = None
+                if i < attempts - 1:
+                    time.sleep(backoff_delay(i))
+
+        else:
+            log_entry = f"Failed for - {' '.join(str(value) for value in data)}\n"
+            print(log_entry)
+            self.create_log_entry(log_entry)
+            self.METRICS.count("failures")
+            return scan_result(False, attempts=attempts, error=error)
+
+        # Check if screenshot is needed
+        if self.EVIDENCE == "none" or (self.EVIDENCE == "hits" and not found):
+            return scan_result(True, found, None, i + 1)
+
+        # Save the results page that is already loaded (also when there is no browser to take screenshots)
+        if self.EVIDENCE == "html" or self.BROWSER_TEMPLATE is None:
+            path_screenshot = screenshot_path([str(value) for value in data], month, year, found, self.SHARD)
+            os.makedirs(os.path.dirname(path_screenshot), exist_ok=True)
+            path_snapshot = PATH_INDEX.reserve(snapshot_path(path_screenshot))
+            write_snapshot(*self.LAST_PAGE, path_snapshot)
+            return scan_result(True, found, path_snapshot, i + 1)
+
+        # Start the browser and open the search page once (following searches go back to it)
+        if self.SCREENSHOT_SCANNER is None:
+            self.SCREENSHOT_SCANNER = oig_scanner(self.BROWSER_TEMPLATE, timeout=self.TIMEOUT, url=self.URL, metrics=self.METRICS, evidence=self.EVIDENCE_STORE, log=self.LOG, breaker=self.BREAKER, shard=self.SHARD, limiter=self.LIMITER)
+            try:
+                if len(data) == 1:
+                    self.SCREENSHOT_SCANNER.get_entities_page()
+                else:
+                    self.SCREENSHOT_SCANNER.get_individuals_page()
+            except Exception as e:
+                print(str(e))
+
+        # Take screenshot with the browser
+        return self.SCREENSHOT_SCANNER.take_oig_screenshot(data, month, year, attempts)
@@ -0,0 +1,138 @@
+import pandas as pd
+
+from selenium.webdriver.remote.webdriver import WebDriver
+from oigscanner.browser.handlers import screenshot_path
+from oigscanner.data.cache import result_cache, reuse_evidence
+from oigscanner.data.evidence import evidence_store
+from oigscanner.data.leie import leie_index, read_leie
+from oigscanner.data.manifest import results_manifest
+from oigscanner.data.processing import canonical_keys
+from oigscanner.interface import interface
+from oigscanner.results import scan_result
+from oigscanner.scheduler import worker_stats
+from typing import Callable, Iterable, Optional, Union
+
+
+def plan_rescreen(
+    data: pd.DataFrame,
+    cache: result_cache,
+    previous_period: str,
+    supplements: Iterable[Union[str, pd.DataFrame]] = (),
+    partial: bool = True,
+    evidence: Optional[evidence_store] = None
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Splits the roster into rows that must be scanned again and rows whose last month result still holds.
+    Rows are scanned again if they have no stored result for the previous month or match a record of
+    the monthly LEIE supplements (new exclusions and reinstatements).
+
+    Args:
+        data: pandas dataframe from normalize_data_oig with either two columns or one
+        cache: cache with results of the previous month
+        previous_period: month and year of the previous scan (for example "September 2026")
+        supplements: paths to the LEIE exclusion and reinstatement supplement files, or dataframes from read_leie
+        partial: for individuals match supplements on last name and first initial (nothing is missed)
+        evidence: store that may keep evidence of the previous month only in its manifest
+
+    Returns:
+        Rows to scan and rows to carry forward (with found flag and path of the previous evidence)
+    """
+
+    # Find rows scanned last month
+    keys = canonical_keys(data)
+    previous = cache.get_period(previous_period, evidence)
+    known = keys.isin(previous.keys())
+
+    # Find rows that match changed exclusion records
+    records = [read_leie(supplement) if isinstance(supplement, str) else supplement for supplement in supplements]
+    changed = pd.Series(False, index=data.index)
+    if records:
+        changed = leie_index(pd.concat(records, ignore_index=True)).match(data, partial)
+
+    # Split the roster
+    scan = ~known | changed
+    carried = data[~scan].copy()
+    carried["found"] = [previous[key].found for key in keys[~scan]]
+    carried["path"] = [previous[key].path for key in keys[~scan]]
+    print(
+        f"Rescreen: {int((~known).sum())} new, {int((known & changed).sum())} changed, "
+        f"{len(carried)} carried forward from {previous_period}"
+    )
+    return data[scan], carried
+
+
+def roll_forward(
+    carried: pd.DataFrame,
+    cache: result_cache,
+    month: str,
+    year: int,
+    shard: bool = False,
+    manifest: Optional[results_manifest] = None,
+    evidence: Optional[evidence_store] = None
+    ) -> int:
+    """Makes evidence of carried rows available under the new month/year name and stores their results
+    for the new month.
+
+    Args:
+        carried: rows to carry forward returned by plan_rescreen
+        cache: cache to store results for the new month
+        month: month of the new scan
+        year: year of the new scan
+        shard: put screenshots into subfolders named by their first letter
+        manifest: manifest of the new scan to add carried rows to, None to not add them
+        evidence: store that may keep evidence of the previous month only in its manifest
+
+    Returns:
+        Number of rolled forward rows
+    """
+    period = f"{month} {year}"
+    values = carried.drop(columns=["found", "path"])
+    keys = canonical_keys(values)
+    for (index, row), key, found, path in zip(values.iterrows(), keys, carried["found"], carried["path"]):
+        if path:
+            path = reuse_evidence(path, screenshot_path(list(row), month, year, found, shard), evidence)
+        result = scan_result(True, found, path)
+        cache.put(key, period, result)
+        if manifest is not None:
+            manifest.add(index, key, list(row), result, 0.0, origin="carried")
+    return len(carried)
+
+
+def rescreen(
+    browser_template: Callable[[], WebDriver],
+    data: pd.DataFrame,
+    month: str,
+    year: int,
+    previous_month: str,
+    previous_year: int,
+    cache: result_cache,
+    supplements: Iterable[Union[str, pd.DataFrame]] = (),
+    partial: bool = True,
+    **kwargs
+    ) -> list[worker_stats]:
+    """Runs monthly re-screening: scans only new rows and rows that match changed exclusion records,
+    rolls evidence of every other row forward with the new month/year.
+
+    Args:
+        browser_template: function that will return a browser instance
+        data: pandas dataframe from normalize_data_oig with either two columns or one (the whole roster)
+        month: month of the new scan
+        year: year of the new scan
+        previous_month: month of the previous scan
+        previous_year: year of the previous scan
+        cache: cache with results of the previous month, results of the new month are added to it
+        supplements: paths to the LEIE exclusion and reinstatement supplement files, or dataframes from read_leie
+        partial: for individuals match supplements on last name and first initial (nothing is missed)
+        kwargs: other arguments of interface (carried rows are added to its manifest)
+
+    Returns:
+        Statistics of every thread
+    """
+
+    # Plan the scan and roll forward untouched rows (they are a part of the manifest of the run)
+    manifest = kwargs.pop("manifest", None) or results_manifest()
+    evidence = kwargs.get("evidence")
+    to_scan, carried = plan_rescreen(data, cache, f"{previous_month} {previous_year}", supplements, partial, evidence)
+    roll_forward(carried, cache, month, year, kwargs.get("shard", False), manifest, evidence)
+
+    # Scan the rest
+    return interface(browser_template, to_scan, month, year, cache=cache, manifest=manifest, **kwargs)
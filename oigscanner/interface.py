@@ -1,53 +1,523 @@
-import numpy as np
+import functools
+import json
 import pandas as pd
 import threading
+import time
 
 from selenium.webdriver.remote.webdriver import WebDriver
-from oigscanner.browser.handlers import oig_scanner
-from oigscanner.browser import templates
+from oigscanner.browser.handlers import screenshot_path
+from oigscanner.browser.governor import resource_governor
+from oigscanner.browser.pool import browser_pool
+from oigscanner.control import concurrency_controller, token_bucket
+from oigscanner.data.cache import result_cache, reuse_evidence
+from oigscanner.data.evidence import evidence_store
+from oigscanner.data.journal import run_journal, file_digest, frame_digest
+from oigscanner.data.manifest import results_manifest
+from oigscanner.data.processing import canonical_key, canonical_keys
+from oigscanner.distributed import run_processes
+from oigscanner.http_client.handlers import oig_http_scanner
+from oigscanner.logs import run_log, NULL_LOG
+from oigscanner.metrics import metrics
+from oigscanner.recovery import circuit_breaker
+from oigscanner.results import scan_result
+from oigscanner.scheduler import work_queue, worker_stats, print_worker_stats
 from datetime import datetime
-from typing import Callable
+from typing import Callable, Iterable, Optional, Union
 
 
 def interface(
     browser_template: Callable[[], WebDriver],
-    data: pd.DataFrame,
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
     month: str = datetime.now().strftime("%B"),
     year: int = datetime.now().year,
-    number_threads: int = 1
-    ) -> None:
-    """Runs OIG scans with given the number of threads, data, month, year, browser template
+    number_threads: int = 1,
+    max_requeues: int = 2,
+    engine: str = "browser",
+    pool: Optional[browser_pool] = None,
+    cache: Optional[result_cache] = None,
+    journal: Optional[run_journal] = None,
+    resume: bool = False,
+    url: str = "https://exclusions.oig.hhs.gov",
+    scheduler: str = "queue",
+    metrics: Optional[metrics] = None,
+    fast_path: bool = True,
+    queue_size: int = 1000,
+    mode: str = "thread",
+    evidence: Optional[evidence_store] = None,
+    log: Optional[run_log] = None,
+    retry: str = "deferred",
+    attempts: Optional[int] = None,
+    defer_delay: float = 30.0,
+    breaker: Optional[circuit_breaker] = None,
+    adaptive: bool = False,
+    rate_limit: Optional[float] = None,
+    manifest: Optional[results_manifest] = None,
+    shard: bool = False,
+    evidence_policy: Optional[str] = None,
+    tabs: int = 1,
+    governor: Optional[resource_governor] = None,
+    source: Optional[str] = None
+    ) -> list[worker_stats]:
+    """Runs OIG scans with given the number of threads, data, month, year, browser template.
+    Threads pull rows from a shared queue, so a slow thread does not hold the rest of the data.
+    Rows with the same name (canonical key) as a row being scanned wait for its result instead of being scanned again.
 
     Args:
         browser_template: function that will return a browser instance
-        data: pandas dataframe with either one column (enitties) or two columns (individuals)
+        data: pandas dataframe with either one column (enitties) or two columns (individuals),
+            or chunks of such dataframes (for example from stream_data_oig) that are read while scanning
+            (an error while reading is raised after the rows read before it are processed)
         month: month to append to the name of the screenshot
         year: year to append to the name of the screenshot
         number_threads: number of threads to use in doing oig scans
+        max_requeues: how many times a failed row is put back into the queue for other threads
+        engine: "browser" - search with the browser, "http" - search by posting the form over http
+            and use the browser only for screenshots of found records
+        pool: pool of started browsers to lease from (kept open after the run), if not given
+            browsers are started in parallel for this run and closed at the end
+        cache: cache of results, rows already scanned in the same month and year reuse the result
+            and its screenshot instead of being searched again
+        journal: journal where outcome of every row is recorded (starts with the input and period of the run)
+        resume: skip rows that are done according to the journal (retries failed and pending rows), a row is done
+            if its id and canonical key match the journal and its evidence exists; raises ValueError if the journal
+            is of another input or period
+        url: URL of the oig exclusions site
+        scheduler: "queue" - threads pull rows from a shared queue, "static" - data is split into
+            fixed chunks for every thread (kept for comparison in benchmarks)
+        metrics: metrics to record timings of every browser step to, summary is printed at the end
+        fast_path: fill and submit the search form with one script (falls back to step by step)
+        queue_size: maximum number of rows read ahead from chunks of data
+        mode: "thread" - threads in this process, "process" - worker processes sharing a sqlite queue
+            (browser template must be picklable, rate limit is split between the processes, cache and journal
+            are used by this process before and after the scan, every process writes its own log next to the log;
+            raises ValueError with pool, evidence, breaker, metrics, tabs, adaptive or the static scheduler)
+        evidence: store that writes screenshots in the background and saves identical ones once (the same name
+            screenshotted again, pages of different names differ by the name they show)
+        log: structured log of the run (json lines with row key, error class, attempt number and timings)
+            and its failures file with rows that failed for good
+        retry: "deferred" - failed rows are retried after the main pass, when the site or browser may have
+            recovered, "immediate" - failed rows are given to other threads right away
+        attempts: number of tries of a row in every pass, 2 for deferred retries and 5 for immediate if not given
+        defer_delay: seconds to wait before retrying deferred rows
+        breaker: circuit breaker that pauses every thread when the site is failing, created if not given
+            (a given pool uses its own breaker)
+        adaptive: start with one active thread and grow or shrink their number (up to number_threads)
+            by latency and errors of the site, False to run number_threads threads from the start
+            (not used with the static scheduler)
+        rate_limit: maximum number of requests to the site per second shared by every thread (page loads, searches
+            and their retries are counted), None for no limit (a given pool uses its own limit)
+        manifest: manifest where outcome of every row is collected (rows done in resumed runs included)
+            and written at the end of the run (results_manifest.csv if not given)
+        shard: put screenshots into subfolders named by their first letter
+        evidence_policy: "all" - screenshot of every row, "hits" - screenshots only of found records,
+            "html" - html snapshot of every row rendered later with render_snapshots (searches are not slowed
+            down by screenshots), "none" - no evidence; "all" for the browser engine and "hits" for http if not given
+            (the http engine saves html snapshots instead of screenshots without a browser template)
+        tabs: number of threads sharing one browser, each searching in its own tab, so more searches are
+            in flight per GB of memory (browser engine, browsers are started for this run)
+        governor: governor that recycles browsers after a number of rows or above a memory limit, between rows
+            and while the old browser keeps working (browser engine, browsers are started for this run),
+            None to recycle only broken browsers
+        source: path of the input file, its hash is recorded in the journal (needed to resume streamed data,
+            a dataframe is hashed itself)
+
+    Returns:
+        Statistics of every thread
     """
 
-    def oig_scan(data_chunk: pd.DataFrame) -> None:
-        """Helper function that creates instance of oig scanner and takes a screenshot with given data"""
-        oig = oig_scanner(browser_template)
-        data_chunk.apply(oig.take_oig_screenshot, args=(month,year), axis=1)
+    def oig_scan(stats: worker_stats) -> None:
+        """Helper function that creates instance of oig scanner and takes screenshots of rows from the queue"""
+        if engine == "http":
+            oig = oig_http_scanner(browser_template, url, metrics=metrics, evidence=evidence_policy or "hits", evidence_store=evidence, log=log, breaker=breaker, shard=shard, limiter=limiter)
+        else:
+            oig = scanners.lease()
+
+        # Shared queue or own chunk of the data
+        rows = queues[stats.WORKER_ID % len(queues)]
+
+        while True:
+
+            # Wait while this thread is not active, then get next row
+            if controller is not None:
+                controller.admit(stats.WORKER_ID)
+            task = rows.get(stats.WORKER_ID)
+            if task is None:
+                break
+            (index, row, key), requeues = task
+
+            # Reuse cached result
+            start = time.perf_counter()
+            if cache is not None:
+                cached = cache.get(key, period, evidence)
+                if cached is not None:
+                    if cached.path:
+                        cached.path = reuse_evidence(cached.path, screenshot_path(list(row), month, year, cached.found, shard), evidence)
+                    rows.done()
+                    duration = time.perf_counter() - start
+                    stats.add(duration, True)
+                    if journal is not None:
+                        journal.record(index, key, "done", cached.path, 0, duration, cached.found)
+                    manifest.add(index, key, list(row), cached, duration, stats.WORKER_ID, cached=True)
+                    release(key, cached, "done", stats.WORKER_ID)
+                    continue
+
+            # Take a screenshot (the scanner waits before every request if requests per second are limited)
+            try:
+                result = oig.take_oig_screenshot(row, month, year, attempts)
+            except Exception as e:
+                print(str(e))
+                result = scan_result(False, error=type(e).__name__)
+            success = result.success
+            duration = time.perf_counter() - start
+
+            # Save result (a screenshot written in the background is cached once it is written)
+            if success and cache is not None:
+                if evidence is not None and result.path:
+                    evidence.when_written(result.path, functools.partial(cache.put, key, period, result))
+                else:
+                    cache.put(key, period, result)
+            if journal is not None:
+                journal.record(index, key, "done" if success else "failed", result.path, result.attempts, duration, result.found)
+
+            # Mark row as processed or give it to other threads (or defer it until the main pass is done)
+            requeued = False
+            if success:
+                rows.done()
+            else:
+                requeued = rows.requeue((index, row, key), requeues + 1, stats.WORKER_ID)
+                if not requeued:
+                    run_logger.failure(index, key, list(row), attempts * (requeues + 1), result.error)
+            if not requeued:
+                manifest.add(index, key, list(row), result, duration, stats.WORKER_ID)
+                release(key, result, "done" if success else "failed", stats.WORKER_ID)
+            stats.add(duration, success, requeued, result.restarts, result.recoveries)
+            if controller is not None:
+                controller.report(duration, success)
+            run_logger.log(
+                "row",
+                row=str(index),
+                key=key,
+                status="done" if success else ("requeued" if requeued else "failed"),
+                found=result.found,
+                attempts=result.attempts,
+                restarts=result.restarts,
+                error=result.error,
+                duration=round(duration, 3),
+                worker=stats.WORKER_ID,
+                requeues=requeues
+            )
+
+            # Recycle leaking browser, give failed browser back to the pool to be checked
+            if engine == "browser":
+                oig = scanners.checkpoint(oig)
+            if not success and engine == "browser":
+                scanners.release(oig)
+                oig = scanners.lease()
+
+        # Give browser back to the pool (or close the http scanner) and let waiting threads see that the work is done
+        if engine == "browser":
+            scanners.release(oig)
+        else:
+            oig.quit()
+        if controller is not None:
+            controller.close()
+        stats.finish()
+
+
+    # Outcome of every row is appended to shards while scanning and merged at the end of the run
+    if manifest is None:
+        manifest = results_manifest()
+
+    # Check engine, scheduler and retry policy
+    if engine not in ("browser", "http"):
+        raise ValueError(f"Unknown engine: {engine}")
+    if scheduler not in ("queue", "static"):
+        raise ValueError(f"Unknown scheduler: {scheduler}")
+    if retry not in ("deferred", "immediate"):
+        raise ValueError(f"Unknown retry policy: {retry}")
+    if mode not in ("thread", "process"):
+        raise ValueError(f"Unknown mode: {mode}")
+
+    # Objects shared by threads can not be shared by worker processes
+    if mode == "process":
+        unsupported = {
+            "pool": pool is not None,
+            "evidence": evidence is not None,
+            "breaker": breaker is not None,
+            "metrics": metrics is not None,
+            "tabs": tabs > 1,
+            "adaptive": adaptive,
+            "scheduler": scheduler != "queue"
+        }
+        unsupported = [name for name, used in unsupported.items() if used]
+        if unsupported:
+            raise ValueError(f"Not supported with worker processes: {', '.join(unsupported)}")
+
+    # Fewer tries in a row when failed rows are retried after the main pass
+    deferred = retry == "deferred"
+    if attempts is None:
+        attempts = 2 if deferred else 5
+    run_logger = log if log is not None else NULL_LOG
+
+    # Number of active threads and requests per second shared by every thread
+    controller = None
+    if adaptive and scheduler == "queue" and number_threads > 1:
+        controller = concurrency_controller(number_threads)
+    if pool is not None and pool.LIMITER is not None:
+        limiter = pool.LIMITER
+    else:
+        limiter = token_bucket(rate_limit)
+
+    # Circuit breaker shared by every thread
+    if breaker is None:
+        breaker = pool.BREAKER if pool is not None and pool.BREAKER is not None else circuit_breaker()
+
+    # Period of the scan used as a part of cache key
+    period = f"{month} {year}"
+
+    def completed(index: object, row: pd.Series, key: str) -> bool:
+        """Helper function that checks if the row was done in a previous run of the same input (adds it to the manifest)"""
+        if not resume or journal is None:
+            return False
+        entry = journal.completed(index, key, evidence)
+        if entry is None:
+            return False
+        result = scan_result(True, entry.get("found"), entry["path"], entry["attempts"])
+        manifest.add(index, entry["key"], list(row), result, entry["duration"], origin="journal")
+        skipped[0] += 1
+        return True
 
 
-    # Split the data into given number of chunks
-    data_chunks = np.array_split(data, number_threads)
-    print("-------------------------------DATA----------------------------------")
-    print(data)
-    print("-------------------------SPLIT FOR THREARDS--------------------------")
-    print(data_chunks)
+    def hold(index: object, row: pd.Series, key: str) -> bool:
+        """Helper function that holds the row if a row with the same key is being scanned (it gets the same result)"""
+        with held_lock:
+            if key in held:
+                held[key].append((index, row))
+                return True
+            held[key] = []
+        return False
 
-    # Make threads on each chunk
+
+    def release(key: str, result: scan_result, status: str, worker_id: int) -> None:
+        """Helper function that records the final result of a row for the held rows with the same key"""
+        with held_lock:
+            duplicates = held.pop(key, [])
+            held_rows[0] += len(duplicates)
+        for index, row in duplicates:
+            if journal is not None:
+                journal.record(index, key, status, result.path, 0, 0.0, result.found)
+            if status == "failed":
+                run_logger.failure(index, key, list(row), 0, result.error)
+            manifest.add(index, key, list(row), result, 0.0, worker_id, origin="duplicate")
+
+
+    def read_chunks() -> None:
+        """Helper function that reads chunks of data into the queue while threads are scanning"""
+        number_rows = 0
+        try:
+            for chunk in data:
+                for (index, row), key in zip(chunk.iterrows(), canonical_keys(chunk)):
+                    number_rows += 1
+                    if completed(index, row, key) or hold(index, row, key):
+                        continue
+                    queues[0].put((index, row, key))
+        except Exception as e:
+            print("-------------------------FAILED TO READ DATA---------------------------")
+            print(str(e))
+            read_errors.append(e)
+            run_logger.log("read_failed", error=type(e).__name__, message=str(e).strip()[:500], rows=number_rows)
+        finally:
+            queues[0].close()
+            print(f"Read {number_rows} rows")
+            if skipped[0]:
+                print(f"Resuming: {skipped[0]} rows are already done")
+
+
+    # Error that stopped reading the data (raised once the rows read before it are processed)
+    read_errors = []
+
+    # Rows waiting for the result of a row with the same key being scanned (keys leave once their row is done,
+    # so a name seen again later is scanned again or reuses the cache)
+    held = {}
+    held_rows = [0]
+    held_lock = threading.Lock()
+
+    # Write header of the run to the journal (checks that a resumed journal is of the same input and period)
+    skipped = [0]
+    if journal is not None:
+        if source is not None:
+            digest = file_digest(source)
+        elif isinstance(data, pd.DataFrame):
+            digest = frame_digest(data)
+        else:
+            digest = None
+        journal.start(period, source, digest, resume)
+
+    # Run with worker processes (rows done in resumed runs, cached rows and duplicates are not given to them)
+    if mode == "process":
+        if not isinstance(data, pd.DataFrame):
+            data = pd.concat(list(data))
+        start = time.perf_counter()
+        positions = []
+        tasks = []
+        for position, ((index, row), key) in enumerate(zip(data.iterrows(), canonical_keys(data))):
+            if completed(index, row, key):
+                continue
+            if cache is not None:
+                cached = cache.get(key, period)
+                if cached is not None:
+                    if cached.path:
+                        cached.path = reuse_evidence(cached.path, screenshot_path(list(row), month, year, cached.found, shard))
+                    if journal is not None:
+                        journal.record(index, key, "done", cached.path, 0, 0.0, cached.found)
+                    manifest.add(index, key, list(row), cached, 0.0, cached=True)
+                    continue
+            if hold(index, row, key):
+                continue
+            positions.append(position)
+            tasks.append((index, row, key))
+        if skipped[0]:
+            print(f"Resuming: {skipped[0]} rows are already done")
+
+        # Every process gets its share of the rate limit, browsers are recycled by the limits of the governor
+        results = run_processes(
+            browser_template,
+            data.iloc[positions],
+            month,
+            year,
+            number_threads,
+            engine,
+            url,
+            rate_limit=rate_limit,
+            attempts=attempts,
+            max_attempts=max_requeues + 1,
+            evidence_policy=evidence_policy,
+            shard=shard,
+            fast_path=fast_path,
+            log_path=log.PATH if log is not None else None,
+            max_rows=governor.MAX_ROWS if governor is not None else None,
+            max_rss_mb=governor.MAX_RSS / 1024 / 1024 if governor is not None and governor.MAX_RSS else None
+        )
+
+        # Record outcome of every row (results are in the order of the rows given to the processes)
+        for (index, row, key), task in zip(tasks, results.itertuples()):
+            found = None if pd.isna(task.found) else bool(task.found)
+            success = task.status == "done"
+            result = scan_result(success, found, None if pd.isna(task.path) else task.path, int(task.attempts))
+            duration = 0.0 if pd.isna(task.duration) else float(task.duration)
+            if success and cache is not None:
+                cache.put(key, period, result)
+            if journal is not None:
+                journal.record(index, key, "done" if success else "failed", result.path, result.attempts, duration, result.found)
+            if not success:
+                run_logger.failure(index, key, list(row), result.attempts)
+            run_logger.log("row", row=str(index), key=key, status=task.status, found=found, attempts=result.attempts, duration=round(duration, 3), worker=task.worker)
+            manifest.add(index, key, list(row), result, duration, task.worker)
+            release(key, result, "done" if success else "failed", task.worker)
+
+        # Statistics of every process
+        stats = []
+        for i, (worker, rows) in enumerate(results.groupby("worker")):
+            stat = worker_stats(i)
+            stat.ROWS = len(rows)
+            stat.FAILED = int((rows["status"] == "failed").sum())
+            stat.BUSY = float(rows["duration"].fillna(0).sum())
+            stat.DURATIONS = rows["duration"].fillna(0).tolist()
+            stats.append(stat)
+        print_worker_stats(stats, time.perf_counter() - start)
+        manifest.write()
+        if held_rows[0]:
+            print(f"Duplicates: {held_rows[0]} rows reused the result of the same name")
+        return stats
+
+    # Put every row into the shared queue (or split into chunks for every thread)
+    reader = None
+    if isinstance(data, pd.DataFrame):
+        print("-------------------------------DATA----------------------------------")
+        print(f"{len(data)} rows, first rows:")
+        print(data.head().to_string())
+        queues = [
+            work_queue(max_requeues, deferred=deferred, defer_delay=defer_delay)
+            for i in range(number_threads if scheduler == "static" else 1)
+        ]
+        keys = canonical_keys(data)
+        for position, ((index, row), key) in enumerate(zip(data.iterrows(), keys)):
+            if completed(index, row, key) or hold(index, row, key):
+                continue
+            queues[position * len(queues) // max(len(data), 1)].put((index, row, key))
+        for rows in queues:
+            rows.close()
+        if skipped[0]:
+            print(f"Resuming: {skipped[0]} rows are already done")
+
+    # Read chunks of data into the shared queue in the background
+    else:
+        if scheduler == "static":
+            raise ValueError("Static scheduler needs the whole dataframe")
+        queues = [work_queue(max_requeues, queue_size, deferred, defer_delay)]
+        reader = threading.Thread(target=read_chunks)
+
+    # Start browsers in parallel if pool is not given
+    scanners = pool
+    if engine == "browser" and pool is None:
+        scanners = browser_pool(
+            browser_template,
+            number_threads,
+            url=url,
+            metrics=metrics,
+            fast_path=fast_path,
+            evidence=evidence,
+            log=log,
+            breaker=breaker,
+            shard=shard,
+            evidence_policy=evidence_policy or "all",
+            tabs=tabs,
+            governor=governor,
+            limiter=limiter
+        )
+
+    # Make threads that pull rows from the queue
+    stats = [worker_stats(i) for i in range(number_threads)]
     working_threads = []
     for i in range(number_threads):
-        working_threads.append(threading.Thread(target=oig_scan, args=(data_chunks[i],)))
+        working_threads.append(threading.Thread(target=oig_scan, args=(stats[i],)))
 
     # Start threads
+    start = time.perf_counter()
+    if reader is not None:
+        reader.start()
     for working_thread in working_threads:
         working_thread.start()
 
     # Join threads
     for working_thread in working_threads:
-        working_thread.join()
\ No newline at end of file
+        working_thread.join()
+    if reader is not None:
+        reader.join()
+
+    # Close browsers started for this run and wait for screenshots to be written
+    if scanners is not pool:
+        scanners.close()
+    if evidence is not None:
+        evidence.flush()
+
+    # Print statistics of the threads and write outcome of every row
+    print_worker_stats(stats, time.perf_counter() - start)
+    manifest.write()
+    if held_rows[0]:
+        print(f"Duplicates: {held_rows[0]} rows reused the result of the same name")
+    if breaker.OPENED:
+        print(f"Circuit breaker opened {breaker.OPENED} times, threads waited {breaker.WAITED:.1f} s")
+    if controller is not None:
+        controller.print_summary()
+    if governor is not None:
+        governor.print_summary()
+    if limiter.WAITED:
+        print(f"Rate limit: threads waited {limiter.WAITED:.1f} s")
+    if metrics is not None:
+        metrics.print_summary()
+
+    # Rows after a read error were not scanned, so the run fails
+    if read_errors:
+        raise read_errors[0]
+    return stats
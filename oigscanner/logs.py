@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+
+from typing import Any, Optional
+
+
+# Lock for plain text log entries written by every thread
+TEXT_LOG_LOCK = threading.Lock()
+
+
+def create_text_log_entry(entry: str, path: str = "logs.txt") -> None:
+    """Appends entry to the plain text log holding a lock, so entries of threads are not mixed.
+
+    Args:
+        entry: string to write into log file
+        path: path to the log file
+    """
+    with TEXT_LOG_LOCK:
+        with open(path, "a+", encoding="utf-8") as log:
+            log.write(entry)
+
+
+class run_log:
+
+    def __init__(
+        self,
+        path: str = "logs.jsonl",
+        failures: str = "failures.jsonl",
+        flush_every: int = 100,
+        flush_interval: float = 1.0,
+        enabled: bool = True
+        ):
+        """Structured log of a run. Entries are json lines buffered in memory and written by a background
+        thread, rows that failed for good are also written to a separate failures file.
+
+        Args:
+            path: path to the log file (json lines)
+            failures: path to the failures file (json lines)
+            flush_every: number of entries that triggers writing to the disk
+            flush_interval: maximum number of seconds entries stay in memory
+            enabled: False to ignore every entry
+        """
+
+        # Set paths and flushing options
+        self.PATH = path
+        self.FAILURES = failures
+        self.FLUSH_EVERY = flush_every
+        self.FLUSH_INTERVAL = flush_interval
+        self.ENABLED = enabled
+
+        # Buffers for both files
+        self.BUFFER = []
+        self.FAILURE_BUFFER = []
+        self.CONDITION = threading.Condition()
+        self.CLOSED = not enabled
+
+        # Start background writer
+        self.WRITER = None
+        if enabled:
+            self.WRITER = threading.Thread(target=self.write_loop, name="run_log", daemon=True)
+            self.WRITER.start()
+
+
+    def __enter__(self) -> "run_log":
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+    def log(self, event: str, **fields: Any) -> None:
+        """Adds entry to the log.
+
+        Args:
+            event: kind of the entry (for example "attempt_failed" or "row")
+            fields: values of the entry (row key, error class, attempt number, timings)
+        """
+        if not self.ENABLED:
+            return
+        entry = {"time": round(time.time(), 3), "event": event, "thread": threading.current_thread().name, **fields}
+        with self.CONDITION:
+            self.BUFFER.append(entry)
+            if len(self.BUFFER) >= self.FLUSH_EVERY:
+                self.CONDITION.notify()
+
+
+    def failure(
+        self,
+        row_id: Any,
+        key: str,
+        values: list[str],
+        attempts: int,
+        error: Optional[str] = None
+        ) -> None:
+        """Records row that failed for good, so it can be retried later from the failures file.
+
+        Args:
+            row_id: id of the row (index of the dataframe)
+            key: canonical name key
+            values: values of the row
+            attempts: number of attempts made
+            error: class of the last error
+        """
+        if not self.ENABLED:
+            return
+        entry = {
+            "time": round(time.time(), 3),
+            "row": str(row_id),
+            "key": key,
+            "values": [str(value) for value in values],
+            "attempts": attempts,
+            "error": error
+        }
+        self.log("failed", row=str(row_id), key=key, attempts=attempts, error=error)
+        with self.CONDITION:
+            self.FAILURE_BUFFER.append(entry)
+
+
+    def write(self) -> None:
+        """Writes buffered entries to the disk."""
+        with self.CONDITION:
+            entries, self.BUFFER = self.BUFFER, []
+            failures, self.FAILURE_BUFFER = self.FAILURE_BUFFER, []
+        for path, lines in ((self.PATH, entries), (self.FAILURES, failures)):
+            if lines:
+                with open(path, "a", encoding="utf-8") as file:
+                    file.write("".join(json.dumps(line) + "\n" for line in lines))
+
+
+    def write_loop(self) -> None:
+        """Writes entries every flush interval or when enough entries are buffered."""
+        while True:
+            with self.CONDITION:
+                if not self.CLOSED and len(self.BUFFER) < self.FLUSH_EVERY:
+                    self.CONDITION.wait(self.FLUSH_INTERVAL)
+                closed = self.CLOSED
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Failed to write log: {e}")
+            if closed:
+                return
+
+
+    def close(self) -> None:
+        """Writes remaining entries and stops the writer."""
+        with self.CONDITION:
+            if self.CLOSED:
+                return
+            self.CLOSED = True
+            self.CONDITION.notify()
+        self.WRITER.join()
+
+
+NULL_LOG = run_log(enabled=False)
+
+
+def read_failures(path: str = "failures.jsonl") -> list[dict]:
+    """Reads rows that failed for good.
+
+    Args:
+        path: path to the failures file
+
+    Returns:
+        Entries with row id, key, values, attempts and error of every failed row
+    """
+    failures = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                failures.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return failures
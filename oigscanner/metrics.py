@@ -0,0 +1,292 @@
+import functools
+import json
+import random
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Iterator
+
+
+class stopwatch:
+
+    def __init__(self, recorder: "metrics", prefix: str):
+        """Measures consecutive phases of a step, each lap is recorded as "<prefix>.<phase>".
+
+        Args:
+            recorder: metrics to record laps to
+            prefix: name of the step
+        """
+        self.RECORDER = recorder
+        self.PREFIX = prefix
+        self.LAST = time.perf_counter()
+
+
+    def lap(self, phase: str) -> None:
+        """Records time since the previous lap.
+
+        Args:
+            phase: name of the phase that just finished
+        """
+        now = time.perf_counter()
+        self.RECORDER.add(f"{self.PREFIX}.{phase}", now - self.LAST)
+        self.LAST = now
+
+
+class null_stopwatch:
+
+    def lap(self, phase: str) -> None:
+        """Does nothing, used when metrics are off."""
+
+
+NULL_STOPWATCH = null_stopwatch()
+NULL_CONTEXT = nullcontext()
+
+
+class timing:
+
+    def __init__(self, size: int, generator: random.Random):
+        """Running aggregates of one step: count, total and maximum of every duration, and a fixed-size
+        uniform sample of durations for percentiles, so memory does not grow with the number of rows.
+
+        Args:
+            size: maximum number of sampled durations
+            generator: random generator used to sample
+        """
+        self.COUNT = 0
+        self.TOTAL = 0.0
+        self.MAX = 0.0
+        self.SIZE = size
+        self.SAMPLE = []
+        self.GENERATOR = generator
+
+
+    def add(self, seconds: float) -> None:
+        """Adds a duration (called holding the lock of metrics).
+
+        Args:
+            seconds: duration of the step
+        """
+        self.COUNT += 1
+        self.TOTAL += seconds
+        self.MAX = max(self.MAX, seconds)
+
+        # Reservoir sampling, every duration has the same chance to be in the sample
+        if len(self.SAMPLE) < self.SIZE:
+            self.SAMPLE.append(seconds)
+            return
+        i = self.GENERATOR.randrange(self.COUNT)
+        if i < self.SIZE:
+            self.SAMPLE[i] = seconds
+
+
+class metrics:
+
+    def __init__(self, enabled: bool = True, sample_size: int = 1024):
+        """Collects timings of browser steps and counters of retries and restarts.
+
+        Args:
+            enabled: False to make every call do nothing
+            sample_size: number of durations of every step kept for percentiles
+        """
+        self.ENABLED = enabled
+        self.SAMPLE_SIZE = sample_size
+        self.TIMINGS = {}
+        self.COUNTERS = {}
+        self.GENERATOR = random.Random(0)
+        self.LOCK = threading.Lock()
+
+
+    def add(self, name: str, seconds: float) -> None:
+        """Records timing of a step.
+
+        Args:
+            name: name of the step
+            seconds: duration of the step
+        """
+        if not self.ENABLED:
+            return
+        with self.LOCK:
+            step = self.TIMINGS.get(name)
+            if step is None:
+                step = self.TIMINGS[name] = timing(self.SAMPLE_SIZE, self.GENERATOR)
+            step.add(seconds)
+
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Increases counter.
+
+        Args:
+            name: name of the counter
+            value: value to add
+        """
+        if not self.ENABLED:
+            return
+        with self.LOCK:
+            self.COUNTERS[name] = self.COUNTERS.get(name, 0) + value
+
+
+    def timer(self, name: str) -> ContextManager[None]:
+        """Measures the duration of the with block.
+
+        Args:
+            name: name of the step
+
+        Returns:
+            Context manager that records the timing
+        """
+        if not self.ENABLED:
+            return NULL_CONTEXT
+        return self.measure(name)
+
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Helper context manager that records the duration of the with block.
+
+        Args:
+            name: name of the step
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+
+    def phases(self, prefix: str) -> stopwatch:
+        """Creates stopwatch for phases of a step.
+
+        Args:
+            prefix: name of the step
+
+        Returns:
+            Stopwatch (does nothing when metrics are off)
+        """
+        if not self.ENABLED:
+            return NULL_STOPWATCH
+        return stopwatch(self, prefix)
+
+
+    def summary(self) -> list[dict]:
+        """Makes summary of every step.
+
+        Returns:
+            Count, total, mean, p50, p95 and max seconds of every step (percentiles of the sampled durations)
+        """
+        with self.LOCK:
+            timings = {name: (step.COUNT, step.TOTAL, step.MAX, sorted(step.SAMPLE)) for name, step in self.TIMINGS.items()}
+        rows = []
+        for name, (count, total, maximum, sample) in sorted(timings.items()):
+            rows.append({
+                "step": name,
+                "count": count,
+                "total": total,
+                "mean": total / count,
+                "p50": percentile(sample, 0.5),
+                "p95": percentile(sample, 0.95),
+                "max": maximum
+            })
+        return rows
+
+
+    def print_summary(self) -> None:
+        """Prints table with timings of every step and counters."""
+        if not self.ENABLED:
+            return
+        print("-----------------------------METRICS---------------------------------")
+        print(f"{'step':<36} {'count':>8} {'total, s':>10} {'mean, s':>8} {'p50, s':>8} {'p95, s':>8} {'max, s':>8}")
+        for row in self.summary():
+            print(
+                f"{row['step']:<36} {row['count']:>8} {row['total']:>10.2f} {row['mean']:>8.3f} "
+                f"{row['p50']:>8.3f} {row['p95']:>8.3f} {row['max']:>8.3f}"
+            )
+        with self.LOCK:
+            counters = dict(self.COUNTERS)
+        for name, value in sorted(counters.items()):
+            print(f"{name:<36} {value:>8}")
+
+
+    def export_jsonl(self, path: str) -> None:
+        """Writes summary of every step and final counters as json lines.
+
+        Args:
+            path: path of the file
+        """
+        rows = self.summary()
+        with self.LOCK:
+            counters = dict(self.COUNTERS)
+        with open(path, "w", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps({"type": "timing", "time": time.time(), **row}) + "\n")
+            for name, value in sorted(counters.items()):
+                file.write(json.dumps({"type": "counter", "name": name, "value": value}) + "\n")
+
+
+    def export_prometheus(self, path: str) -> None:
+        """Writes timings (as summaries) and counters in prometheus text format.
+
+        Args:
+            path: path of the file
+        """
+        lines = [
+            "# HELP oigscanner_step_seconds Duration of scanner steps.",
+            "# TYPE oigscanner_step_seconds summary"
+        ]
+        for row in self.summary():
+            step = row["step"]
+            lines.append(f'oigscanner_step_seconds{{step="{step}",quantile="0.5"}} {row["p50"]}')
+            lines.append(f'oigscanner_step_seconds{{step="{step}",quantile="0.95"}} {row["p95"]}')
+            lines.append(f'oigscanner_step_seconds_sum{{step="{step}"}} {row["total"]}')
+            lines.append(f'oigscanner_step_seconds_count{{step="{step}"}} {row["count"]}')
+        lines.append("# HELP oigscanner_events_total Number of scanner events (retries, restarts, ...).")
+        lines.append("# TYPE oigscanner_events_total counter")
+        with self.LOCK:
+            counters = dict(self.COUNTERS)
+        for name, value in sorted(counters.items()):
+            lines.append(f'oigscanner_events_total{{event="{name}"}} {value}')
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+
+NULL_METRICS = metrics(enabled=False)
+
+
+def percentile(values: list[float], share: float) -> float:
+    """Returns percentile of sorted values (nearest rank).
+
+    Args:
+        values: sorted values
+        share: percentile as a number between 0 and 1
+
+    Returns:
+        Value at the percentile
+    """
+    if not values:
+        return 0.0
+    return values[min(int(share * len(values)), len(values) - 1)]
+
+
+def timed(name: str) -> Callable:
+    """Decorator that records duration of a method to the METRICS of its object.
+
+    Args:
+        name: name of the step
+
+    Returns:
+        Decorator
+    """
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.METRICS.ENABLED:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.METRICS.add(name, time.perf_counter() - start)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,283 @@
+import html
+import random
+import secrets
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from oigscanner.data.processing import canonical_key
+from typing import Iterable, Optional
+from urllib.parse import parse_qs
+
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><title>Exclusions Database | Office of Inspector General</title></head>
+<body>
+<form method="post" action="./" id="aspnetForm">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{view_state}" />
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="C2EE9ABB" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{event_validation}" />
+<script type="text/javascript">
+function __doPostBack(eventTarget, eventArgument) {{
+    var form = document.getElementById("aspnetForm");
+    form.__EVENTTARGET.value = eventTarget;
+    form.__EVENTARGUMENT.value = eventArgument;
+    form.submit();
+}}
+</script>
+<div id="content">
+{content}
+</div>
+</form>
+</body>
+</html>
+"""
+
+INDIVIDUALS_FORM = """<h2>Search for Individuals</h2>
+<a id="ctl00_cpExclusions_Linkbutton1" href="javascript:__doPostBack('ctl00$cpExclusions$Linkbutton1','')">Search for Entities</a>
+<label for="ctl00_cpExclusions_txtSPLastName">Last Name</label>
+<input name="ctl00$cpExclusions$txtSPLastName" type="text" id="ctl00_cpExclusions_txtSPLastName" />
+<label for="ctl00_cpExclusions_txtSPFirstName">First Name</label>
+<input name="ctl00$cpExclusions$txtSPFirstName" type="text" id="ctl00_cpExclusions_txtSPFirstName" />
+<input type="image" name="ctl00$cpExclusions$ibSearchSP" id="ctl00_cpExclusions_ibSearchSP" alt="Search" />
+"""
+
+ENTITIES_FORM = """<h2>Search for Entities</h2>
+<label for="ctl00_cpExclusions_txtSBName">Business Name</label>
+<input name="ctl00$cpExclusions$txtSBName" type="text" id="ctl00_cpExclusions_txtSBName" />
+<input type="image" name="ctl00$cpExclusions$ibSearchSP" id="ctl00_cpExclusions_ibSearchSP" alt="Search" />
+"""
+
+RESULTS = """<div id="SP">
+<h2>Search Results</h2>
+<p>Searched for: {name}</p>
+{results}
+</div>
+"""
+
+EMPTY = """<div id="ctl00_cpExclusions_pnlEmpty">No Results were found for the search criteria.</div>"""
+
+FOUND = """<table id="ctl00_cpExclusions_gvEmployees">
+<tr><th>Name</th><th>Exclusion Type</th></tr>
+<tr><td>{name}</td><td>1128a1</td></tr>
+</table>"""
+
+
+class mock_oig_site:
+
+    def __init__(
+        self,
+        individuals: Iterable[tuple[str, str]] = (),
+        entities: Iterable[str] = (),
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None
+        ):
+        """Local stand-in of the oig exclusions site with the same search flow, element names and ids.
+
+        Args:
+            individuals: last name and first name of excluded individuals
+            entities: names of excluded entities
+            latency: seconds to wait before every response
+            jitter: maximum random seconds added to the latency
+            failure_rate: share of responses that fail (server error or page without results)
+            host: host to listen on
+            port: port to listen on, 0 for any free port
+            seed: seed for random latency and failures
+        """
+
+        # Set excluded records
+        self.INDIVIDUALS = {canonical_key(last_name, first_name) for last_name, first_name in individuals}
+        self.ENTITIES = {canonical_key(entity) for entity in entities}
+
+        # Set latency and failure injection
+        self.LATENCY = latency
+        self.JITTER = jitter
+        self.FAILURE_RATE = failure_rate
+        self.RANDOM = random.Random(seed)
+        self.RANDOM_LOCK = threading.Lock()
+
+        # Form state that has to be posted back
+        self.VIEW_STATE = secrets.token_urlsafe(32)
+        self.EVENT_VALIDATION = secrets.token_urlsafe(16)
+
+        # Counters of requests
+        self.REQUESTS = 0
+        self.SEARCHES = 0
+        self.FAILURES = 0
+
+        # Create server
+        self.SERVER = ThreadingHTTPServer((host, port), self.handler())
+        self.SERVER.daemon_threads = True
+        self.THREAD = None
+
+
+    def __enter__(self) -> "mock_oig_site":
+        self.start()
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+    @property
+    def URL(self) -> str:
+        """URL of the site."""
+        host, port = self.SERVER.server_address[:2]
+        return f"http://{host}:{port}/"
+
+
+    def start(self) -> str:
+        """Starts serving in a background thread.
+
+        Returns:
+            URL of the site
+        """
+        self.THREAD = threading.Thread(target=self.SERVER.serve_forever, name="mock_oig_site", daemon=True)
+        self.THREAD.start()
+        return self.URL
+
+
+    def stop(self) -> None:
+        """Stops the server."""
+        self.SERVER.shutdown()
+        self.SERVER.server_close()
+        if self.THREAD is not None:
+            self.THREAD.join()
+
+
+    def delay(self) -> Optional[str]:
+        """Waits for the configured latency and decides if the response fails.
+
+        Returns:
+            "error" for server error, "empty" for page without form and results, None if not failing
+        """
+        with self.RANDOM_LOCK:
+            self.REQUESTS += 1
+            wait = self.LATENCY + self.RANDOM.uniform(0, self.JITTER)
+            failure = None
+            if self.RANDOM.random() < self.FAILURE_RATE:
+                self.FAILURES += 1
+                failure = self.RANDOM.choice(["error", "empty"])
+        if wait > 0:
+            time.sleep(wait)
+        return failure
+
+
+    def page(self, content: str) -> bytes:
+        """Wraps content into the page with the form state.
+
+        Args:
+            content: html inside the content element
+
+        Returns:
+            Encoded html page
+        """
+        return PAGE.format(
+            view_state=self.VIEW_STATE,
+            event_validation=self.EVENT_VALIDATION,
+            content=content
+        ).encode("utf-8")
+
+
+    def search(self, fields: dict[str, str]) -> str:
+        """Searches excluded records.
+
+        Args:
+            fields: posted form fields
+
+        Returns:
+            Html of the results
+        """
+        with self.RANDOM_LOCK:
+            self.SEARCHES += 1
+
+        # Search entity or individual
+        if "ctl00$cpExclusions$txtSBName" in fields:
+            name = fields["ctl00$cpExclusions$txtSBName"]
+            found = canonical_key(name) in self.ENTITIES
+        else:
+            last_name = fields.get("ctl00$cpExclusions$txtSPLastName", "")
+            first_name = fields.get("ctl00$cpExclusions$txtSPFirstName", "")
+            name = f"{last_name}, {first_name}"
+            found = canonical_key(last_name, first_name) in self.INDIVIDUALS
+
+        # Make results
+        name = html.escape(name)
+        results = FOUND.format(name=name) if found else EMPTY
+        return RESULTS.format(name=name, results=results)
+
+
+    def respond(self, fields: Optional[dict[str, str]]) -> tuple[int, bytes]:
+        """Makes response to a request.
+
+        Args:
+            fields: posted form fields, None for get request
+
+        Returns:
+            Status code and body of the response
+        """
+
+        # Inject failures
+        failure = self.delay()
+        if failure == "error":
+            return 500, b"<html><body>Server Error in '/' Application.</body></html>"
+        if failure == "empty":
+            return 200, self.page("<p>The service is temporarily unavailable.</p>")
+
+        # First page
+        if fields is None:
+            return 200, self.page(INDIVIDUALS_FORM)
+
+        # Expired or invalid form state
+        if fields.get("__VIEWSTATE") != self.VIEW_STATE or fields.get("__EVENTVALIDATION") != self.EVENT_VALIDATION:
+            return 200, self.page(INDIVIDUALS_FORM)
+
+        # Switch to entities
+        if fields.get("__EVENTTARGET") == "ctl00$cpExclusions$Linkbutton1":
+            return 200, self.page(ENTITIES_FORM)
+
+        # Search
+        if "ctl00$cpExclusions$ibSearchSP.x" in fields or "ctl00$cpExclusions$ibSearchSP" in fields:
+            return 200, self.page(self.search(fields))
+        return 200, self.page(INDIVIDUALS_FORM)
+
+
+    def handler(self) -> type:
+        """Creates request handler bound to this site.
+
+        Returns:
+            Request handler class
+        """
+        site = self
+
+        class request_handler(BaseHTTPRequestHandler):
+
+            def send(self, status: int, body: bytes) -> None:
+                """Sends html response."""
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                self.send(*site.respond(None))
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8")
+                fields = {name: values[0] for name, values in parse_qs(body, keep_blank_values=True).items()}
+                self.send(*site.respond(fields))
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return request_handler
@@ -0,0 +1,219 @@
+import random
+import threading
+import time
+
+from collections import deque
+from selenium.common.exceptions import ElementClickInterceptedException
+from selenium.common.exceptions import ElementNotInteractableException
+from selenium.common.exceptions import InvalidSessionIdException
+from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchWindowException
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import WebDriverException
+from urllib3.exceptions import HTTPError as DriverConnectionError
+from typing import Optional
+
+
+# Recovery steps from the cheapest to the most expensive
+LADDER = ("refind", "renavigate", "reset", "relaunch")
+
+# First recovery step for every class of errors
+FIRST_STEP = {
+    "element": 0,
+    "timeout": 1,
+    "page": 1,
+    "site": 1,
+    "browser": 3
+}
+
+# Classes of errors that mean the site itself may be failing
+SITE_ERRORS = ("site", "timeout")
+
+# Parts of webdriver error messages of firefox and chrome error pages
+SITE_ERROR_MESSAGES = ("neterror", "error page", "dnsnotfound", "connectionfailure", "nssfailure", "netreset", "net::err")
+
+# Parts of webdriver error messages of a dead browser or session
+BROWSER_ERROR_MESSAGES = ("invalid session", "session deleted", "browsing context", "disconnected", "not reachable")
+
+
+def classify(error: Exception) -> str:
+    """Classifies an exception of a browser step.
+
+    Args:
+        error: exception raised by the step
+
+    Returns:
+        "element" - element went stale or is not there yet, "timeout" - waiting for the page timed out,
+        "site" - the site returned an error page, "browser" - the browser or its session is gone,
+        "page" - anything else (the page is in an unexpected state)
+    """
+    if isinstance(error, (StaleElementReferenceException, NoSuchElementException, ElementNotInteractableException, ElementClickInterceptedException)):
+        return "element"
+    if isinstance(error, (NoSuchWindowException, InvalidSessionIdException, DriverConnectionError, ConnectionError)):
+        return "browser"
+    if isinstance(error, TimeoutException):
+        return "timeout"
+    if isinstance(error, WebDriverException):
+        message = str(error.msg or "").lower()
+        if any(part in message for part in SITE_ERROR_MESSAGES):
+            return "site"
+        if any(part in message for part in BROWSER_ERROR_MESSAGES):
+            return "browser"
+    return "page"
+
+
+def next_step(kind: str, previous: int = -1) -> int:
+    """Chooses recovery step: the first step for the class of the error, or the step after the previous one.
+
+    Args:
+        kind: class of the error returned by classify
+        previous: index of the previous recovery step of the same row, -1 if there was none
+
+    Returns:
+        Index of the step in LADDER
+    """
+    return min(max(FIRST_STEP.get(kind, 1), previous + 1), len(LADDER) - 1)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Returns exponential backoff delay with jitter, so workers do not retry at the same time.
+
+    Args:
+        attempt: number of failed attempts before (0 for the first retry)
+        base: delay of the first retry in seconds
+        cap: maximum delay in seconds
+
+    Returns:
+        Seconds to wait
+    """
+    delay = min(cap, base * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
+class circuit_breaker:
+
+    def __init__(
+        self,
+        threshold: int = 5,
+        window: float = 60.0,
+        cooldown: float = 30.0,
+        max_cooldown: float = 600.0
+        ):
+        """Pauses every worker when the site itself is failing. Opens after given number of site failures
+        within the window, then lets one worker probe the site after the cooldown. The breaker closes
+        when the probe succeeds, otherwise it opens again with twice longer cooldown.
+
+        Args:
+            threshold: number of site failures that opens the breaker
+            window: seconds in which the failures are counted
+            cooldown: seconds every worker waits when the breaker opens
+            max_cooldown: maximum cooldown in seconds
+        """
+
+        # Set threshold, window and cooldowns
+        self.THRESHOLD = threshold
+        self.WINDOW = window
+        self.COOLDOWN = cooldown
+        self.MAX_COOLDOWN = max_cooldown
+        self.CURRENT_COOLDOWN = cooldown
+
+        # Times of recent failures, time until the breaker is open and time until the probe is running
+        self.FAILURES = deque()
+        self.OPEN_UNTIL = None
+        self.PROBE_UNTIL = 0.0
+
+        # Number of times the breaker opened and seconds workers waited
+        self.OPENED = 0
+        self.WAITED = 0.0
+        self.CONDITION = threading.Condition()
+
+
+    def wait(self) -> float:
+        """Waits while the breaker is open. Lets one worker through to probe the site after the cooldown.
+
+        Returns:
+            Seconds waited
+        """
+        start = time.monotonic()
+        with self.CONDITION:
+            while True:
+                now = time.monotonic()
+                if self.OPEN_UNTIL is None:
+                    break
+                if now >= self.OPEN_UNTIL and now >= self.PROBE_UNTIL:
+                    self.PROBE_UNTIL = now + self.CURRENT_COOLDOWN
+                    break
+                self.CONDITION.wait(max(self.OPEN_UNTIL, self.PROBE_UNTIL) - now)
+            waited = time.monotonic() - start
+            self.WAITED += waited
+        return waited
+
+
+    def success(self) -> None:
+        """Records successful step, closes the breaker if it was probing."""
+        with self.CONDITION:
+            self.FAILURES.clear()
+            if self.OPEN_UNTIL is not None:
+                print("Site recovered, resuming every worker")
+                self.OPEN_UNTIL = None
+                self.PROBE_UNTIL = 0.0
+                self.CURRENT_COOLDOWN = self.COOLDOWN
+                self.CONDITION.notify_all()
+
+
+    def failure(self) -> bool:
+        """Records site failure, opens the breaker if there are too many of them.
+
+        Returns:
+            True if the breaker is open
+        """
+        with self.CONDITION:
+            now = time.monotonic()
+
+            # Failures of workers that started before the breaker opened do not count
+            if self.OPEN_UNTIL is not None:
+                if now >= self.OPEN_UNTIL:
+                    self.CURRENT_COOLDOWN = min(self.CURRENT_COOLDOWN * 2, self.MAX_COOLDOWN)
+                    self.open(now)
+                return True
+
+            # Count failures within the window
+            self.FAILURES.append(now)
+            while self.FAILURES and self.FAILURES[0] < now - self.WINDOW:
+                self.FAILURES.popleft()
+            if len(self.FAILURES) >= self.THRESHOLD:
+                self.open(now)
+                return True
+            return False
+
+
+    def open(self, now: float) -> None:
+        """Opens the breaker for the current cooldown (called holding the lock).
+
+        Args:
+            now: current monotonic time
+        """
+        print(f"Site is failing, pausing every worker for {self.CURRENT_COOLDOWN:.0f} s")
+        self.OPEN_UNTIL = now + self.CURRENT_COOLDOWN
+        self.PROBE_UNTIL = 0.0
+        self.FAILURES.clear()
+        self.OPENED += 1
+        self.CONDITION.notify_all()
+
+
+    def is_open(self) -> bool:
+        """Returns True if workers are paused."""
+        with self.CONDITION:
+            return self.OPEN_UNTIL is not None
+
+
+def record_failure(breaker: Optional[circuit_breaker], kind: str) -> None:
+    """Reports error of given class to the breaker if it means the site is failing.
+
+    Args:
+        breaker: shared circuit breaker, None if not used
+        kind: class of the error returned by classify
+    """
+    if breaker is not None and kind in SITE_ERRORS:
+        breaker.failure()
@@ -0,0 +1,58 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class scan_result:
+    """Result of a scan of an individual or entity.
+
+    Args:
+        success: True if the record was checked (and screenshot was taken if needed)
+        found: True if the record was found in the exclusions database, None if unknown
+        path: path of the evidence (screenshot), None if not taken
+        attempts: number of attempts made
+        restarts: number of times the browser was restarted
+        error: class of the last error, None if there was none
+        recoveries: number of times every recovery step was used
+    """
+    success: bool
+    found: Optional[bool] = None
+    path: Optional[str] = None
+    attempts: int = 0
+    restarts: int = 0
+    error: Optional[str] = None
+    recoveries: dict[str, int] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return self.success
+
+
+@dataclass
+class lookup_result:
+    """Result of an on-demand check of an individual or entity.
+
+    Args:
+        names: normalized last name and first name or entity name
+        key: canonical name key
+        success: True if the record was checked
+        found: True if the record was found in the exclusions database, None if unknown
+        path: path of the evidence, None if not taken
+        latency: seconds from the call to the result (including waiting for a session)
+        attempts: number of attempts made
+        error: class of the last error, None if there was none
+        coalesced: True if the result was shared with an identical check that was already running
+        cached: True if the result was reused from the cache
+    """
+    names: list[str]
+    key: str
+    success: bool
+    found: Optional[bool] = None
+    path: Optional[str] = None
+    latency: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+    coalesced: bool = False
+    cached: bool = False
+
+    def __bool__(self) -> bool:
+        return self.success
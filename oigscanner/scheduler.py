@@ -0,0 +1,255 @@
+import threading
+import time
+
+from collections import deque
+from typing import Any, Optional
+
+
+class work_queue:
+
+    def __init__(
+        self,
+        max_requeues: int = 2,
+        max_size: int = 0,
+        deferred: bool = False,
+        defer_delay: float = 0.0
+        ):
+        """Shared queue of rows that workers pull from until everything is processed and the queue is closed.
+
+        Args:
+            max_requeues: how many times a failed row can be put back into the queue
+            max_size: maximum number of waiting items, put blocks when it is reached (0 for no limit)
+            deferred: put failed rows aside and retry them after every other row is processed,
+                instead of giving them to other workers right away
+            defer_delay: seconds to wait before a pass over deferred rows, so the site can recover
+        """
+
+        # Set maximum number of requeues, size and retry policy
+        self.MAX_REQUEUES = max_requeues
+        self.MAX_SIZE = max_size
+        self.DEFERRED = deferred
+        self.DEFER_DELAY = defer_delay
+
+        # Items waiting to be processed, failed items waiting for the next pass, items taken but not finished yet
+        self.ITEMS = deque()
+        self.DEFERRED_ITEMS = []
+        self.UNFINISHED = 0
+
+        # Number of passes over deferred items and time the next pass can start
+        self.PASSES = 0
+        self.NEXT_PASS = 0.0
+
+        # New items can be added until the queue is closed
+        self.OPEN = True
+
+        # Condition to wake up waiting workers
+        self.CONDITION = threading.Condition()
+
+
+    def put(self, item: Any) -> None:
+        """Adds new item to the end of the queue. Waits while the queue is full.
+
+        Args:
+            item: item to process (for example index and row of a dataframe)
+        """
+        with self.CONDITION:
+            while self.MAX_SIZE and len(self.ITEMS) >= self.MAX_SIZE:
+                self.CONDITION.wait()
+            self.ITEMS.append((item, 0, None))
+            self.UNFINISHED += 1
+            self.CONDITION.notify()
+
+
+    def get(self, worker_id: int) -> Optional[tuple[Any, int]]:
+        """Takes next item from the queue. Prefers items that were not failed by the same worker.
+        Blocks while the queue is empty but other workers still process items that can be requeued.
+
+        Args:
+            worker_id: id of the worker that takes the item
+
+        Returns:
+            Item with number of previous attempts, None if everything is processed
+        """
+
+        with self.CONDITION:
+            while True:
+
+                if self.ITEMS:
+
+                    # Wake up producer waiting for space in the queue
+                    if self.MAX_SIZE:
+                        self.CONDITION.notify_all()
+
+                    # Take item that was not failed by this worker, otherwise take the first one
+                    for i, (item, attempts, failed_by) in enumerate(self.ITEMS):
+                        if failed_by != worker_id:
+                            del self.ITEMS[i]
+                            return item, attempts
+                    item, attempts, _ = self.ITEMS.popleft()
+                    return item, attempts
+
+                # Everything is processed
+                if self.UNFINISHED == 0 and not self.OPEN:
+                    return None
+
+                # Only deferred items are left, retry them after a delay
+                if self.DEFERRED_ITEMS and self.UNFINISHED == len(self.DEFERRED_ITEMS) and not self.OPEN:
+                    if not self.NEXT_PASS:
+                        self.NEXT_PASS = time.monotonic() + self.DEFER_DELAY
+                    remaining = self.NEXT_PASS - time.monotonic()
+                    if remaining > 0:
+                        self.CONDITION.wait(remaining)
+                        continue
+                    self.ITEMS.extend(self.DEFERRED_ITEMS)
+                    self.DEFERRED_ITEMS = []
+                    self.NEXT_PASS = 0.0
+                    self.PASSES += 1
+                    self.CONDITION.notify_all()
+                    continue
+
+                # Wait for requeued items or for the end of work
+                self.CONDITION.wait()
+
+
+    def close(self) -> None:
+        """Marks that no new items will be added."""
+        with self.CONDITION:
+            self.OPEN = False
+            self.CONDITION.notify_all()
+
+
+    def done(self) -> None:
+        """Marks item taken from the queue as processed."""
+        with self.CONDITION:
+            self.UNFINISHED -= 1
+            if self.UNFINISHED == len(self.DEFERRED_ITEMS):
+                self.CONDITION.notify_all()
+
+
+    def requeue(
+        self,
+        item: Any,
+        attempts: int,
+        worker_id: int
+        ) -> bool:
+        """Puts failed item back into the queue so that other worker can try it
+        (or aside until the next pass if the queue defers failed items).
+
+        Args:
+            item: item that failed
+            attempts: number of attempts made for the item including the failed one
+            worker_id: id of the worker that failed the item
+
+        Returns:
+            True if item was requeued, False if it ran out of attempts and was marked as processed
+        """
+
+        with self.CONDITION:
+            if attempts > self.MAX_REQUEUES:
+                self.UNFINISHED -= 1
+                if self.UNFINISHED == len(self.DEFERRED_ITEMS):
+                    self.CONDITION.notify_all()
+                return False
+
+            if self.DEFERRED:
+                self.DEFERRED_ITEMS.append((item, attempts, worker_id))
+                self.CONDITION.notify_all()
+            else:
+                self.ITEMS.append((item, attempts, worker_id))
+                self.CONDITION.notify()
+            return True
+
+
+class worker_stats:
+
+    def __init__(self, worker_id: int):
+        """Holds statistics of a single worker.
+
+        Args:
+            worker_id: id of the worker
+        """
+        self.WORKER_ID = worker_id
+        self.ROWS = 0
+        self.FAILED = 0
+        self.REQUEUED = 0
+        self.RESTARTS = 0
+        self.RECOVERIES = {}
+        self.BUSY = 0.0
+        self.DURATIONS = []
+        self.START = time.perf_counter()
+        self.END = self.START
+
+
+    def add(
+        self,
+        duration: float,
+        success: bool,
+        requeued: bool = False,
+        restarts: int = 0,
+        recoveries: Optional[dict[str, int]] = None
+        ) -> None:
+        """Adds processed row to the statistics.
+
+        Args:
+            duration: time spent on the row in seconds
+            success: True if the row was processed successfully
+            requeued: True if the failed row was put back into the queue
+            restarts: number of times the browser was restarted for the row
+            recoveries: number of times every recovery step was used for the row
+        """
+        self.ROWS += 1
+        self.BUSY += duration
+        self.RESTARTS += restarts
+        for step, count in (recoveries or {}).items():
+            self.RECOVERIES[step] = self.RECOVERIES.get(step, 0) + count
+        self.DURATIONS.append(duration)
+        if not success:
+            self.FAILED += 1
+        if requeued:
+            self.REQUEUED += 1
+
+
+    def finish(self) -> None:
+        """Marks the end of work for the worker."""
+        self.END = time.perf_counter()
+
+
+    def utilization(self, wall_time: float) -> float:
+        """Returns share of the run time the worker spent processing rows.
+
+        Args:
+            wall_time: total time of the run in seconds
+
+        Returns:
+            Number between 0 and 1
+        """
+        if wall_time <= 0:
+            return 0.0
+        return min(self.BUSY / wall_time, 1.0)
+
+
+def print_worker_stats(stats: list[worker_stats], wall_time: float) -> None:
+    """Prints table with statistics of every worker.
+
+    Args:
+        stats: statistics of the workers
+        wall_time: total time of the run in seconds
+    """
+    print("-----------------------------WORKERS---------------------------------")
+    print(f"{'worker':>6} {'rows':>8} {'failed':>8} {'requeued':>8} {'restarts':>8} {'busy, s':>10} {'idle, s':>10} {'util':>6}")
+    for stat in stats:
+        idle = max(wall_time - stat.BUSY, 0.0)
+        print(
+            f"{stat.WORKER_ID:>6} {stat.ROWS:>8} {stat.FAILED:>8} {stat.REQUEUED:>8} {stat.RESTARTS:>8} "
+            f"{stat.BUSY:>10.1f} {idle:>10.1f} {stat.utilization(wall_time):>6.0%}"
+        )
+
+    # Sum recovery steps of every worker
+    recoveries = {}
+    for stat in stats:
+        for step, count in stat.RECOVERIES.items():
+            recoveries[step] = recoveries.get(step, 0) + count
+    if recoveries:
+        print("Recoveries: " + ", ".join(f"{step} {count}" for step, count in recoveries.items()))
+    print(f"Restarts: {sum(stat.RESTARTS for stat in stats)}")
+    print(f"Total time: {wall_time:.1f} s")
@@ -14,6 +14,13 @@ setup(
         long_description=LONG_DESCRIPTION,
         packages=find_packages(),
         install_requires=[],
+        extras_require={
+            "parquet": ["pyarrow"],
+            "memory": ["psutil"]
+        },
+        entry_points={
+            "console_scripts": ["oigscanner=oigscanner.cli:main"]
+        },
         keywords=['python', 'oigscanner'],
         classifiers= [
             "Intended Audience :: Enterprise",
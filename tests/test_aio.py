@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from oigscanner.aio import async_scanner, scanner_busy
+from oigscanner.mock.server import mock_oig_site
+
+
+def test_identical_checks_are_looked_up_once(tmp_path, monkeypatch):
+    """Identical checks in flight share one lookup, different names are looked up on their own."""
+    monkeypatch.chdir(tmp_path)
+
+    async def run(url):
+        async with async_scanner(sessions=2, url=url) as scanner:
+            results = await asyncio.gather(
+                *(scanner.check_individual("smith", "john", month="May", year=2026) for i in range(5)),
+                scanner.check_individual("Jones", "Peter", month="May", year=2026)
+            )
+        return scanner, results
+
+    with mock_oig_site(individuals=[("Smith", "John")], latency=0.2) as site:
+        scanner, results = asyncio.run(run(site.URL))
+        searches = site.SEARCHES
+
+    assert [result.found for result in results] == [True] * 5 + [False]
+    assert sum(result.coalesced for result in results) == 4
+    assert scanner.LOOKUPS == 2 and scanner.COALESCED == 4 and searches == 2
+
+
+def test_checks_above_the_limit_are_rejected(tmp_path, monkeypatch):
+    """A different check above the limit of checks in flight is rejected, an identical one joins."""
+    monkeypatch.chdir(tmp_path)
+
+    async def run(url):
+        async with async_scanner(sessions=1, url=url, max_in_flight=1) as scanner:
+            first = asyncio.ensure_future(scanner.check_entity("Acme LLC", month="May", year=2026))
+            await asyncio.sleep(0)
+            with pytest.raises(scanner_busy):
+                await scanner.check_entity("Other LLC", month="May", year=2026)
+            joined = await scanner.check_entity("acme llc", month="May", year=2026)
+            return scanner, await first, joined
+
+    with mock_oig_site(entities=["Acme LLC"], latency=0.2) as site:
+        scanner, first, joined = asyncio.run(run(site.URL))
+
+    assert first.found and joined.found and joined.coalesced
+    assert scanner.REJECTED == 1 and scanner.LOOKUPS == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_check(tmp_path, monkeypatch):
+    """Cancelling one caller leaves the shared check running for the other callers."""
+    monkeypatch.chdir(tmp_path)
+
+    async def run(url):
+        async with async_scanner(sessions=1, url=url) as scanner:
+            cancelled = asyncio.ensure_future(scanner.check_individual("Smith", "John", month="May", year=2026))
+            waiting = asyncio.ensure_future(scanner.check_individual("Smith", "John", month="May", year=2026))
+            await asyncio.sleep(0.05)
+            cancelled.cancel()
+            result = await waiting
+            return scanner, cancelled, result
+
+    with mock_oig_site(individuals=[("Smith", "John")], latency=0.2) as site:
+        scanner, cancelled, result = asyncio.run(run(site.URL))
+        searches = site.SEARCHES
+
+    assert cancelled.cancelled()
+    assert result.success and result.found and result.coalesced
+    assert scanner.LOOKUPS == 1 and searches == 1
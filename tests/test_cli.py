@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import time
+
+
+# Folder with the package, so the command line runs without installing it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prints heavy modules imported by showing help of every command
+HELP_SCRIPT = """
+import sys
+from oigscanner.cli import make_parser
+for argv in (["--help"], ["scan", "--help"], ["prescreen", "--help"]):
+    try:
+        make_parser().parse_args(argv)
+    except SystemExit:
+        pass
+print("heavy:" + ",".join(sorted({name.split(".")[0] for name in sys.modules} & {"pandas", "numpy", "selenium", "requests"})))
+"""
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    """Runs python with the package on the path and returns the finished process."""
+    environment = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=environment, capture_output=True, text=True, check=True)
+
+
+def test_help_does_not_import_heavy_modules():
+    """Help of the command line and of its commands is shown without pandas, numpy, selenium or requests."""
+    assert run_python("-c", HELP_SCRIPT).stdout.strip().splitlines()[-1] == "heavy:"
+
+
+def test_help_starts_within_budget():
+    """oigscanner --help starts in under 200 ms (median of several runs, the first run warms the caches)."""
+    run_python("-m", "oigscanner", "--help")
+    times = []
+    for i in range(5):
+        start = time.perf_counter()
+        process = run_python("-m", "oigscanner", "--help")
+        times.append(time.perf_counter() - start)
+        assert "scan" in process.stdout
+    times.sort()
+    assert times[len(times) // 2] < 0.2, f"median startup {times[len(times) // 2] * 1000:.0f} ms"
@@ -0,0 +1,67 @@
+import json
+import time
+
+import pandas as pd
+
+from oigscanner.bench import synthetic_data
+from oigscanner.data.manifest import path_index
+from oigscanner.distributed import run_processes, sqlite_queue
+from oigscanner.mock.server import mock_oig_site
+from oigscanner.results import scan_result
+
+
+def test_processes_scan_every_row_once(tmp_path, monkeypatch):
+    """Three worker processes share the queue, find every excluded record and scan every row once."""
+    monkeypatch.chdir(tmp_path)
+    data, excluded = synthetic_data(30, hit_rate=0.2)
+    with mock_oig_site(individuals=excluded, latency=0.03) as site:
+        results = run_processes(
+            None, data, "May", 2026, 3, "http", site.URL, str(tmp_path / "queue.sqlite3"), evidence_policy="html"
+        )
+
+    # Every row is done once, by one worker on the first claim (the latency of the site lets every process take rows)
+    assert len(results) == len(data)
+    assert sorted(results["row_id"]) == sorted(str(index) for index in data.index)
+    assert (results["status"] == "done").all()
+    assert (results["attempts"] == 1).all()
+    assert results["worker"].nunique() > 1
+
+    # Every excluded record is found and every row has its own snapshot (a row scanned twice would add another)
+    found = {tuple(json.loads(values)) for values in results.loc[results["found"] == 1, "data"]}
+    assert found == {tuple(record) for record in excluded}
+    assert len(list(tmp_path.glob("screenshots_individuals/**/*.html"))) == len(data)
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    """A row of a worker whose lease expired is given to another worker, the late result is dropped."""
+    tasks = sqlite_queue(str(tmp_path / "queue.sqlite3"), lease_seconds=0.1)
+    run = tasks.enqueue(pd.DataFrame({"entity": ["ACME"]}))
+    first = tasks.claim("worker-1")
+    assert tasks.claim("worker-2") is None
+
+    # Lease expires, another worker takes the row
+    time.sleep(0.2)
+    second = tasks.claim("worker-2")
+    assert second is not None and second[0] == first[0] and second[3] == 2
+    assert not tasks.complete(first[0], "worker-1", scan_result(True, False), 0.1)
+    assert tasks.complete(second[0], "worker-2", scan_result(True, False), 0.1)
+
+    results = tasks.results(run)
+    assert results["worker"].tolist() == ["worker-2"] and tasks.remaining(run) == 0
+    tasks.close()
+
+
+def test_workers_take_different_evidence_names(tmp_path, monkeypatch):
+    """Workers with their own index of names never get the same evidence file for the same name."""
+    monkeypatch.chdir(tmp_path)
+    first, second = sqlite_queue(str(tmp_path / "queue.sqlite3")), sqlite_queue(str(tmp_path / "queue.sqlite3"))
+    names = [path_index(), path_index()]
+    names[0].SHARED, names[1].SHARED = first.reserve_name, second.reserve_name
+
+    paths = [index.reserve("Smith John OIG May 2026.png") for index in names + names]
+    assert paths == [
+        "Smith John OIG May 2026.png", "Smith John OIG May 2026(1).png",
+        "Smith John OIG May 2026(2).png", "Smith John OIG May 2026(3).png"
+    ]
+    first.close()
+    second.close()
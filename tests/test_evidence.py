@@ -0,0 +1,56 @@
+import functools
+import os
+import threading
+
+from oigscanner.data.cache import result_cache, reuse_evidence
+from oigscanner.data.evidence import evidence_store
+from oigscanner.data.journal import run_journal
+from oigscanner.results import scan_result
+
+
+def test_unlinked_evidence_is_found_through_the_manifest(tmp_path, monkeypatch):
+    """Without hardlinks screenshots exist only in the manifest, cache and journal still find them."""
+    monkeypatch.chdir(tmp_path)
+
+    def no_link(source, destination):
+        raise OSError("hardlinks are not supported")
+
+    # Screenshots are written once the test lets the writer go
+    release = threading.Event()
+    write = evidence_store.write
+
+    def late_write(self, png, path):
+        release.wait()
+        write(self, png, path)
+
+    monkeypatch.setattr(os, "link", no_link)
+    monkeypatch.setattr(evidence_store, "write", late_write)
+    cache = result_cache()
+    journal = run_journal()
+    journal.start("May 2026", "roster.csv", "digest")
+    with evidence_store() as evidence:
+
+        # The result is cached only after the screenshot is written
+        result = scan_result(True, False, os.path.join("screenshots", "Smith John OIG May 2026.png"), 1)
+        evidence.put(b"png", result.path)
+        evidence.when_written(result.path, functools.partial(cache.put, "smith|john", "May 2026", result))
+        assert cache.get("smith|john", "May 2026", evidence) is None
+        release.set()
+        evidence.flush()
+        journal.record(0, "smith|john", "done", result.path, 1, 0.1, False)
+
+        # The name is not a file, the stored file is found by the name
+        assert not os.path.isfile(result.path)
+        assert cache.get("smith|john", "May 2026") is None
+        assert cache.get("smith|john", "May 2026", evidence).path == result.path
+        copy = reuse_evidence(result.path, os.path.join("screenshots", "Smith John OIG June 2026.png"), evidence)
+        assert open(copy, "rb").read() == b"png"
+    journal.close()
+
+    # The next run finds the screenshot in the manifest written by the previous one
+    journal = run_journal()
+    with evidence_store() as evidence:
+        assert journal.completed(0, "smith|john") is None
+        assert journal.completed(0, "smith|john", evidence)["path"] == result.path
+    journal.close()
+    cache.close()
@@ -0,0 +1,51 @@
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from oigscanner.data.fuzzy import TRIGRAM_BITS, fuzzy_index, name_tokens, popcount, soundex, trigram_bits
+from oigscanner.data.processing import normalize_data_oig
+
+
+# Exclusion file in the layout of UPDATED.csv
+LEIE_CSV = os.path.join(os.path.dirname(__file__), "data", "UPDATED.csv")
+
+
+def test_trigram_bits_match_every_trigram_of_the_name():
+    """Bits set at once are the bits of every trigram of every name, transposed names have the same bits."""
+    tokens = name_tokens(pd.Series(["Smith John", "John Smith", "O'Brien", "", None, "Zoë Ann"] * 1000))
+    bits = trigram_bits(tokens)
+    assert bits.shape == (len(tokens), TRIGRAM_BITS // 64)
+    for i, words in enumerate(tokens[:6]):
+        text = " " + " ".join(sorted(words)) + " "
+        expected = {zlib.crc32(text[j:j + 3].encode("utf-8")) % TRIGRAM_BITS for j in range(len(text) - 2)}
+        row = np.unpackbits(bits[i].view(np.uint8))
+        assert set(np.flatnonzero(row)) == expected
+        assert popcount(bits[i:i + 1])[0] == len(expected)
+    assert (bits[0] == bits[1]).all() and (bits[:6] == bits[6:12]).all()
+
+    # Characters outside of ascii are trigrams of characters
+    assert (trigram_bits(pd.Series([["zoë"]]))[0] != trigram_bits(pd.Series([["zoe"]]))[0]).any()
+
+
+def test_soundex():
+    """Names that sound the same have the same code."""
+    assert soundex("jon") == soundex("john") == "J500"
+    assert soundex("robert") == soundex("rupert") == "R163"
+    assert soundex("ashcraft") == "A261"
+    assert soundex("") == ""
+
+
+def test_near_misses_are_flagged():
+    """Misspelled, hyphenated and transposed names are flagged, other names are not."""
+    index = fuzzy_index(LEIE_CSV)
+    individuals = normalize_data_oig(pd.DataFrame({
+        "last": ["Smyth", "John", "De La Cruz", "Jones"],
+        "first": ["John", "Smith", "Anne Marie", "Peter"]
+    }))
+    assert index.flag(individuals, threshold=0.6).tolist() == [True, True, True, False]
+    entities = normalize_data_oig(pd.DataFrame({
+        "entity": ["Acme Helth Services LLC", "Best Medical Suply Inc", "Zenith Labs"]
+    }))
+    assert index.flag(entities).tolist() == [True, True, False]
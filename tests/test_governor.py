@@ -0,0 +1,21 @@
+import importlib.util
+
+import pytest
+
+from oigscanner.browser.governor import resource_governor
+
+
+def test_browser_is_recycled_after_rows():
+    """A browser is recycled once it processed the maximum number of rows, counters start again after forget."""
+    governor = resource_governor(max_rows=3)
+    scanner = object()
+    assert [governor.count(scanner) for i in range(3)] == [None, None, "rows"]
+    governor.forget(scanner)
+    assert governor.count(scanner) is None and governor.RECYCLED == {"rows": 1}
+
+
+@pytest.mark.skipif(importlib.util.find_spec("psutil") is not None, reason="psutil is installed")
+def test_memory_limit_without_psutil_fails():
+    """A memory limit without psutil raises instead of being ignored."""
+    with pytest.raises(ImportError, match="psutil"):
+        resource_governor(max_rss_mb=1500)
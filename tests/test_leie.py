@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+
+from oigscanner.data.leie import leie_index
+from oigscanner.data.processing import normalize_data_oig
+
+
+# Exclusion file in the layout of UPDATED.csv
+LEIE_CSV = os.path.join(os.path.dirname(__file__), "data", "UPDATED.csv")
+
+
+def test_individuals_match_exactly_or_by_initial():
+    """Individuals match on the full first name, or on the first initial with partial matching."""
+    index = leie_index(LEIE_CSV)
+    data = normalize_data_oig(pd.DataFrame({
+        "last": ["smith", "Smith", "o’brien", "de la  cruz", "Jones"],
+        "first": ["john", "Jane", "MARY", "anne - marie", "John"]
+    }))
+    assert index.match(data).tolist() == [True, False, True, True, False]
+    assert index.match(data, partial=True).tolist() == [True, True, True, True, False]
+
+
+def test_entities_are_prescreened():
+    """Entities found in the exclusion file go to the browser, the rest are clean."""
+    index = leie_index(LEIE_CSV)
+    data = normalize_data_oig(pd.DataFrame({"entity": ["Acme Health Services LLC", "best medical supply, inc.,", "Other LLC"]}))
+    scan, clean = index.prescreen(data)
+    assert scan["entity"].tolist() == ["Acme Health Services LLC", "best medical supply, inc."]
+    assert clean["entity"].tolist() == ["Other LLC"]
+
+
+def test_lookup_uses_keys_of_every_record():
+    """Single names are found among the records with the keys made when the file was loaded."""
+    index = leie_index(LEIE_CSV)
+    assert index.lookup("Smith", "John")["EXCLTYPE"].tolist() == ["1128a1"]
+    assert index.lookup("acme health services llc")["EXCLTYPE"].tolist() == ["1128b7"]
+    assert index.lookup("Jones", "John").empty
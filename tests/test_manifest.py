@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from oigscanner.data.manifest import results_manifest
+from oigscanner.results import scan_result
+
+# pyarrow that can be imported (an install built for another numpy fails to import)
+try:
+    import pyarrow.parquet
+    PYARROW = True
+except ImportError:
+    PYARROW = False
+
+
+def test_manifest_is_written_as_csv(tmp_path):
+    """Rows of every shard are merged into the csv manifest, parquet is not written unless asked for."""
+    manifest = results_manifest(str(tmp_path / "results_manifest.csv"), shard_rows=2)
+    for i in range(5):
+        manifest.add(i, f"smith|john{i}", ["Smith", f"John{i}"], scan_result(True, i == 3, f"{i}.png", 1), 0.1, 0)
+    assert manifest.write() == 5
+
+    data = pd.read_csv(tmp_path / "results_manifest.csv")
+    assert data["row"].tolist() == list(range(5)) and data["found"].sum() == 1
+    assert [path.name for path in tmp_path.iterdir()] == ["results_manifest.csv"]
+
+
+@pytest.mark.skipif(PYARROW, reason="pyarrow is installed")
+def test_parquet_without_pyarrow_fails_before_the_run(tmp_path):
+    """Asking for parquet without pyarrow raises when the manifest is made, not after the run."""
+    with pytest.raises(ImportError, match="pyarrow"):
+        results_manifest(str(tmp_path / "results_manifest.csv"), str(tmp_path / "results_manifest.parquet"))
@@ -0,0 +1,41 @@
+import pandas as pd
+
+from oigscanner.bench import benchmark, synthetic_data
+from oigscanner.data.processing import canonical_key
+from oigscanner.interface import interface
+from oigscanner.mock.server import mock_oig_site
+
+
+def test_http_scan_finds_excluded_individuals(tmp_path, monkeypatch):
+    """Scans individuals with the http engine against the mock site and finds every excluded one."""
+    monkeypatch.chdir(tmp_path)
+    data, excluded = synthetic_data(20, hit_rate=0.2)
+    with mock_oig_site(individuals=excluded) as site:
+        stats = interface(None, data, "May", 2026, number_threads=2, engine="http", url=site.URL, defer_delay=0.0)
+
+    # Every row is done, hits have html evidence
+    manifest = pd.read_csv("results_manifest.csv")
+    assert sum(stat.FAILED for stat in stats) == 0
+    assert len(manifest) == len(data)
+    hits = manifest[manifest["found"].eq(True)]
+    assert set(hits["key"]) == {canonical_key(*record) for record in excluded}
+    assert all((tmp_path / path).is_file() and path.endswith(".html") for path in hits["path"])
+
+
+def test_http_scan_finds_excluded_entities(tmp_path, monkeypatch):
+    """Scans entities with the http engine against the mock site and finds every excluded one."""
+    monkeypatch.chdir(tmp_path)
+    data, excluded = synthetic_data(10, hit_rate=0.3, entities=True)
+    with mock_oig_site(entities=excluded) as site:
+        interface(None, data, "May", 2026, engine="http", url=site.URL, evidence_policy="none", defer_delay=0.0)
+
+    manifest = pd.read_csv("results_manifest.csv")
+    assert set(manifest.loc[manifest["found"].eq(True), "key"]) == {canonical_key(record) for record in excluded}
+
+
+def test_http_benchmark(tmp_path, monkeypatch):
+    """Runs the http benchmark (it checks that excluded records are found)."""
+    monkeypatch.chdir(tmp_path)
+    results = benchmark(None, rows=20, workers=(1, 2), engines=("http",), schedulers=("queue",), latency=0.0, jitter=0.0)
+    assert (results["failed"] == 0).all()
+    assert (results["hits"] == 1).all()
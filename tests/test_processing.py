@@ -0,0 +1,34 @@
+import pandas as pd
+
+from oigscanner.data.processing import canonical_key, clean_name, compact_data_oig, normalize_data_oig
+
+
+NAMES = [
+    "  smith ", "o’brien", "Smith", "SMITH", "de  la   cruz", "anne - marie", "“Acme”, ", "Ｍüller", "a​b",
+    "jean-luc", "", None, "mary`s", "x y", "'", "Smith"
+]
+
+
+def test_normalized_names_match_clean_name():
+    """Columns normalized at once give the same names and keys as clean_name and canonical_key of every row."""
+    data = pd.DataFrame({"last": NAMES, "first": list(reversed(NAMES))})
+    normalized = normalize_data_oig(data)
+    assert all(isinstance(dtype, pd.CategoricalDtype) for dtype in normalized.dtypes)
+
+    # Rows with a missing or empty name are dropped
+    expected = data.dropna().map(lambda value: clean_name(value).title())
+    expected = expected[(expected != "").all(axis=1)]
+    assert normalized.astype(object).equals(expected)
+
+    # Keys of the normalized data are the keys of every row, repeated names share one key
+    compact, keys = compact_data_oig(data)
+    assert compact.astype(object).equals(expected)
+    assert keys.tolist() == [canonical_key(*row) for row in expected.itertuples(index=False)]
+    assert keys.nunique() < len(keys)
+
+
+def test_entities_keep_case():
+    """Entity names are not capitalized."""
+    normalized = normalize_data_oig(pd.DataFrame({"entity": ["acme  LLC", " acme LLC,", None]}))
+    assert normalized["entity"].tolist() == ["acme LLC", "acme LLC"]
+    assert normalized["entity"].cat.categories.tolist() == ["acme LLC"]
@@ -0,0 +1,40 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from oigscanner.bench import synthetic_data
+from oigscanner.browser.templates import chromium_template, firefox_template
+from oigscanner.data.processing import canonical_key
+from oigscanner.interface import interface
+from oigscanner.mock.server import mock_oig_site
+
+
+def browser_template():
+    """Returns template of a headless browser installed on this machine, None if there is none."""
+    chromium = any(shutil.which(name) for name in ("chromium", "chromium-browser", "google-chrome"))
+    if chromium and shutil.which("chromedriver"):
+        return chromium_template(lean=True)
+    if shutil.which("geckodriver") and shutil.which("firefox"):
+        return firefox_template(lean=True)
+    return None
+
+
+pytestmark = pytest.mark.skipif(browser_template() is None, reason="no browser and driver are installed")
+
+
+def test_tabs_scan_every_row(tmp_path, monkeypatch):
+    """Four threads share one browser, each searching in its own tab, and find every excluded record."""
+    monkeypatch.chdir(tmp_path)
+    data, excluded = synthetic_data(16, hit_rate=0.25)
+    with mock_oig_site(individuals=excluded, latency=0.05) as site:
+        stats = interface(
+            browser_template(), data, "May", 2026, number_threads=4, tabs=4, url=site.URL, evidence_policy="hits",
+            defer_delay=0.0
+        )
+
+    manifest = pd.read_csv("results_manifest.csv")
+    assert sum(stat.FAILED for stat in stats) == 0
+    assert len(manifest) == len(data)
+    assert set(manifest.loc[manifest["found"].eq(True), "key"]) == {canonical_key(*record) for record in excluded}
+